@@ -0,0 +1,319 @@
+"""Binding intervals of couples from a multi-frame report.
+
+A couple is bound in a frame if its id is listed in that frame of the
+report (e.g. report couple:link). The bound ids of all frames are stored as
+a sparse boolean occupancy matrix (couples x frames), and the bound runs of
+every couple are extracted from its nonzero entries with vectorized diffs.
+
+Intervals that start in the first frame or end in the last frame are
+flagged as left- or right-censored: the couple may have been bound before
+the first frame or after the last frame, so their true duration is longer.
+
+Each interval is a record:
+couple, start, end, n_frames, duration, left_censored, right_censored
+with start and end the times of the first and last frame in which the
+couple is bound, and duration = n_frames * dt.
+
+For long runs, BindingIntervalTracker walks the frames once and only keeps
+the couples bound in the current frame (sorted ids and bind start), so its
+memory does not grow with the number of frames. Completed intervals can be
+fed to a BindTimeAccumulator, which counts the intervals by number of
+frames and gives the same statistics and fit as summarize_bind_times,
+without keeping every binding time.
+"""
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from frame_reader import iter_report_frames
+
+interval_columns = ['couple', 'start', 'end', 'n_frames', 'duration', 'left_censored', 'right_censored']
+
+missing_dt_message = "The time between frames dt cannot be inferred from fewer than two frames, it has to be given"
+
+def read_bound_ids(file_path, column='identity'):
+    """Bound couple ids of every frame of a report, frames in time order
+
+    Returns: (frame times, list of sorted unique id arrays)
+    """
+    times = []
+    id_arrays = []
+
+    for block, frame_df in iter_report_frames(file_path, column_list=[column]):
+        times.append(block.time if block.time is not None else np.nan)
+        id_arrays.append(np.unique(frame_df[column].to_numpy(dtype=np.int64)))
+
+    times = np.array(times, dtype=np.float64)
+    order = np.argsort(times, kind='stable')
+
+    return times[order], [ id_arrays[k] for k in order ]
+
+def occupancy_matrix(id_arrays):
+    """Sparse boolean matrix of the couples bound in each frame
+
+    Returns: (sorted couple ids, csr_matrix of shape (n_couples, n_frames))
+    """
+    n_frames = len(id_arrays)
+
+    ids = np.concatenate(id_arrays) if n_frames else np.zeros(0, dtype=np.int64)
+    frame_idx = np.repeat(np.arange(n_frames), [ x.shape[0] for x in id_arrays ])
+
+    couple_ids = np.unique(ids)
+    rows = np.searchsorted(couple_ids, ids)
+
+    occupancy = csr_matrix((np.ones(ids.shape[0], dtype=bool), (rows, frame_idx)), \
+                           shape=(couple_ids.shape[0], n_frames))
+
+    return couple_ids, occupancy
+
+def infer_frame_interval(times):
+    """Time between frames, the median of the time differences"""
+    if times.shape[0] < 2:
+        raise ValueError(missing_dt_message)
+
+    return np.median(np.diff(times))
+
+def extract_intervals(couple_ids, occupancy, times, dt=None):
+    """Bound runs of every couple of the occupancy matrix
+
+    Returns: Pandas dataframe with the interval_columns, sorted by couple
+    and start time
+    """
+    if dt is None:
+        dt = infer_frame_interval(times)
+
+    occupancy = occupancy.tocsr()
+    occupancy.sort_indices()
+
+    n_frames = occupancy.shape[1]
+
+    # Nonzero entries in (row, col) order
+    rows = np.repeat(np.arange(occupancy.shape[0]), np.diff(occupancy.indptr))
+    cols = occupancy.indices.astype(np.int64)
+
+    if rows.shape[0] == 0:
+        return empty_intervals()
+
+    # A run starts at a new couple or after a gap of at least one frame
+    run_start = np.flatnonzero(np.r_[True, (rows[1:] != rows[:-1]) | (np.diff(cols) != 1)])
+    run_end = np.r_[run_start[1:], rows.shape[0]] - 1
+
+    start_frame = cols[run_start]
+    end_frame = cols[run_end]
+    n_run_frames = end_frame - start_frame + 1
+
+    return pd.DataFrame({'couple': couple_ids[rows[run_start]], \
+                         'start': times[start_frame], \
+                         'end': times[end_frame], \
+                         'n_frames': n_run_frames, \
+                         'duration': n_run_frames * dt, \
+                         'left_censored': start_frame == 0, \
+                         'right_censored': end_frame == n_frames - 1})
+
+def calc_binding_intervals(file_path, dt=None, column='identity'):
+    times, id_arrays = read_bound_ids(file_path, column)
+    couple_ids, occupancy = occupancy_matrix(id_arrays)
+
+    return extract_intervals(couple_ids, occupancy, times, dt)
+
+def empty_intervals():
+    return pd.DataFrame({'couple': np.zeros(0, dtype=np.int64), \
+                         'start': np.zeros(0), \
+                         'end': np.zeros(0), \
+                         'n_frames': np.zeros(0, dtype=np.int64), \
+                         'duration': np.zeros(0), \
+                         'left_censored': np.zeros(0, dtype=bool), \
+                         'right_censored': np.zeros(0, dtype=bool)})
+
+class BindingIntervalTracker():
+    """Single pass binding intervals, frames must be added in time order
+
+    Only the currently bound couples are stored: sorted ids, with the time
+    and frame number at which they bound. If dt is None, it is the time
+    between the first two frames.
+    """
+    def __init__(self, dt=None):
+        self.dt = dt
+
+        self.bound_ids = np.zeros(0, dtype=np.int64)
+        self.start_times = np.zeros(0)
+        self.start_frames = np.zeros(0, dtype=np.int64)
+
+        self.n_frames = 0
+        self.last_time = None
+
+    def make_intervals(self, mask, end_frame, end_time, right_censored):
+        n_run_frames = end_frame - self.start_frames[mask]
+        dt = self.dt if self.dt is not None else np.nan
+
+        return pd.DataFrame({'couple': self.bound_ids[mask], \
+                             'start': self.start_times[mask], \
+                             'end': np.full(n_run_frames.shape[0], end_time, dtype=np.float64), \
+                             'n_frames': n_run_frames, \
+                             'duration': n_run_frames * dt, \
+                             'left_censored': self.start_frames[mask] == 0, \
+                             'right_censored': np.full(n_run_frames.shape[0], right_censored)})
+
+    def update(self, time, ids):
+        """Add the bound ids of the next frame
+
+        Returns: Pandas dataframe of the intervals that ended in the
+        previous frame (the couples not bound any more)
+        """
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+
+        if (self.dt is None) and (self.last_time is not None):
+            self.dt = time - self.last_time
+
+        still_bound = np.isin(self.bound_ids, ids, assume_unique=True)
+
+        if np.all(still_bound):
+            ended_df = empty_intervals()
+        else:
+            ended_df = self.make_intervals(~still_bound, self.n_frames, self.last_time, False)
+
+        new_ids = np.setdiff1d(ids, self.bound_ids, assume_unique=True)
+
+        bound_ids = np.concatenate((self.bound_ids[still_bound], new_ids))
+        order = np.argsort(bound_ids, kind='stable')
+
+        self.bound_ids = bound_ids[order]
+        self.start_times = np.concatenate((self.start_times[still_bound], np.full(new_ids.shape[0], time, dtype=np.float64)))[order]
+        self.start_frames = np.concatenate((self.start_frames[still_bound], np.full(new_ids.shape[0], self.n_frames, dtype=np.int64)))[order]
+
+        self.n_frames += 1
+        self.last_time = time
+
+        return ended_df
+
+    def finish(self):
+        """Returns: the right-censored intervals of the couples bound in the
+        last frame"""
+        ended_df = self.make_intervals(np.ones(self.bound_ids.shape[0], dtype=bool), self.n_frames, self.last_time, True)
+
+        self.bound_ids = self.bound_ids[:0]
+        self.start_times = self.start_times[:0]
+        self.start_frames = self.start_frames[:0]
+
+        return ended_df
+
+def iter_binding_intervals(file_path, tracker=None, column='identity'):
+    """Yield the intervals completed in each frame of a report (frames in
+    file order), then the right-censored ones"""
+    if tracker is None:
+        tracker = BindingIntervalTracker()
+
+    for block, frame_df in iter_report_frames(file_path, column_list=[column]):
+        time = block.time if block.time is not None else np.nan
+        ended_df = tracker.update(time, frame_df[column].to_numpy(dtype=np.int64))
+
+        if ended_df.shape[0]:
+            yield ended_df
+
+    yield tracker.finish()
+
+class BindTimeAccumulator():
+    """Number of intervals of each length in frames, enough for the exact
+    statistics and histogram of the binding times n_frames*dt"""
+    def __init__(self, include_censored=True):
+        self.include_censored = include_censored
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, interval_df):
+        if not self.include_censored:
+            interval_df = interval_df[~(interval_df.left_censored | interval_df.right_censored)]
+
+        counts = np.bincount(interval_df['n_frames'].to_numpy(dtype=np.int64))
+
+        if counts.shape[0] > self.counts.shape[0]:
+            self.counts = np.pad(self.counts, (0, counts.shape[0] - self.counts.shape[0]))
+
+        self.counts[:counts.shape[0]] += counts
+
+    def bind_times(self, dt):
+        """Returns: (distinct binding times, number of intervals of each)"""
+        if dt is None:
+            raise ValueError(missing_dt_message)
+
+        n_frames = np.flatnonzero(self.counts)
+
+        return n_frames * dt, self.counts[n_frames]
+
+    def histogram(self, dt, bins=100):
+        """Same as np.histogram of all the binding times"""
+        (bind_times, weights) = self.bind_times(dt)
+        counts, edges = np.histogram(bind_times, bins=bins, weights=weights)
+
+        return counts.astype(np.int64), edges
+
+    def summarize(self, dt, bins=100):
+        """Returns: dict with N, mean, std, median, K, A (same as
+        summarize_bind_times on all the binding times, NaN if there are
+        none)"""
+        (bind_times, weights) = self.bind_times(dt)
+
+        N = np.sum(weights)
+
+        if N == 0:
+            return empty_summary()
+        mean = np.sum(weights * bind_times) / N
+        std = np.sqrt(np.sum(weights * (bind_times - mean)**2) / N)
+
+        # Middle element(s) of the sorted binding times
+        cumulative = np.cumsum(weights)
+        median = 0.5 * (bind_times[np.searchsorted(cumulative, (N - 1)//2, side='right')] + \
+                        bind_times[np.searchsorted(cumulative, N//2, side='right')])
+
+        K, A = fit_exponential(*self.histogram(dt, bins))
+
+        return {'N': N, \
+                'mean': mean, \
+                'std': std, \
+                'median': median, \
+                'K': K, \
+                'A': A}
+
+def fit_exponential(counts, edges):
+    """Fit A*exp(-K*t) to a normalized histogram of binding times, by a
+    linear fit of the log of the nonzero bins, with the point (0, 1) added
+
+    Returns: (K, A)
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    counts = counts / np.sum(counts)
+
+    t = np.insert(edges[:-1], 0, 0.0)
+
+    with np.errstate(divide='ignore'):
+        y = np.log(np.insert(np.where(counts > 0, counts, np.nan), 0, 1.0))
+
+    idx = np.isfinite(t) & np.isfinite(y)
+
+    slope, A_log = np.polyfit(t[idx], y[idx], 1)
+
+    return -slope, np.exp(A_log)
+
+def empty_summary():
+    """Statistics of an empty set of binding times, NaN but for N"""
+    return {'N': 0, 'mean': np.nan, 'std': np.nan, 'median': np.nan, 'K': np.nan, 'A': np.nan}
+
+def summarize_bind_times(bind_times, bins=100):
+    """Statistics and exponential fit of a set of binding times
+
+    Returns: dict with N, mean, std, median, K, A (NaN if there are no
+    binding times)
+    """
+    bind_times = np.asarray(bind_times, dtype=np.float64)
+
+    if bind_times.shape[0] == 0:
+        return empty_summary()
+
+    counts, edges = np.histogram(bind_times, bins=bins)
+    K, A = fit_exponential(counts, edges)
+
+    return {'N': bind_times.shape[0], \
+            'mean': np.mean(bind_times), \
+            'std': np.std(bind_times), \
+            'median': np.median(bind_times), \
+            'K': K, \
+            'A': A}
@@ -0,0 +1,224 @@
+"""End-to-end length of the filament bundles, for every frame of a run.
+
+The bundle length is the largest distance between the centers of two
+filaments of a cluster. It is found on the 2D convex hull of the cluster
+with rotating calipers, O(n log n) time and O(n) memory, instead of a full
+pairwise distance matrix.
+
+The position report is generated using the Cytosim report function:
+report fiber:cluster_fiber_position
+
+Usage:
+python bundle_length.py -i cluster_fiber_position.txt
+python bundle_length.py -i cluster_fiber_position.txt --neighbourcutoff 0.25
+
+If the space of config.cym is periodic, the positions of each cluster are
+first unwrapped across the boundaries (see unwrap_positions), so that a
+bundle which crosses the box edge is measured in one piece.
+
+With --neighbourcutoff, the old check of the prototype scripts is applied:
+the length is the largest distance from a filament that has another
+filament of the cluster closer than the cutoff, to any filament of the
+cluster (NaN if no filament has such a neighbour). The farthest point from
+any point of a set is a vertex of its convex hull, so only the hull
+vertices are compared.
+
+Output:
+<ifile>.len.dat frame, time, cluster, cluster_size, end_end_length
+"""
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import ConvexHull, QhullError
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, breadth_first_order
+
+from frame_reader import read_cluster_positions
+from neighbours import neighbour_pairs, minimum_image, read_box
+
+def calipers_diameter(hull_points):
+    """Largest distance between the vertices of a convex polygon, with
+    rotating calipers
+
+    hull_points: (m, 2) array of the vertices in counterclockwise order
+    """
+    m = hull_points.shape[0]
+
+    if m < 3:
+        return np.linalg.norm(hull_points[-1] - hull_points[0])
+
+    def area(i, j, k):
+        # Twice the area of the triangle (i, j, k)
+        (a, b, c) = hull_points[i], hull_points[j], hull_points[k]
+        return (b[0] - a[0])*(c[1] - a[1]) - (b[1] - a[1])*(c[0] - a[0])
+
+    diameter_sq = 0.0
+    j = 1
+
+    for i in range(m):
+        next_i = (i + 1) % m
+
+        # Advance the antipodal vertex while it moves away from edge (i, i+1)
+        while area(i, next_i, (j + 1) % m) > area(i, next_i, j):
+            j = (j + 1) % m
+
+        for k in (i, next_i):
+            diameter_sq = max(diameter_sq, np.sum((hull_points[k] - hull_points[j])**2))
+
+    return np.sqrt(diameter_sq)
+
+def hull_points(points):
+    """Vertices of the 2D convex hull of a point set, in counterclockwise
+    order (the two extreme points if all points are on a line)"""
+    try:
+        hull = ConvexHull(points)
+    except QhullError:
+        # Fewer than 3 points, or all points on a line: the hull is the
+        # segment between the extreme points along the line
+        direction = points[np.argmax(np.sum((points - points[0])**2, axis=1))] - points[0]
+        projection = points @ direction
+
+        return points[[np.argmin(projection), np.argmax(projection)]]
+
+    # 2D hull vertices are in counterclockwise order
+    return points[hull.vertices]
+
+def point_set_diameter(points):
+    """Largest distance between two points of a 2D point set"""
+    points = np.asarray(points, dtype=np.float64)
+
+    if points.shape[0] < 2:
+        return 0.0
+
+    return calipers_diameter(hull_points(points))
+
+def max_distance_from(points, other_points):
+    """Largest distance between a point of points and a point of
+    other_points (NaN if points is empty)"""
+    points = np.asarray(points, dtype=np.float64)
+    other_points = np.asarray(other_points, dtype=np.float64)
+
+    if points.shape[0] == 0:
+        return np.nan
+
+    if other_points.shape[0] < 2:
+        return np.sqrt(np.max(np.sum((points - other_points[0])**2, axis=1)))
+
+    vertices = hull_points(other_points)
+
+    return np.sqrt(np.max(np.sum((points[:, None, :] - vertices[None, :, :])**2, axis=-1)))
+
+def neighbour_mask(n_points, pair_i, pair_j, distances, cutoff):
+    """True for the points with at least one other point closer than cutoff
+    (coincident points are not neighbours, as in the old pair distance check)"""
+    valid = (distances > 0) & (distances < cutoff)
+
+    mask = np.zeros(n_points, dtype=bool)
+    mask[pair_i[valid]] = True
+    mask[pair_j[valid]] = True
+
+    return mask
+
+def unwrap_positions(positions, box, pair_i=None, pair_j=None):
+    """Positions of a cluster made continuous across the periodic boundaries
+
+    Every point is moved to its image closest to the first point. If the
+    neighbour pairs are given, the points of each connected group are
+    instead placed step by step, each at its image closest to the neighbour
+    it is reached from, so that bundles longer than half the box stay in
+    one piece.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+
+    if (box is None) or (positions.shape[0] == 0):
+        return positions
+
+    unwrapped = positions[0] + minimum_image(positions - positions[0], box)
+
+    if pair_i is None:
+        return unwrapped
+
+    n_points = positions.shape[0]
+    graph = csr_matrix((np.ones(pair_i.shape[0]), (pair_i, pair_j)), shape=(n_points, n_points))
+
+    (n_components, labels) = connected_components(graph, directed=False)
+    (_, roots) = np.unique(labels, return_index=True)
+
+    for root in roots:
+        (order, predecessors) = breadth_first_order(graph, root, directed=False)
+
+        for k in order[1:]:
+            unwrapped[k] = unwrapped[predecessors[k]] + minimum_image(positions[k] - positions[predecessors[k]], box)
+
+    return unwrapped
+
+def calc_bundle_lengths(frames, times, clusters, positions, neighbour_cutoff=None, box=None):
+    """End-to-end length of every (frame, cluster) group
+
+    Returns: Pandas dataframe with columns frame, time, cluster, cluster_size,
+    end_end_length
+    """
+    frames = np.asarray(frames, dtype=np.int64)
+    clusters = np.asarray(clusters, dtype=np.int64)
+    times = np.asarray(times, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.float64)
+
+    # Sort once by (frame, cluster) and split into contiguous groups
+    order = np.lexsort((clusters, frames))
+    frames = frames[order]
+    clusters = clusters[order]
+    times = times[order]
+    positions = positions[order]
+
+    n_points = frames.shape[0]
+    group_start = np.flatnonzero(np.r_[True, (frames[1:] != frames[:-1]) | (clusters[1:] != clusters[:-1])]) if n_points else np.zeros(0, dtype=np.int64)
+    group_end = np.r_[group_start[1:], n_points]
+
+    lengths = np.zeros(group_start.shape[0])
+
+    for (k, (start, end)) in enumerate(zip(group_start, group_end)):
+        cluster_positions = positions[start:end]
+
+        if neighbour_cutoff is None:
+            lengths[k] = point_set_diameter(unwrap_positions(cluster_positions, box))
+            continue
+
+        (pair_i, pair_j, distances) = neighbour_pairs(cluster_positions, neighbour_cutoff, box)
+        cluster_positions = unwrap_positions(cluster_positions, box, pair_i, pair_j)
+
+        mask = neighbour_mask(end - start, pair_i, pair_j, distances, neighbour_cutoff)
+        lengths[k] = max_distance_from(cluster_positions[mask], cluster_positions)
+
+    return pd.DataFrame({'frame': frames[group_start], \
+                         'time': times[group_start], \
+                         'cluster': clusters[group_start], \
+                         'cluster_size': group_end - group_start, \
+                         'end_end_length': lengths})
+
+def get_args(argv):
+    parser = argparse.ArgumentParser(description='end-to-end length of the filament bundles of every frame')
+
+    parser.add_argument('--ifile', '-i', type=str, help='(multi-frame) cluster_fiber_position report')
+    parser.add_argument('--ofile', '-o', type=str, default=None, help='output file (default: input file with suffix .len.dat)')
+    parser.add_argument('--neighbourcutoff', type=float, default=None, help='optional: only measure from the filaments with a neighbour of the cluster closer than this distance, to any filament of the cluster (the old scripts used 0.25)')
+    parser.add_argument('--config', type=str, default='config.cym', help='Cytosim config file, if its space is periodic the clusters are unwrapped across the boundaries')
+
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = get_args(argv)
+
+    input_file_path = Path(args.ifile)
+    output_file_path = Path(args.ofile) if args.ofile else input_file_path.with_suffix('.len.dat')
+
+    length_df = calc_bundle_lengths(*read_cluster_positions(input_file_path), \
+                                    neighbour_cutoff=args.neighbourcutoff, \
+                                    box=read_box(args.config))
+
+    length_df.to_csv(output_file_path, float_format='%.8f', header=True, index=None, sep="\t")
+
+if __name__=="__main__":
+    main(sys.argv[1:])
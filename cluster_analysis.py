@@ -1,54 +1,93 @@
 from data_class import Data
+import argparse
+import numpy as np
 import pandas as pd
+import sys
+
+def calc_cluster_statistics(df):
+	"""Cluster statistics of every cluster in a frame at once
+
+	Rows are sorted on the cluster column once (np.unique), then each count
+	is a np.unique over (cluster, ...) int64 keys followed by a bincount over
+	the cluster index. Same definitions as the Cluster methods.
+
+	Returns: Pandas dataframe with one row per cluster
+	"""
+	cluster_ids, cluster_idx = np.unique(df['cluster'].to_numpy(), return_inverse=True)
+	n_clusters = cluster_ids.shape[0]
+
+	identity = df['identity'].to_numpy(dtype=np.int64)
+	fiber1 = df['fiber1'].to_numpy(dtype=np.int64)
+	fiber2 = df['fiber2'].to_numpy(dtype=np.int64)
+	cos_angle = df['cos_angle'].to_numpy(dtype=np.float64)
+
+	def count_per_cluster(cluster_of_key):
+		return np.bincount(cluster_of_key, minlength=n_clusters)
+
+	if n_clusters > 0:
+		min_fil_id = min(fiber1.min(), fiber2.min())
+		num_fil_ids = max(fiber1.max(), fiber2.max()) - min_fil_id + 1
+		min_couple_id = identity.min()
+		num_couple_ids = identity.max() - min_couple_id + 1
+	else:
+		min_fil_id = num_fil_ids = min_couple_id = num_couple_ids = 1
+
+	# Filaments: unique (cluster, fiber) over both hands
+	fil_keys = np.unique(np.concatenate([ cluster_idx * num_fil_ids + (fiber1 - min_fil_id), \
+										  cluster_idx * num_fil_ids + (fiber2 - min_fil_id) ]))
+	num_fils = count_per_cluster(fil_keys // num_fil_ids)
+
+	# Couples: first row of each (cluster, identity)
+	_, first_idx = np.unique(cluster_idx * num_couple_ids + (identity - min_couple_id), return_index=True)
+	num_couples = count_per_cluster(cluster_idx[first_idx])
+	num_parallel_fil_pairs = np.bincount(cluster_idx[first_idx], weights=(cos_angle[first_idx] > 0), minlength=n_clusters).astype(np.int64)
+	num_antiparallel_fil_pairs = num_couples - num_parallel_fil_pairs
+
+	# Filament pairs: unique (cluster, fiber1, fiber2), with the sign of cos_angle in the lowest bit
+	parallel = cos_angle > 0
+	signed = parallel | (cos_angle <= 0)
+
+	pair_keys = (cluster_idx * num_fil_ids + (fiber1 - min_fil_id)) * num_fil_ids + (fiber2 - min_fil_id)
+	pairs_per_cluster = num_fil_ids * num_fil_ids
+
+	num_unique_fil_pairs = count_per_cluster(np.unique(pair_keys) // pairs_per_cluster)
+
+	sign_keys = np.unique(2*pair_keys[signed] + parallel[signed])
+	sign_cluster_idx = (sign_keys >> 1) // pairs_per_cluster
+	num_parallel_fils = np.bincount(sign_cluster_idx, weights=(sign_keys & 1), minlength=n_clusters).astype(np.int64)
+	num_antiparallel_fils = count_per_cluster(sign_cluster_idx) - num_parallel_fils
+
+	with np.errstate(divide='ignore', invalid='ignore'):
+		output = {'cluster':	cluster_ids, \
+				  'Nf':		num_fils, \
+				  'Nc':		num_couples, \
+				  'Rcf':	num_couples / num_fils, \
+				  'Npc':		num_parallel_fil_pairs, \
+				  'Rpc':	num_parallel_fil_pairs / num_couples, \
+				  'Nac':		num_antiparallel_fil_pairs, \
+				  'Rac':	num_antiparallel_fil_pairs / num_couples,\
+				  'Nufp':		num_unique_fil_pairs,\
+				  'Npf':		num_parallel_fils,\
+				  'Rpf':	num_parallel_fils / num_unique_fil_pairs,\
+				  'Naf':		num_antiparallel_fils,\
+				  'Raf':	num_antiparallel_fils / num_unique_fil_pairs}
+
+	return pd.DataFrame(output)
 
 class Cluster(Data):
-	def __init__(self, column_list=[]):
-		super().__init__(column_list=column_list)
-		if (self.args.largest == True) and ('cluster' in self.temp_dataframe.columns) :
-			self.largest_cluster_id = self.get_largest_cluster_id() ;
-			self.get_target_cluster_data()
+	def __init__(self, column_list=[], argv=sys.argv[1:]):
+		super().__init__(argv=argv, column_list=column_list)
 
-		self.total_num_fils = self.get_num_fils()
-		self.total_num_couples = self.get_num_couples()
-		self.ratio_couples_to_fils = self.total_num_couples / self.total_num_fils
-
-		(self.num_parallel_fil_pairs, self.num_antiparallel_fil_pairs) = self.get_num_parallel_fil_pairs()
-		self.ratio_parallel_fil_pairs = self.num_parallel_fil_pairs / self.total_num_couples
-		self.ratio_antiparallel_fil_pairs = self.num_antiparallel_fil_pairs / self.total_num_couples
+	def get_args(self, argv):
+		super().get_args(argv)
 
-		(self.num_parallel_fils, self.num_antiparallel_fils, self.num_unique_fil_pairs) = self.count_parallel_fils()
-		self.ratio_parallel_fils = self.num_parallel_fils / self.num_unique_fil_pairs
-		self.ratio_antiparallel_fils = self.num_antiparallel_fils / self.num_unique_fil_pairs
-
-		output = {'time':		 self.time, \
-				  'N_f':		self.total_num_fils, \
-				  'N_c':		self.total_num_couples, \
-				  'N_c:N_f':	self.ratio_couples_to_fils, \
-				  'N_pc':		self.num_parallel_fil_pairs, \
-				  'N_pc:N_c':	self.ratio_parallel_fil_pairs, \
-				  'N_ac':		self.num_antiparallel_fil_pairs, \
-				  'N_ac:N_c':	self.ratio_antiparallel_fil_pairs,\
-				  'N_ufp':		self.num_unique_fil_pairs,\
-				  'N_pf':		self.num_parallel_fils,\
-				  'N_pf:N_ufp':	self.ratio_parallel_fils,\
-				  'N_af':		self.num_antiparallel_fils,\
-				  'N_af:N_ufp':	self.ratio_antiparallel_fils}
-
-		self.output_df = pd.DataFrame([output])
-
-		self.write_output_file()
+		self.parser.add_argument('--allclusters', '-a', default=False, action=argparse.BooleanOptionalAction, help='calculate the statistics of every cluster in the frame, one output line per cluster')
 
-		#self.delete_temp_file()
+	def get_cluster_predicates(self):
+		if self.args.allclusters:
+			return []
 
-
-	def get_largest_cluster_id(self):
-		return self.temp_dataframe['cluster'].mode().values[0]
-
-	def get_target_cluster_data(self):
-		for cluster_id, df_cluster in self.temp_dataframe.groupby('cluster'):
-			if cluster_id == self.largest_cluster_id:
-				self.temp_dataframe = df_cluster
-				self.write_temp_dataframe()
+		return super().get_cluster_predicates()
 
 	def get_num_fils(self):
 		fiber_ids_df = pd.concat([self.temp_dataframe['fiber1'], self.temp_dataframe['fiber2']], ignore_index=True)
@@ -61,31 +100,61 @@ class Cluster(Data):
 		return len(couple_ids_df.drop_duplicates())
 
 	def get_num_parallel_fil_pairs(self):
-		num_parallel_fil_pairs = 0
-		num_antiparallel_fil_pairs = 0
+		"""Count couples linking parallel (cos_angle > 0) and antiparallel
+		filaments, using the first row of each couple"""
+		_, first_idx = np.unique(self.temp_dataframe['identity'].to_numpy(), return_index=True)
+		cos_angle = self.temp_dataframe['cos_angle'].to_numpy()[first_idx]
 
-		for couple_id, df_couple in self.temp_dataframe.groupby('identity'):
-			if df_couple['cos_angle'].values[0] > 0:
-				num_parallel_fil_pairs += 1
-			else:
-				num_antiparallel_fil_pairs += 1
+		num_parallel_fil_pairs = int(np.count_nonzero(cos_angle > 0))
+		num_antiparallel_fil_pairs = first_idx.shape[0] - num_parallel_fil_pairs
 
 		return (num_parallel_fil_pairs, num_antiparallel_fil_pairs)
 
 	def count_parallel_fils(self):
-		num_parallel_fils = 0
-		num_antiparallel_fils = 0
-		num_unique_fil_pairs = 0
+		"""Count unique (fiber1, fiber2) pairs, and the unique pairs linked by
+		at least one couple with cos_angle > 0 (parallel) or <= 0 (antiparallel).
+
+		Each pair is encoded as one int64 key, with the sign of cos_angle in the
+		lowest bit, so a single np.unique over the keys gives all three counts.
+		"""
+		fiber1 = self.temp_dataframe['fiber1'].to_numpy(dtype=np.int64)
+		fiber2 = self.temp_dataframe['fiber2'].to_numpy(dtype=np.int64)
+		cos_angle = self.temp_dataframe['cos_angle'].to_numpy(dtype=np.float64)
+
+		if fiber1.shape[0] == 0:
+			return (0, 0, 0)
+
+		# NaN angles are neither parallel nor antiparallel, but still a pair
+		parallel = cos_angle > 0
+		antiparallel = cos_angle <= 0
+
+		min_fil_id = min(fiber1.min(), fiber2.min())
+		num_fil_ids = max(fiber1.max(), fiber2.max()) - min_fil_id + 1
+
+		pair_keys = (fiber1 - min_fil_id) * num_fil_ids + (fiber2 - min_fil_id)
 
-		for fil1_id, df_fil1 in self.temp_dataframe.groupby('fiber1'):
-			num_parallel_fils += len(df_fil1['fiber2'][df_fil1['cos_angle']>0].drop_duplicates())
-			num_antiparallel_fils += len(df_fil1['fiber2'][df_fil1['cos_angle']<= 0].drop_duplicates())
+		sign_keys = np.unique(2*pair_keys[parallel | antiparallel] + parallel[parallel | antiparallel])
 
-			num_unique_fil_pairs += len(df_fil1['fiber2'].drop_duplicates())
+		num_parallel_fils = int(np.count_nonzero(sign_keys & 1))
+		num_antiparallel_fils = sign_keys.shape[0] - num_parallel_fils
+
+		if (parallel | antiparallel).all():
+			num_unique_fil_pairs = np.unique(sign_keys >> 1).shape[0]
+		else:
+			num_unique_fil_pairs = np.unique(pair_keys).shape[0]
 
 		return (num_parallel_fils, num_antiparallel_fils, num_unique_fil_pairs)
 
-	def analyze_cluster(self):
+	def calc_cluster_stats(self):
+		"""Returns: Pandas dataframe with the statistics of the selected cluster,
+		or one row per cluster with --allclusters
+		"""
+		if self.args.allclusters:
+			output_df = calc_cluster_statistics(self.temp_dataframe)
+			output_df.insert(0, 'time', self.time)
+
+			return output_df
+
 		self.total_num_fils = self.get_num_fils()
 		self.total_num_couples = self.get_num_couples()
 		self.ratio_couples_to_fils = self.total_num_couples / self.total_num_fils
@@ -112,12 +181,16 @@ class Cluster(Data):
 				  'Naf':		self.num_antiparallel_fils,\
 				  'Raf':	self.ratio_antiparallel_fils}
 
-		self.output_df = pd.DataFrame([output])
+		return pd.DataFrame([output])
+
+	def analyze_cluster(self):
+		self.output_df = self.calc_cluster_stats()
 
 		self.write_output_file()
 
 
-column_list = ['identity', 'fiber1', 'fiber2', 'cos_angle', 'cluster']
-myCluster = Cluster(column_list)
-myCluster.analyze_cluster()
-del myCluster
+if __name__=="__main__":
+	column_list = ['cluster', 'identity', 'fiber1', 'fiber2', 'cos_angle']
+	myCluster = Cluster(column_list)
+	myCluster.analyze_cluster()
+	del myCluster
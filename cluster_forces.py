@@ -0,0 +1,92 @@
+from data_class import Data
+from force_vectors import hand_force_vectors
+
+import numpy as np
+import pandas as pd
+import sys
+
+def calc_cluster_forces(df):
+	"""Force dipole of every cluster in a link report
+
+	All clusters are reduced at once with bincount over the cluster index.
+
+	The two hands of a couple exert equal and opposite forces along the
+	line joining them, so the net force and net torque of every cluster
+	are exactly zero and are not reported. Since the net force vanishes,
+	the dipole does not depend on the origin; each couple of tension f and
+	length L along the unit vector u adds -f*L*u_a*u_b.
+
+	Dxx, Dxy, Dyx, Dyy: force dipole tensor sum(r_a F_b) over all hands,
+	(proportional to the cluster stress, negative trace -> contractile)
+
+	fx1_sum, fy1_sum: sum of the hand 1 forces (the hand 2 sums are their
+	opposites)
+
+	Returns: Pandas dataframe with one row per cluster
+	"""
+	# One row per couple, as with groupby('identity')
+	df = df.drop_duplicates('identity')
+
+	cluster_ids, cluster_idx = np.unique(df['cluster'].to_numpy(), return_inverse=True)
+	n_clusters = cluster_ids.shape[0]
+
+	def cluster_sum(values):
+		return np.bincount(cluster_idx, weights=values, minlength=n_clusters)
+
+	(fx1, fy1, fx2, fy2) = hand_force_vectors(df)
+
+	x1 = df['pos1X'].to_numpy(dtype=np.float64)
+	y1 = df['pos1Y'].to_numpy(dtype=np.float64)
+	x2 = df['pos2X'].to_numpy(dtype=np.float64)
+	y2 = df['pos2Y'].to_numpy(dtype=np.float64)
+
+	n_couples = np.bincount(cluster_idx, minlength=n_clusters)
+
+	# Centroid of the hand positions (2 hands per couple)
+	cx = cluster_sum(x1 + x2) / (2*n_couples)
+	cy = cluster_sum(y1 + y2) / (2*n_couples)
+
+	output = {'cluster':	cluster_ids, \
+			  'n_couples':	n_couples, \
+			  'cx':			cx, \
+			  'cy':			cy, \
+			  'fx1_sum':	cluster_sum(fx1), \
+			  'fy1_sum':	cluster_sum(fy1), \
+			  'Dxx':		cluster_sum(x1*fx1 + x2*fx2), \
+			  'Dxy':		cluster_sum(x1*fy1 + x2*fy2), \
+			  'Dyx':		cluster_sum(y1*fx1 + y2*fx2), \
+			  'Dyy':		cluster_sum(y1*fy1 + y2*fy2)}
+
+	return pd.DataFrame(output)
+
+class ClusterForces(Data):
+	def __init__(self, column_list, argv=sys.argv[1:]):
+		super().__init__(argv=argv, column_list=column_list)
+
+	def get_args(self, argv):
+		super().get_args(argv)
+
+		# All clusters by default, --largest or --cluster restrict to one
+		self.parser.set_defaults(largest=False)
+
+	def analyze_forces(self):
+		self.output_df = calc_cluster_forces(self.temp_dataframe)
+		self.write_output_file()
+
+	def get_file_paths(self):
+		super().get_file_paths()
+
+		if not self.args.ofile:
+			output_file_path = self.file_dict["input"]["path"].with_suffix(".cluster_forces.dat")
+			self.file_dict["output"] = {"name": output_file_path.name, "path": output_file_path}
+
+	def write_output_file(self):
+		self.output_df.to_csv(self.file_dict["output"]["path"], float_format='%.8f', header=True, index=None, sep="\t")
+
+
+if __name__=="__main__":
+	column_list = [ 'cluster', 'identity', 'force', 'pos1X', 'pos1Y', 'pos2X', 'pos2Y' ]
+
+	myClusterForces = ClusterForces(column_list)
+	myClusterForces.analyze_forces()
+	del myClusterForces
@@ -0,0 +1,135 @@
+import os
+import sys
+import argparse
+from pathlib import Path
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from simulation_class import Simulation
+from cluster_analysis import Cluster
+from frame_manifest import FrameManifest
+
+def calc_frame_cluster_stats(task):
+    """Worker: Cluster statistics of one frame file
+
+    Returns: (frame file path, frame time, Pandas dataframe)
+    """
+    (file_path, column_list, cluster_argv) = task
+
+    myCluster = Cluster(column_list, argv=['--ifile', str(file_path)] + cluster_argv)
+
+    if myCluster.temp_dataframe.shape[0] > 0:
+        output_df = myCluster.calc_cluster_stats()
+    else:
+        output_df = pd.DataFrame({'time': [myCluster.time]})
+
+    time = myCluster.time
+
+    del myCluster
+
+    return (file_path, time, output_df)
+
+class ClusterTimeSeries(Simulation):
+    """Cluster statistics (cluster_analysis.py) for every frame of a simulation,
+    evaluated in a process pool and written as one time-indexed table.
+
+    A manifest of the processed frame files is kept next to the output file,
+    so a rerun only processes new or modified frames.
+    """
+    def __init__(self, argv=sys.argv[1:], column_list=['cluster', 'identity', 'fiber1', 'fiber2', 'cos_angle']):
+        super().__init__(argv=argv, column_list=column_list)
+
+        self.output_file_path = Path(self.args.ofile)
+        self.manifest = FrameManifest(self.output_file_path.with_name(self.output_file_path.name + '.manifest'))
+
+        self.output_df = pd.DataFrame()
+
+    def get_args(self, argv):
+        super().get_args(argv)
+
+        self.parser.add_argument('--allclusters', default=False, action=argparse.BooleanOptionalAction, help='statistics of every cluster of each frame, one line per cluster')
+        self.parser.add_argument('--largest', default=True, action=argparse.BooleanOptionalAction, help='statistics of the largest cluster of each frame')
+        self.parser.add_argument('--nproc', '-n', type=int, default=os.cpu_count(), help='number of worker processes')
+
+        self.parser.set_defaults(ofile='cluster_stats.dat')
+
+    def load_config_params(self):
+        # Motor parameters are not needed for the cluster statistics
+        pass
+
+    def load_simulation_data(self):
+        return None
+
+    def load_frame_data(self):
+        # Frames are analyzed by the worker processes in calc_time_series()
+        return [], []
+
+    def get_cluster_argv(self):
+        if self.args.allclusters:
+            return ['--allclusters']
+        elif self.args.largest:
+            return ['--largest']
+        else:
+            return ['--no-largest']
+
+    def load_previous_output(self):
+        if os.path.isfile(self.output_file_path) and os.path.getsize(self.output_file_path) > 0:
+            return pd.read_csv(self.output_file_path, sep="\t")
+
+        return pd.DataFrame()
+
+    def calc_time_series(self):
+        cluster_argv = self.get_cluster_argv()
+        options = ' '.join(cluster_argv)
+
+        previous_df = self.load_previous_output()
+
+        frame_keys = set(FrameManifest.file_key(path) for path in self.frame_filepath_list)
+        pending_paths = [ path for path in self.frame_filepath_list \
+                          if not self.manifest.is_current(path, options) ]
+
+        # Rows of modified or deleted frames are dropped from the previous output
+        stale_times = [ self.manifest.get_time(path) for path in pending_paths ]
+        for file_key in self.manifest.files():
+            if file_key not in frame_keys:
+                stale_times.append(self.manifest.get_time(file_key))
+                self.manifest.remove(file_key)
+
+        stale_times = np.round(np.array([ t for t in stale_times if t is not None ], dtype=np.float64), 6)
+
+        if previous_df.shape[0] > 0:
+            previous_df = previous_df[~np.isin(np.round(previous_df['time'].to_numpy(dtype=np.float64), 6), stale_times)]
+
+        tasks = [ (path, self.column_list, cluster_argv) for path in pending_paths ]
+
+        if self.args.nproc > 1 and len(tasks) > 1:
+            with Pool(self.args.nproc) as pool:
+                results = list(pool.imap_unordered(calc_frame_cluster_stats, tasks, \
+                                                   chunksize=max(1, len(tasks) // (4*self.args.nproc))))
+        else:
+            results = [ calc_frame_cluster_stats(task) for task in tasks ]
+
+        for (path, time, output_df) in results:
+            self.manifest.record(path, time, options)
+
+        self.output_df = pd.concat([previous_df] + [ output_df for (_, _, output_df) in results ], ignore_index=True)
+
+        sort_columns = [ col for col in ['time', 'cluster'] if col in self.output_df.columns ]
+        if sort_columns:
+            self.output_df = self.output_df.sort_values(by=sort_columns, kind='stable', ignore_index=True)
+
+        return self.output_df
+
+    def write_output(self):
+        self.output_df.to_csv(self.output_file_path, float_format='%.8f', header=True, index=None, sep="\t")
+        self.manifest.save()
+
+if __name__=="__main__":
+    myClusterTimeSeries = ClusterTimeSeries()
+
+    myClusterTimeSeries.calc_time_series()
+    myClusterTimeSeries.write_output()
+
+    del myClusterTimeSeries
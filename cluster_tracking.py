@@ -0,0 +1,186 @@
+"""Follow clusters from frame to frame and record their lineage.
+
+Cytosim cluster ids are not stable between frames, so clusters of
+consecutive frames are matched by the filaments they share. Overlaps are
+counted from the sorted filament ids of the two frames (sparse
+intersection counts, one np.unique over (previous, current) cluster pairs).
+
+A current cluster continues the track of a previous cluster if each is the
+other's best match (largest overlap), otherwise it starts a new track.
+Merge and split events are recorded whenever a cluster overlaps more than
+one cluster of the other frame.
+
+Usage:
+python cluster_tracking.py -i cluster_fiber_position.txt
+python cluster_tracking.py -i link_cluster.txt --members fiber1,fiber2
+
+Output:
+<ifile>.tracks.dat  frame, time, cluster, track, size
+<ifile>.lineage.dat time, event, parent, child, overlap
+"""
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from frame_reader import iter_report_frames
+
+def best_match(rows, cols, counts):
+    """For each distinct row, the col with the largest count (ties: smallest col)
+
+    Returns: (rows, best cols, best counts)
+    """
+    order = np.lexsort((cols, -counts, rows))
+    rows = rows[order]
+
+    first = np.r_[True, rows[1:] != rows[:-1]] if rows.shape[0] else np.array([], dtype=bool)
+
+    return rows[first], cols[order][first], counts[order][first]
+
+class ClusterTracker():
+    """Assign persistent track ids to clusters, one frame at a time.
+
+    Only the members of the previous frame are kept, so memory does not
+    grow with the number of frames.
+    """
+    def __init__(self, min_overlap=1):
+        self.min_overlap = min_overlap
+
+        self.prev_members = None # sorted member ids of the previous frame
+        self.prev_cluster_idx = None # cluster index of each member
+        self.prev_tracks = None # track id of each cluster of the previous frame
+        self.prev_time = None
+        self.next_track = 1
+
+    def new_tracks(self, n):
+        tracks = np.arange(self.next_track, self.next_track + n, dtype=np.int64)
+        self.next_track += n
+
+        return tracks
+
+    def update(self, time, cluster_ids, members):
+        """Match the clusters of a new frame to the previous frame
+
+        cluster_ids, members: one entry per (cluster, member) row
+
+        Returns: (tracks_df, lineage_df) for this frame
+        """
+        cluster_ids = np.asarray(cluster_ids)
+        members = np.asarray(members)
+
+        # A member belongs to a single cluster: keep its first row
+        members, first_idx = np.unique(members, return_index=True)
+        cluster_ids = cluster_ids[first_idx]
+
+        cluster_list, cluster_idx = np.unique(cluster_ids, return_inverse=True)
+        sizes = np.bincount(cluster_idx, minlength=cluster_list.shape[0])
+        n_clusters = cluster_list.shape[0]
+
+        tracks = np.zeros(n_clusters, dtype=np.int64)
+        lineage = []
+
+        if self.prev_members is None:
+            tracks[:] = self.new_tracks(n_clusters)
+            lineage += [ (time, 'birth', -1, track, 0) for track in tracks ]
+        else:
+            n_prev = self.prev_tracks.shape[0]
+
+            # Sparse overlap matrix between previous and current clusters
+            _, prev_idx, cur_idx = np.intersect1d(self.prev_members, members, assume_unique=True, return_indices=True)
+
+            pair_keys = self.prev_cluster_idx[prev_idx].astype(np.int64) * n_clusters + cluster_idx[cur_idx]
+            pair_keys, overlap = np.unique(pair_keys, return_counts=True)
+
+            significant = overlap >= self.min_overlap
+            pair_keys = pair_keys[significant]
+            overlap = overlap[significant]
+
+            pair_prev = pair_keys // n_clusters
+            pair_cur = pair_keys % n_clusters
+
+            (succ_prev, succ_cur, _) = best_match(pair_prev, pair_cur, overlap)
+            (pred_cur, pred_prev, _) = best_match(pair_cur, pair_prev, overlap)
+
+            best_successor = np.full(n_prev, -1, dtype=np.int64)
+            best_successor[succ_prev] = succ_cur
+
+            # Mutual best matches continue the previous track
+            continued = best_successor[pred_prev] == pred_cur
+
+            has_track = np.zeros(n_clusters, dtype=bool)
+            tracks[pred_cur[continued]] = self.prev_tracks[pred_prev[continued]]
+            has_track[pred_cur[continued]] = True
+
+            tracks[~has_track] = self.new_tracks(np.count_nonzero(~has_track))
+
+            n_predecessors = np.bincount(pair_cur, minlength=n_clusters)
+            n_successors = np.bincount(pair_prev, minlength=n_prev)
+
+            for (p, c, n) in zip(pair_prev.tolist(), pair_cur.tolist(), overlap.tolist()):
+                parent = int(self.prev_tracks[p])
+                child = int(tracks[c])
+
+                if n_predecessors[c] > 1:
+                    lineage.append((time, 'merge', parent, child, n))
+                if n_successors[p] > 1:
+                    lineage.append((time, 'split', parent, child, n))
+
+            for c in np.flatnonzero(n_predecessors == 0).tolist():
+                lineage.append((time, 'birth', -1, int(tracks[c]), 0))
+            for p in np.flatnonzero(n_successors == 0).tolist():
+                lineage.append((self.prev_time, 'death', int(self.prev_tracks[p]), -1, 0))
+
+        self.prev_members = members
+        self.prev_cluster_idx = cluster_idx
+        self.prev_tracks = tracks
+        self.prev_time = time
+
+        tracks_df = pd.DataFrame({'time': time, \
+                                  'cluster': cluster_list, \
+                                  'track': tracks, \
+                                  'size': sizes})
+
+        lineage_df = pd.DataFrame(lineage, columns=['time', 'event', 'parent', 'child', 'overlap'])
+
+        return tracks_df, lineage_df
+
+def get_args(argv):
+    parser = argparse.ArgumentParser(description='track clusters between frames by shared filaments')
+
+    parser.add_argument('--ifile', '-i', type=str, help='multi-frame report with a cluster column')
+    parser.add_argument('--members', '-m', type=str, default='fiber_id', help='comma separated member column(s), e.g. fiber_id or fiber1,fiber2')
+    parser.add_argument('--minoverlap', type=int, default=1, help='minimum number of shared filaments for two clusters to be linked')
+
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = get_args(argv)
+
+    member_columns = args.members.split(',')
+    input_file_path = Path(args.ifile)
+
+    tracks_file_path = input_file_path.with_suffix('.tracks.dat')
+    lineage_file_path = input_file_path.with_suffix('.lineage.dat')
+
+    myTracker = ClusterTracker(min_overlap=args.minoverlap)
+
+    first_frame = True
+
+    for block, frame_df in iter_report_frames(input_file_path, column_list=['cluster'] + member_columns):
+        cluster_ids = np.concatenate([ frame_df['cluster'].to_numpy() for col in member_columns ])
+        members = np.concatenate([ frame_df[col].to_numpy() for col in member_columns ])
+
+        tracks_df, lineage_df = myTracker.update(block.time, cluster_ids, members)
+        tracks_df.insert(0, 'frame', block.frame)
+
+        # Write frame by frame, so memory does not grow with the run length
+        mode = 'w' if first_frame else 'a'
+        tracks_df.to_csv(tracks_file_path, header=first_frame, index=None, sep="\t", mode=mode)
+        lineage_df.to_csv(lineage_file_path, header=first_frame, index=None, sep="\t", mode=mode)
+
+        first_frame = False
+
+if __name__=="__main__":
+    main(sys.argv[1:])
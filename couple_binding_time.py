@@ -1,157 +1,114 @@
-from data_class import Data
-import numpy as np
-import pandas as pd
-import sys
-
-class BindingTime(Data):
-    def __init__(self, column_list, argv=sys.argv[1:]):
-        super().__init__(column_list=column_list,argv=argv)
-
-        self.output_df = pd.DataFrame()
-
-
-if __name__=="__main__":
-    column_list = ['identity']
-    # Need to implement reading multiple frames from single input file
+"""Binding times of the couples, from a multi-frame report of the bound couples.
 
-    # Prototype code
-    with open("links.txt", 'r') as input_file:
+The report is generated using the Cytosim report function:
+report couple:link links.txt
 
-        temp_file = open("temp.txt", 'w')
+The bound intervals of every couple are extracted with binding_intervals.py
+and their durations are fitted with an exponential distribution
+A*exp(-K*t).
 
-        data_list = []
-        frame_dict = {}
+Usage:
+python couple_binding_time.py 0.1
+python couple_binding_time.py 0.1 -i links.txt --nocensored
+python couple_binding_time.py 0.1 -i links.txt --stream
 
-        for line in input_file:
+With --stream, the report is read in a single pass and only the couples
+bound in the current frame are kept in memory (frames must be in time
+order in the report).
 
-            if not "% end" in line:
-                if not (line.isspace() or ("%" in line and (not column_list[-1] in line))):
-                    temp_file.write(line.replace("%",""))
-                if "time" in line:
-                    frame_dict['time'] = np.float64(line.split()[-1])
-                if "frame" in line:
-                    frame_dict['frame'] = np.float64(line.split()[-1])
-            else:
-                # Stop writing to temp file
-                temp_file.close()
-
-                # Process frame
-                argv = ['-i', 'temp.txt']
-
-                myBindingTime = BindingTime(column_list, argv=argv)
-
-                bound_couples_list = myBindingTime.temp_dataframe.identity.tolist()
-
-                frame_dict['data'] = bound_couples_list
-
-                data_list.append(frame_dict)
+Output:
+<ifile>.intervals.dat couple, start, end, n_frames, duration, left_censored, right_censored
+"""
+import sys
+import argparse
+from pathlib import Path
 
-                frame_dict = {}
-                # Start new temp file for next frame
-                temp_file = open("temp.txt", 'w')
-        temp_file.close()
+import numpy as np
 
-        ### Process all frame data - calculate bind time
+from binding_intervals import read_bound_ids, occupancy_matrix, extract_intervals, summarize_bind_times, \
+                              interval_columns, missing_dt_message, BindingIntervalTracker, BindTimeAccumulator, iter_binding_intervals
+from frame_reader import ChunkedWriter
 
-        # get all unique couple ids
+def get_args(argv):
+    parser = argparse.ArgumentParser(description='binding times of the couples, with an exponential fit')
 
+    parser.add_argument('dt', type=float, nargs='?', default=None, help='time between frames (default: from the frame times)')
+    parser.add_argument('--ifile', '-i', type=str, default='links.txt', help='(multi-frame) report of the bound couples')
+    parser.add_argument('--ofile', '-o', type=str, default=None, help='output file of the intervals (default: input file with suffix .intervals.dat)')
+    parser.add_argument('--nocensored', action='store_true', help='leave out the intervals bound in the first or last frame')
+    parser.add_argument('--bins', type=int, default=100, help='number of histogram bins of the fit')
+    parser.add_argument('--stream', action='store_true', help='single pass over the report, without holding all frames in memory')
+    parser.add_argument('--chunkrows', type=int, default=100000, help='with --stream: number of intervals buffered before the output file is appended to')
+    parser.add_argument('--plot', action='store_true', help='plot the histogram and the fit (needs matplotlib)')
 
-        all_couples = []
-        frame_t = []
+    return parser.parse_args(argv)
 
-        for frame in data_list:
-            all_couples.append(frame['data'])
-            frame_t.append(frame['time'])
+def calc_stats(input_file_path, output_file_path, args):
+    """All frames in memory
 
-        all_couples_flat = [item for sublist in all_couples for item in sublist]
-        
-        unique_couples = np.unique(np.array(all_couples_flat))
+    Returns: (stats, histogram counts, histogram bins, number of frames)
+    """
+    (times, id_arrays) = read_bound_ids(input_file_path)
+    interval_df = extract_intervals(*occupancy_matrix(id_arrays), times, dt=args.dt)
 
-        # Calculate time step between frames
+    interval_df.to_csv(output_file_path, float_format='%.8f', header=True, index=None, sep="\t")
 
-        #dt = sorted(frame_t)[-1]-sorted(frame_t)[-2]
+    if args.nocensored:
+        interval_df = interval_df[~(interval_df.left_censored | interval_df.right_censored)]
 
-        dt = np.float64(sys.argv[1]) # time between frames
+    bind_times = interval_df['duration'].to_numpy(dtype=np.float64)
+    counts, bins = np.histogram(bind_times, bins=args.bins)
 
-        # find in which frames each of the ids appears
-        # make sure frames are in correct order!
+    return summarize_bind_times(bind_times, bins=args.bins), counts, bins, times.shape[0]
 
-        all_bind_times = []
+def calc_stats_stream(input_file_path, output_file_path, args):
+    """One frame at a time, same statistics as calc_stats(). The intervals
+    file has the same rows, in the order the intervals end (sorting them by
+    couple would need all intervals in memory)"""
+    tracker = BindingIntervalTracker(args.dt)
+    accumulator = BindTimeAccumulator(include_censored=not args.nocensored)
+    writer = ChunkedWriter(output_file_path, interval_columns, chunk_rows=args.chunkrows, float_format='%.8f')
 
-        for cid in unique_couples:
-            cid_list = []
-            for frame in data_list:            
-                if cid in frame['data']:
-                    cid_list.append([frame['time'], 1.0])
-                else:
-                    cid_list.append([frame['time'], 0.0])
+    for interval_df in iter_binding_intervals(input_file_path, tracker):
+        writer.append(interval_df)
+        accumulator.add(interval_df)
 
-            roll_call_str = ''
-            for frame in sorted(cid_list):
-                if frame[-1] == 1.0:
-                    roll_call_str += '1'
-                else: roll_call_str += '0'
+    if tracker.dt is None:
+        raise ValueError(missing_dt_message)
 
-            # split roll_call at 0s
-            bind_seq_list = list(filter(None, roll_call_str.split('0')))
+    writer.flush()
 
-            cid_bind_times = []
+    counts, bins = accumulator.histogram(tracker.dt, bins=args.bins)
 
-            # calculate binding times for each id
-            for bind_seq in bind_seq_list:
-                bind_len = len(bind_seq)
-                bind_time = bind_len*dt
+    return accumulator.summarize(tracker.dt, bins=args.bins), counts, bins, tracker.n_frames
 
-                cid_bind_times.append(bind_time)
-                all_bind_times.append(bind_time)
+def main(argv):
+    args = get_args(argv)
 
-            # calculate average per id
-            cid_bind_time_mean = np.array(cid_bind_times).mean()
-            cid_bind_time_std = np.array(cid_bind_times).std()
+    input_file_path = Path(args.ifile)
+    output_file_path = Path(args.ofile) if args.ofile else input_file_path.with_suffix('.intervals.dat')
 
-            # print(cid, cid_bind_time_mean, cid_bind_time_std)
+    if args.stream:
+        (stats, counts, bins, n_frames) = calc_stats_stream(input_file_path, output_file_path, args)
+    else:
+        (stats, counts, bins, n_frames) = calc_stats(input_file_path, output_file_path, args)
 
-        # calculate overall average
-        bind_time_mean = np.array(all_bind_times).mean()
-        bind_time_std = np.array(all_bind_times).std()
-        bind_time_median = np.median(np.array(all_bind_times))
+    print(f"Number of bind times: N = %d" % (stats['N']))
+    print(f"Number of frames: Nf = %d\n" % (n_frames))
+    print(f"Exponential fit parameters: K = %f, A = %f" % (stats['K'], stats['A']))
+    print(f"Distribution stats: mean = %f, std = %f, med=%f" % (stats['mean'], stats['std'], stats['median']))
+    print(f"Calculated mean: 1/K = %f" % (1/stats['K']))
+    print(f"Calculated median: ln2/K = %f" % (np.log(2)/stats['K']))
 
+    if args.plot:
         import matplotlib.pyplot as plt
 
-        counts, bins = np.histogram(np.array(all_bind_times), bins=100)
-
-        csum = np.float64(np.sum(counts))
-        counts = np.float64(counts) /csum
-        plt.stairs(counts, bins)
-
-        t0 = 0.0
-        c0 = 1.0
-
-        t = bins[:-1]
-
-        counts_nonzero = np.array([ c if c>0 else np.nan for c in counts])
-
-        t = np.insert(t, 0, t0)
-        counts_nonzero = np.insert(counts_nonzero, 0, c0)
-
-        y = np.array([ np.log(c) if (c != np.nan) else np.nan for c in counts_nonzero])
+        plt.stairs(counts / np.sum(counts), bins)
 
-        idx = np.isfinite(t) & np.isfinite(y)
-
-        K, A_log= np.polyfit(t[idx], y[idx], 1)
-
-        A = np.exp(A_log)
-
-        plt.plot(t, A*np.exp(K*t))
+        t = np.insert(bins[:-1], 0, 0.0)
+        plt.plot(t, stats['A']*np.exp(-stats['K']*t))
 
         plt.show()
 
-        print(f"Number of bind times: N = %d" % (len(all_bind_times)))
-        print(f"Number of frames: Nf = %d\n" % (len(data_list)))
-        print(f"Exponential fit parameters: K = %f, A = %f" % (-1*K, A))
-        print(f"Distribution stats: mean = %f, std = %f, med=%f" % (bind_time_mean, bind_time_std, bind_time_median))
-        print(f"Calculated mean: 1/K = %f" % (-1/K))
-        print(f"Calculated median: ln2/K = %f" % (-np.log(2)/K))
-
-
-        
\ No newline at end of file
+if __name__=="__main__":
+    main(sys.argv[1:])
@@ -6,10 +6,16 @@ from pathlib import Path # for stripping filename extensions
 
 import os # for removing files
 
+import re # for parsing row filter expressions
+import operator # for row filter comparisons
+
 import pandas as pd # for processing data file
+import numpy as np
 
 # pd.set_option("display.max_rows", None, "display.max_columns", None)
 
+from frame_index import FrameIndex
+
 import pytest
 
 from pathlib import Path
@@ -20,8 +26,84 @@ class RuntimeArgumentError(ValueError):
 class MultiFrameError(ValueError):
 	pass
 
+class RowPredicate():
+	"""Condition on a single report column, evaluated on each data row while
+	the report is parsed, so that rejected rows are never loaded.
+
+	e.g. RowPredicate('cluster', '==', 3), RowPredicate('class', 'in', {1, 2}),
+	RowPredicate('force', '>', 0.5)
+	"""
+	operators = {'==': operator.eq, \
+				 '!=': operator.ne, \
+				 '<':  operator.lt, \
+				 '<=': operator.le, \
+				 '>':  operator.gt, \
+				 '>=': operator.ge, \
+				 'in': lambda x, values: x in values}
+
+	# https://docs.python.org/3/library/re.html
+	expression_pattern = re.compile(r'^\s*(\w+)\s*(==|!=|<=|>=|<|>|=|\s+in\s+)\s*(.+?)\s*$')
+
+	def __init__(self, column, op, value):
+		if op not in self.operators:
+			raise RuntimeArgumentError("Unknown row filter operator: %s" % op)
+
+		self.column = column
+		self.op = op
+
+		if op == 'in':
+			self.value = frozenset(float(x) for x in value)
+		else:
+			self.value = float(value)
+
+		self.index = None # set by bind()
+
+	@classmethod
+	def from_string(cls, expression):
+		"""Parse a command line filter such as 'force>0.5' or 'class in 1,2'"""
+		match = cls.expression_pattern.match(expression)
+
+		if match is None:
+			raise RuntimeArgumentError("Invalid row filter: %s" % expression)
+
+		column, op, value = match.groups()
+		op = op.strip()
+
+		if op == '=':
+			op = '=='
+
+		if op == 'in':
+			value = value.strip('{}[]()').split(',')
+
+		return cls(column, op, value)
+
+	def bind(self, header):
+		"""Look up the position of the filtered column in the report header"""
+		if self.column not in header:
+			raise RuntimeArgumentError("Row filter column not in report: %s" % self.column)
+
+		self.index = header.index(self.column)
+
+	def __call__(self, fields):
+		return self.operators[self.op](float(fields[self.index]), self.value)
+
+	def mask(self, df):
+		"""Evaluate the condition on a whole dataframe at once
+
+		Returns: boolean array, one entry per row
+		"""
+		values = df[self.column].to_numpy(dtype=np.float64)
+
+		if self.op == 'in':
+			return np.isin(values, list(self.value))
+
+		return self.operators[self.op](values, self.value)
+
+	def __repr__(self):
+		return "RowPredicate(%r, %r, %r)" % (self.column, self.op, self.value)
+
 class Data():
-	def __init__(self, argv=sys.argv[1:], column_list=['class', 'identity']):
+	def __init__(self, argv=sys.argv[1:], column_list=['class', 'identity'], predicates=[]):
 
 		# if (	('--ifile' not in argv) or \
 		#  		('-i' not in argv)) or \
@@ -39,17 +121,24 @@ class Data():
 		self.temp_dataframe = pd.DataFrame()
 		self.column_list = column_list
 		self.time = None # set by preprocess_file()
+		self.target_cluster_id = None # set by get_cluster_predicates()
+
+		# Row filters are applied while parsing, cluster selection included
+		self.predicates = list(predicates) + \
+						  [ RowPredicate.from_string(x) for x in self.args.filter ] + \
+						  self.get_cluster_predicates()
+
 		self.preprocess_file()
+		if self.args.linkclusters:
+			self.assign_link_clusters()
 		self.get_relevant_columns(self.column_list)
 
 		self.output_df = pd.DataFrame()
-		if self.args.cluster is not None:
-			self.target_cluster_id = self.args.cluster
-			self.get_target_cluster_data()
-		elif (self.args.largest == True) and ('cluster' in self.temp_dataframe.columns) :
-			self.largest_cluster_id = self.get_largest_cluster_id() ;
-			self.target_cluster_id = self.largest_cluster_id
-			self.get_target_cluster_data()
+		if self.args.linkclusters:
+			self.select_link_cluster()
+		elif self.target_cluster_id is not None:
+			# Size of the whole cluster, not just of the rows left by --filter
+			self.largest_cluster_size = self.scan_cluster_sizes().get(self.target_cluster_id, 0)
 
 	def __del__(self):
 		self.delete_temp_file()
@@ -68,6 +157,9 @@ class Data():
 		# https://stackoverflow.com/a/31347222
 		self.parser.add_argument('--largest', default=True, action=argparse.BooleanOptionalAction, help='calculate forces exerted by couples attached to filaments beloning to the largest cluster, ignore all other couples')
 		self.parser.add_argument('--cluster', '-c', type=int, default=None, help='optional: provide cluster id for which to calculate data')
+		self.parser.add_argument('--linkclusters', default=False, action=argparse.BooleanOptionalAction, help='replace the report cluster column by clusters of filaments connected by the couples (fiber1, fiber2) of a link report')
+		self.parser.add_argument('--linkfilter', type=str, action='append', default=[], help='optional with --linkclusters: only couples satisfying a condition connect filaments, e.g. "force>0.5" or "cos_angle<0" (can be repeated)')
+		self.parser.add_argument('--filter', '-f', type=str, action='append', default=[], help='optional: only load rows satisfying a condition, e.g. "force>0.5" or "class in 1,2" (can be repeated)')
 
 		
 
@@ -109,10 +201,22 @@ class Data():
 		# Remove blank lines and lines with % (Cytosim comments)
 		# BUT Keep line with column headers
 		# https://stackoverflow.com/a/11969474 , https://stackoverflow.com/a/2369538
+		# Data rows are only written if they satisfy all the row predicates
+		header = None
+
 		with open(self.file_dict["input"]["path"]) as input_file, \
 			 open(self.file_dict["temp"]["path"], 'w') as temp_file:
 			for line in input_file:
 				if not (line.isspace() or ("%" in line and (not self.column_list[-1] in line))):
+					if "%" in line:
+						if header is None:
+							header = line.replace("%","").split()
+							for predicate in self.predicates:
+								predicate.bind(header)
+					elif self.predicates:
+						fields = line.split()
+						if not all(predicate(fields) for predicate in self.predicates):
+							continue
 					temp_file.write(line.replace("%",""))
 				if "time" in line:
 					self.time=float(line.split(' ')[-1])
@@ -128,8 +232,75 @@ class Data():
 		self.temp_dataframe = self.temp_dataframe[column_list]
 		self.write_temp_dataframe()
 
+	def get_cluster_predicates(self):
+		"""Row predicates selecting the cluster requested with --cluster or
+		--largest, so that rows of other clusters are skipped during parsing
+		"""
+		# Link cluster ids are only known once the whole frame is loaded
+		if self.args.linkclusters:
+			return []
+
+		if self.args.cluster is not None:
+			self.target_cluster_id = self.args.cluster
+		elif (self.args.largest == True) and ('cluster' in self.column_list):
+			self.largest_cluster_id = self.get_largest_cluster_id()
+			self.target_cluster_id = self.largest_cluster_id
+
+		if self.target_cluster_id is None:
+			return []
+
+		return [ RowPredicate('cluster', '==', self.target_cluster_id) ]
+
+	def scan_cluster_sizes(self):
+		"""Count the rows of each cluster, from the summary index of the report
+		(frame_index.py). The index is built with a first pass over the cluster
+		column only if the report has no up to date index yet.
+
+		Returns: dict of cluster id -> number of rows
+		"""
+		summary = FrameIndex.load_or_build(self.file_dict["input"]["path"]).get_frame()
+
+		if summary is None:
+			return {}
+
+		return summary.cluster_sizes
+
 	def get_largest_cluster_id(self):
-		return self.temp_dataframe['cluster'].mode().values[0]
+		"""Cheap first pass over the cluster column, ties go to the smallest id
+		(same as DataFrame.mode())
+		"""
+		cluster_sizes = self.scan_cluster_sizes()
+
+		if not cluster_sizes:
+			return None
+
+		return min(cluster_sizes, key=lambda cluster_id: (-cluster_sizes[cluster_id], cluster_id))
+
+	def assign_link_clusters(self):
+		"""Overwrite (or add) the cluster column with connected components of
+		the filaments linked by couples, see link_components.py"""
+		from link_components import link_cluster_column
+
+		for col in ['fiber1', 'fiber2']:
+			if col not in self.temp_dataframe.columns:
+				raise RuntimeArgumentError("--linkclusters needs a link report with fiber1 and fiber2 columns")
+
+		edge_mask = np.ones(self.temp_dataframe.shape[0], dtype=bool)
+		for expression in self.args.linkfilter:
+			edge_mask &= RowPredicate.from_string(expression).mask(self.temp_dataframe)
+
+		self.temp_dataframe['cluster'] = link_cluster_column(self.temp_dataframe, edge_mask)
+
+	def select_link_cluster(self):
+		if self.args.cluster is not None:
+			self.target_cluster_id = self.args.cluster
+		elif (self.args.largest == True) and ('cluster' in self.temp_dataframe.columns):
+			self.largest_cluster_id = self.temp_dataframe['cluster'].mode().values[0]
+			self.target_cluster_id = self.largest_cluster_id
+		else:
+			return
+
+		self.get_target_cluster_data()
 
 	def get_target_cluster_data(self):
 		for cluster_id, df_cluster in self.temp_dataframe.groupby('cluster'):
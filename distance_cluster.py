@@ -0,0 +1,78 @@
+"""Cluster filaments by the distance between their centers.
+
+Two filaments belong to the same cluster if they are connected by a chain
+of filaments whose centers are closer than the cutoff. Neighbour pairs are
+found with a KD-tree and the clusters are the connected components of the
+neighbour graph, so the clustering is transitive and scales as O(N log N).
+Distances are minimum image distances if the space of config.cym is
+periodic (see neighbours.py).
+
+The position file is generated using the Cytosim report function:
+report fiber:position
+
+Usage:
+python distance_cluster.py -i position.txt --cutoff 0.5
+
+Output:
+<ifile>.distance_cluster.dat identity, posX, posY, cluster, cluster_size
+(clusters numbered 1, 2, ... by decreasing size)
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from data_class import Data
+from link_components import label_components
+from neighbours import neighbour_pairs, read_box
+
+def distance_clusters(positions, cutoff, box=None):
+    """Transitive clusters of points closer than cutoff
+
+    positions: (N, dim) array
+    box: optional periodic box lengths
+
+    Returns: (cluster label of each point, cluster sizes), clusters numbered
+    1, 2, ... by decreasing size
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+
+    (pair_i, pair_j, _) = neighbour_pairs(positions, cutoff, box)
+
+    return label_components(positions.shape[0], pair_i, pair_j)
+
+class DistanceCluster(Data):
+    def __init__(self, argv=sys.argv[1:], column_list=['identity', 'posX', 'posY']):
+        super().__init__(argv=argv, column_list=column_list)
+
+    def get_args(self, argv):
+        super().get_args(argv)
+
+        self.parser.add_argument('--cutoff', type=float, default=0.5, help='maximum distance between the centers of neighbouring filaments (default: twice the filament length of 0.25)')
+        self.parser.add_argument('--config', type=str, default='config.cym', help='Cytosim config file, distances are periodic if its space is periodic')
+
+    def calc_distance_clusters(self):
+        positions = self.temp_dataframe[['posX', 'posY']].to_numpy()
+
+        labels, sizes = distance_clusters(positions, self.args.cutoff, box=read_box(self.args.config))
+
+        self.output_df = self.temp_dataframe.copy()
+        self.output_df['cluster'] = labels
+        self.output_df['cluster_size'] = sizes[labels - 1]
+
+        self.output_df = self.output_df.sort_values(by=['cluster', 'identity'], ignore_index=True)
+
+        return self.output_df
+
+    def write_output_file(self):
+        output_file_path = self.file_dict["output"]["path"].with_suffix('.distance_cluster.dat')
+
+        self.output_df.to_csv(output_file_path, float_format='%.8f', header=True, index=None, sep="\t")
+
+if __name__=="__main__":
+    myDistanceCluster = DistanceCluster()
+
+    myDistanceCluster.calc_distance_clusters()
+    myDistanceCluster.write_output_file()
+
+    del myDistanceCluster
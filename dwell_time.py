@@ -3,6 +3,11 @@ import numpy as np
 import pandas as pd
 import sys
 
+def calc_k_off(forces, unbinding_rate, unbinding_force):
+    """Force dependent unbinding rate k_off = k0*exp(f/f_u), for an array
+    of forces"""
+    return unbinding_rate * np.exp(np.asarray(forces, dtype=np.float64) / unbinding_force)
+
 class DwellTime(Data):
     def __init__(self,  column_list):
         super().__init__(column_list=column_list)
@@ -26,10 +31,8 @@ class DwellTime(Data):
         """Calculate the dwell time for the frame averaged
         over all doubly-bound motors
         """
-        pass
-        # self.unbinding_rate * exp[df['force']/self.unbinding_force]
-        # print(self.couple_force_df)
-        self.output_df = self.temp_dataframe['force'].apply(lambda x: self.unbinding_rate * np.exp(x/self.unbinding_force))
+        self.output_df = pd.Series(calc_k_off(self.temp_dataframe['force'], self.unbinding_rate, self.unbinding_force), \
+                                   index=self.temp_dataframe.index, name='force')
         self.avg_k_off = self.output_df.mean()
         self.avg_dwell_time = 1/self.avg_k_off
         self.avg_force = self.temp_dataframe['force'].mean()
@@ -0,0 +1,156 @@
+"""Force dependent dwell times of the bound couples, for every frame of a run.
+
+The couple report is generated using the Cytosim report function:
+report couple:link links.txt
+
+All frames are read in a single pass, then k_off = k0*exp(f/f_u) is
+computed for every couple of every frame at once (calc_k_off in
+dwell_time.py) and averaged per frame with np.bincount. Frames are kept
+in file order. As in DwellTime, the dwell time of a frame is 1/<k_off>.
+
+With --couples, the dwell time predicted from the forces of each couple is
+compared with its observed binding times, the bound intervals of the
+couple in the same report (binding_intervals.py). The intervals are found
+with the frames in time order.
+
+Usage:
+python dwell_time_series.py -i links.txt --unbindingrate 0.1 --unbindingforce 2.5
+python dwell_time_series.py -i links.txt --unbindingrate 0.1 --unbindingforce 2.5 --couples --nocensored
+
+Output:
+<ifile>.dwell.dat         frame, time, n_couples, mean_force, mean_k_off, dwell_time
+<ifile>.dwell_couples.dat couple, n_samples, mean_force, mean_k_off, predicted_dwell_time,
+                          n_intervals, observed_dwell_time
+"""
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from frame_reader import iter_report_frames
+from dwell_time import calc_k_off
+from binding_intervals import occupancy_matrix, extract_intervals
+
+def read_couple_forces(file_path, column_list=['identity', 'force']):
+    """Read the couple ids and forces of every frame of a couple report
+
+    Returns: (frame numbers, frame times) with one entry per frame, in file
+    order, and (frame index, couples, forces) with one entry per couple and
+    frame
+    """
+    frame_list, time_list, n_rows_list, couple_list, force_list = [], [], [], [], []
+
+    for frame_idx, (block, frame_df) in enumerate(iter_report_frames(file_path, column_list=column_list)):
+        frame_list.append(block.frame if block.frame is not None else frame_idx)
+        time_list.append(block.time if block.time is not None else np.nan)
+        n_rows_list.append(frame_df.shape[0])
+        couple_list.append(frame_df['identity'].to_numpy(dtype=np.int64))
+        force_list.append(frame_df['force'].to_numpy(dtype=np.float64))
+
+    if not frame_list:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    return np.array(frame_list, dtype=np.int64), np.array(time_list, dtype=np.float64), \
+           np.repeat(np.arange(len(frame_list)), n_rows_list), np.concatenate(couple_list), np.concatenate(force_list)
+
+def calc_dwell_time_series(frame_numbers, frame_times, frame_idx, forces, unbinding_rate, unbinding_force):
+    """Mean force, mean k_off and dwell time 1/<k_off> of every frame (NaN
+    for frames without couples)
+
+    Returns: Pandas dataframe with columns frame, time, n_couples,
+    mean_force, mean_k_off, dwell_time
+    """
+    n_frames = frame_numbers.shape[0]
+
+    k_off = calc_k_off(forces, unbinding_rate, unbinding_force)
+
+    n_couples = np.bincount(frame_idx, minlength=n_frames)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_force = np.bincount(frame_idx, weights=forces, minlength=n_frames) / n_couples
+        mean_k_off = np.bincount(frame_idx, weights=k_off, minlength=n_frames) / n_couples
+
+    return pd.DataFrame({'frame': frame_numbers, \
+                         'time': frame_times, \
+                         'n_couples': n_couples, \
+                         'mean_force': mean_force, \
+                         'mean_k_off': mean_k_off, \
+                         'dwell_time': 1 / mean_k_off})
+
+def calc_couple_dwell_times(couples, forces, interval_df, unbinding_rate, unbinding_force):
+    """Predicted dwell time 1/<k_off> of every couple, over all the frames in
+    which it is bound, and its observed mean binding time
+
+    Returns: Pandas dataframe with columns couple, n_samples, mean_force,
+    mean_k_off, predicted_dwell_time, n_intervals, observed_dwell_time
+    (NaN for couples without intervals)
+    """
+    (couple_ids, couple_idx) = np.unique(couples, return_inverse=True)
+
+    k_off = calc_k_off(forces, unbinding_rate, unbinding_force)
+
+    n_samples = np.bincount(couple_idx, minlength=couple_ids.shape[0])
+    mean_k_off = np.bincount(couple_idx, weights=k_off, minlength=couple_ids.shape[0]) / n_samples
+
+    couple_df = pd.DataFrame({'couple': couple_ids, \
+                              'n_samples': n_samples, \
+                              'mean_force': np.bincount(couple_idx, weights=forces, minlength=couple_ids.shape[0]) / n_samples, \
+                              'mean_k_off': mean_k_off, \
+                              'predicted_dwell_time': 1 / mean_k_off})
+
+    observed_df = interval_df.groupby('couple', as_index=False).agg(n_intervals=('duration', 'size'), \
+                                                                    observed_dwell_time=('duration', 'mean'))
+
+    couple_df = couple_df.merge(observed_df, on='couple', how='left')
+    couple_df['n_intervals'] = couple_df['n_intervals'].fillna(0).astype(np.int64)
+
+    return couple_df
+
+def calc_frame_intervals(frame_times, frame_idx, couples, dt=None):
+    """Binding intervals of the couples, from the (frame index, couple) rows
+    of read_couple_forces(). Frames are put in time order first, as in
+    read_bound_ids()"""
+    bounds = np.searchsorted(frame_idx, np.arange(1, frame_times.shape[0]))
+    id_arrays = [ np.unique(ids) for ids in np.split(couples, bounds) ] if frame_times.shape[0] else []
+
+    order = np.argsort(frame_times, kind='stable')
+
+    return extract_intervals(*occupancy_matrix([ id_arrays[k] for k in order ]), frame_times[order], dt=dt)
+
+def get_args(argv):
+    parser = argparse.ArgumentParser(description='force dependent dwell times of the bound couples, for every frame')
+
+    parser.add_argument('--ifile', '-i', type=str, required=True, help='(multi-frame) couple report with identity and force columns')
+    parser.add_argument('--ofile', '-o', type=str, default=None, help='output file (default: input file with suffix .dwell.dat)')
+    parser.add_argument('--unbindingrate', type=float, required=True, help='unbinding rate k0 of the couple hands')
+    parser.add_argument('--unbindingforce', type=float, required=True, help='unbinding force f_u of the couple hands')
+    parser.add_argument('--couples', action='store_true', help='also write predicted and observed dwell times per couple')
+    parser.add_argument('--dt', type=float, default=None, help='with --couples: time between frames (default: from the frame times)')
+    parser.add_argument('--nocensored', action='store_true', help='with --couples: leave out the intervals bound in the first or last frame')
+
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = get_args(argv)
+
+    input_file_path = Path(args.ifile)
+    output_file_path = Path(args.ofile) if args.ofile else input_file_path.with_suffix('.dwell.dat')
+
+    (frame_numbers, frame_times, frame_idx, couples, forces) = read_couple_forces(input_file_path)
+
+    dwell_df = calc_dwell_time_series(frame_numbers, frame_times, frame_idx, forces, args.unbindingrate, args.unbindingforce)
+    dwell_df.to_csv(output_file_path, float_format='%.8f', header=True, index=None, sep="\t")
+
+    if args.couples:
+        interval_df = calc_frame_intervals(frame_times, frame_idx, couples, dt=args.dt)
+
+        if args.nocensored:
+            interval_df = interval_df[~(interval_df.left_censored | interval_df.right_censored)]
+
+        couple_df = calc_couple_dwell_times(couples, forces, interval_df, args.unbindingrate, args.unbindingforce)
+        couple_df.to_csv(output_file_path.with_name(output_file_path.stem + '_couples.dat'), float_format='%.8f', header=True, index=None, sep="\t")
+
+if __name__=="__main__":
+    main(sys.argv[1:])
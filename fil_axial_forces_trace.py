@@ -1,20 +1,184 @@
+"""Time trace of the couple force and filament axial force sums.
+
+Walks a multi-frame link report (or a set of frame-by-frame report files)
+once and writes one line per frame:
+
+time    fx1_sum    fy1_sum    fx2_sum    fy2_sum    f_sum    n_couples
+
+with the same definitions as couple_forces.py (fx1_sum ... fy2_sum) and
+fil_axial_forces.py (f_sum), so that the trace matches running those
+scripts on every frame. Frames without couples, or without couples left
+after --filter, are written with zero sums, so the trace keeps one line per
+frame.
+
+As in Data, the largest cluster is picked from all the rows of a frame,
+and the row filters are applied after that. Without --largest, the filters
+are applied while the report is read.
+
+Usage:
+python fil_axial_forces_trace.py -i link_cluster.txt
+python fil_axial_forces_trace.py -p 'report*.txt' -o trace.dat --nproc 4
+"""
 import sys
 import argparse
+import glob
 from pathlib import Path
+from multiprocessing import Pool
+
 import numpy as np
+import pandas as pd
+
+from data_class import RowPredicate
+from frame_reader import iter_report_blocks, sort_frame_files, iter_batches
+from force_vectors import hand_force_vectors, axial_forces
+
+column_list = [ 'identity', 'force', \
+                'pos1X', 'pos1Y', 'dirFiber1X', 'dirFiber1Y', \
+                'pos2X', 'pos2Y', 'dirFiber2X', 'dirFiber2Y' ]
+
+trace_columns = [ 'time', 'fx1_sum', 'fy1_sum', 'fx2_sum', 'fy2_sum', 'f_sum', 'n_couples' ]
+
+def get_args(argv):
+    parser = argparse.ArgumentParser(description='time trace of couple and filament axial force sums')
+
+    parser.add_argument('--ifile', '-i', type=str, default=None, help='multi-frame link report')
+    parser.add_argument('--framepattern', '-p', type=str, default=None, help='glob pattern of frame-by-frame report files, e.g. "report*.txt"')
+    parser.add_argument('--ofile', '-o', type=str, default=None, help='output file (default: input file with suffix .trace.dat)')
+    parser.add_argument('--largest', default=True, action=argparse.BooleanOptionalAction, help='only use couples of the largest cluster of each frame')
+    parser.add_argument('--cluster', '-c', type=int, default=None, help='optional: only use couples of this cluster id')
+    parser.add_argument('--filter', '-f', type=str, action='append', default=[], help='optional: only load rows satisfying a condition, e.g. "force>0.5" (can be repeated)')
+    parser.add_argument('--nproc', '-n', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--batchsize', type=int, default=64, help='number of frames held in memory at once')
+
+    args = parser.parse_args(argv)
+
+    if (args.ifile is None) == (args.framepattern is None):
+        parser.error('provide either --ifile or --framepattern')
+
+    return args
+
+def calc_frame_trace(time, frame_df, largest=True, predicates=[]):
+    """Sum the hand force vectors and axial forces of all couples in one frame,
+    the largest cluster is picked before the row predicates are applied
+
+    Returns: list with one entry per trace column
+    """
+    if largest and ('cluster' in frame_df.columns) and (frame_df.shape[0] > 0):
+        largest_cluster_id = frame_df['cluster'].mode().values[0]
+        frame_df = frame_df[frame_df['cluster'] == largest_cluster_id]
+
+    for predicate in predicates:
+        frame_df = frame_df[predicate.mask(frame_df)]
+
+    # One row per couple, as with groupby('identity') in the single frame scripts
+    frame_df = frame_df.drop_duplicates('identity')
+
+    (fx1, fy1, fx2, fy2) = hand_force_vectors(frame_df)
+    (f1, f2) = axial_forces(frame_df)
+
+    return [ time, fx1.sum(), fy1.sum(), fx2.sum(), fy2.sum(), \
+             f1.sum() + f2.sum(), frame_df.shape[0] ]
+
+def empty_trace_row(time):
+    return [ time if time is not None else np.nan, 0.0, 0.0, 0.0, 0.0, 0.0, 0 ]
+
+def trace_block(block, largest=True, predicates=[]):
+    """Trace row of one frame, predicates are applied after the largest
+    cluster is picked (if largest is True and the report has clusters)"""
+    # A frame without data rows has no column header
+    if block.header is None:
+        return empty_trace_row(block.time)
+
+    for predicate in predicates:
+        predicate.bind(block.header)
+
+    largest = largest and ('cluster' in block.header)
+
+    columns = column_list + (['cluster'] if largest else [])
+    columns += [ predicate.column for predicate in predicates if predicate.column not in columns ]
+
+    return calc_frame_trace(block.time, block.parse(columns), largest=largest, predicates=predicates)
+
+def trace_file(file_path, largest=True, predicates=[]):
+    """With largest, the predicates are only applied once the largest
+    cluster of each frame is known, otherwise while reading"""
+    if largest:
+        return [ trace_block(block, largest=True, predicates=predicates) \
+                 for block in iter_report_blocks(file_path) ]
+
+    return [ trace_block(block, largest=False) \
+             for block in iter_report_blocks(file_path, predicates=predicates) ]
+
+def trace_task(task):
+    """Worker entry point: task is a (FrameBlock or file path, largest, predicates) tuple,
+    the predicates of a FrameBlock task have not been applied yet"""
+    (item, largest, predicates) = task
+
+    if isinstance(item, (str, Path)):
+        return trace_file(item, largest=largest, predicates=predicates)
+
+    return [ trace_block(item, largest=largest, predicates=predicates) ]
+
+def write_trace(rows, output_file_path, first_batch):
+    trace_df = pd.DataFrame(rows, columns=trace_columns)
+    trace_df['n_couples'] = trace_df['n_couples'].astype(int)
+
+    trace_df.to_csv(output_file_path, float_format='%.5f', header=first_batch, \
+                    index=None, sep="\t", mode='w' if first_batch else 'a')
 
 def main(argv):
-    parser = argparse.ArgumentParser(description='')
-    self.parser.add_argument('--ifile', '-i', type=str, help='')
-	self.args = self.parser.parse_args(argv)
+    args = get_args(argv)
+
+    predicates = [ RowPredicate.from_string(x) for x in args.filter ]
+
+    if args.cluster is not None:
+        predicates.append(RowPredicate('cluster', '==', args.cluster))
+        largest = False
+    else:
+        largest = args.largest
+
+    if args.ifile is not None:
+        # Frames are cut out of the report here, and parsed by the workers.
+        # The largest cluster is picked from all the rows of a frame, so
+        # the filters can only be applied while reading without --largest
+        if largest:
+            items = iter_report_blocks(args.ifile)
+            task_predicates = predicates
+        else:
+            items = iter_report_blocks(args.ifile, predicates=predicates)
+            task_predicates = []
+        default_output_path = Path(args.ifile).with_suffix('.trace.dat')
+    else:
+        items = sort_frame_files(glob.glob(args.framepattern))
+        task_predicates = predicates
+        default_output_path = Path('trace.dat')
+
+    output_file_path = Path(args.ofile) if args.ofile else default_output_path
+
+    tasks = ( (item, largest, task_predicates) for item in items )
+
+    pool = Pool(args.nproc) if args.nproc > 1 else None
+    first_batch = True
+
+    try:
+        # Only one batch of frames is held in memory at a time
+        for batch in iter_batches(tasks, args.batchsize):
+            if pool is not None:
+                results = pool.map(trace_task, batch)
+            else:
+                results = [ trace_task(task) for task in batch ]
+
+            rows = [ row for result in results for row in result ]
 
-    input_file_name=self.args.ifile
-    input_file_path  = Path(input_file_name)
-	
-    frame_idx = 0
+            write_trace(rows, output_file_path, first_batch)
+            first_batch = False
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
 
-    with open(input_file_path, "r") as ifile:
-        pass
+    if first_batch:
+        write_trace([], output_file_path, first_batch)
 
 if __name__=="__main__":
     main(sys.argv[1:])
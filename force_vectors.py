@@ -0,0 +1,48 @@
+import numpy as np
+
+def normalize_rows(x, y):
+    """Normalize 2D vectors stored as coordinate arrays, zero vectors are left as is"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    norm = np.sqrt(x**2 + y**2)
+    norm = np.where(norm == 0, 1.0, norm)
+
+    return x / norm, y / norm
+
+def hand_force_vectors(df):
+    """Force vectors exerted by the two hands of every couple in a link report,
+    hand 1 pulls towards hand 2 and vice versa (as in CoupleForces).
+
+    Returns: (fx1, fy1, fx2, fy2) arrays, one entry per row
+    """
+    dx = df['pos2X'].to_numpy(dtype=np.float64) - df['pos1X'].to_numpy(dtype=np.float64)
+    dy = df['pos2Y'].to_numpy(dtype=np.float64) - df['pos1Y'].to_numpy(dtype=np.float64)
+    force = df['force'].to_numpy(dtype=np.float64)
+
+    angle1 = np.arctan2(dy, dx)
+    angle2 = np.arctan2(-dy, -dx)
+
+    return ( np.cos(angle1)*force, np.sin(angle1)*force, \
+             np.cos(angle2)*force, np.sin(angle2)*force )
+
+def axial_forces(df):
+    """Component of each hand force along the filament it is bound to
+    (as in FilAxialForces).
+
+    Returns: (f1, f2) arrays, one entry per row
+    """
+    dx = df['pos2X'].to_numpy(dtype=np.float64) - df['pos1X'].to_numpy(dtype=np.float64)
+    dy = df['pos2Y'].to_numpy(dtype=np.float64) - df['pos1Y'].to_numpy(dtype=np.float64)
+    force = df['force'].to_numpy(dtype=np.float64)
+
+    cpl_dir1_x, cpl_dir1_y = normalize_rows(dx, dy)
+    cpl_dir2_x, cpl_dir2_y = normalize_rows(-dx, -dy)
+
+    fil_dir1_x, fil_dir1_y = normalize_rows(df['dirFiber1X'], df['dirFiber1Y'])
+    fil_dir2_x, fil_dir2_y = normalize_rows(df['dirFiber2X'], df['dirFiber2Y'])
+
+    f1 = force * (fil_dir1_x*cpl_dir1_x + fil_dir1_y*cpl_dir1_y)
+    f2 = force * (fil_dir2_x*cpl_dir2_x + fil_dir2_y*cpl_dir2_y)
+
+    return f1, f2
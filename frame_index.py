@@ -0,0 +1,230 @@
+"""Per-frame summary index of a Cytosim report, stored as a JSON sidecar.
+
+For every frame of the report, the index holds the frame number, time,
+number of data rows and, if the report has a cluster column, the cluster
+size histogram and the largest cluster. It is built with one pass over the
+report (nothing but the cluster column is split) and saved in a cache
+directory next to it, as .frame_index/<report>.json, so later queries do
+not reparse the report. The index is rebuilt when the report size or
+modification time changes.
+
+The cache directory is hidden and is not a frame file itself, so frame
+file patterns (e.g. report[0-9]+.txt in Simulation) never pick up the
+index files as frames.
+
+Usage:
+python frame_index.py -i cluster_fiber_position.txt
+python frame_index.py -i link_cluster.txt --frame 1000
+"""
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+class FrameSummary():
+    def __init__(self, frame=None, time=None, header=None, n_rows=0, cluster_sizes=None):
+        self.frame = frame
+        self.time = time
+        self.header = header
+        self.n_rows = n_rows
+        self.cluster_sizes = cluster_sizes if cluster_sizes is not None else {}
+
+    @property
+    def largest_cluster_id(self):
+        """Ties go to the smallest id (same as DataFrame.mode())"""
+        if not self.cluster_sizes:
+            return None
+
+        return min(self.cluster_sizes, key=lambda cluster_id: (-self.cluster_sizes[cluster_id], cluster_id))
+
+    @property
+    def largest_cluster_size(self):
+        if not self.cluster_sizes:
+            return None
+
+        return self.cluster_sizes[self.largest_cluster_id]
+
+    def to_dict(self):
+        return {'frame': self.frame, \
+                'time': self.time, \
+                'header': self.header, \
+                'n_rows': self.n_rows, \
+                'n_clusters': len(self.cluster_sizes), \
+                'largest_cluster_id': self.largest_cluster_id, \
+                'largest_cluster_size': self.largest_cluster_size, \
+                # JSON keys are strings
+                'cluster_sizes': { str(k): v for (k, v) in sorted(self.cluster_sizes.items()) }}
+
+    @classmethod
+    def from_dict(cls, summary_dict):
+        return cls(frame=summary_dict['frame'], \
+                   time=summary_dict['time'], \
+                   header=summary_dict['header'], \
+                   n_rows=summary_dict['n_rows'], \
+                   cluster_sizes={ int(k): v for (k, v) in summary_dict['cluster_sizes'].items() })
+
+class FrameIndex():
+    version = 1
+    cache_dir_name = '.frame_index'
+
+    def __init__(self, report_path, frames=None, signature=None):
+        self.report_path = Path(report_path)
+        self.frames = frames if frames is not None else []
+        self.signature = signature
+
+    @staticmethod
+    def sidecar_path(report_path):
+        report_path = Path(report_path)
+
+        return report_path.parent / FrameIndex.cache_dir_name / (report_path.name + '.json')
+
+    @staticmethod
+    def file_signature(file_path):
+        stat = os.stat(file_path)
+
+        return [int(stat.st_size), int(stat.st_mtime_ns)]
+
+    @classmethod
+    def build(cls, report_path):
+        """One pass over the report, splitting data rows only if the report
+        has a cluster column"""
+        frames = []
+        summary = FrameSummary()
+        last_comment = None
+        cluster_idx = None
+
+        def close(summary):
+            if summary.n_rows or (summary.header is not None) or (summary.frame is not None):
+                frames.append(summary)
+
+        with open(report_path) as report_file:
+            for line in report_file:
+                if line.isspace():
+                    continue
+
+                if line.lstrip().startswith('%'):
+                    tokens = line.replace('%', '').split()
+
+                    if len(tokens) == 0:
+                        continue
+
+                    if tokens[0] == 'frame':
+                        close(summary)
+                        summary = FrameSummary(frame=int(tokens[-1]))
+                        last_comment = None
+                    elif tokens[0] == 'time':
+                        summary.time = float(tokens[-1])
+                    elif tokens[0] == 'end':
+                        close(summary)
+                        summary = FrameSummary()
+                        last_comment = None
+                    else:
+                        last_comment = tokens
+                    continue
+
+                if summary.n_rows == 0:
+                    # The column header is the last comment before the data
+                    summary.header = last_comment
+                    cluster_idx = None
+                    if (last_comment is not None) and ('cluster' in last_comment):
+                        cluster_idx = last_comment.index('cluster')
+
+                summary.n_rows += 1
+
+                if cluster_idx is not None:
+                    cluster_id = int(line.split()[cluster_idx])
+                    summary.cluster_sizes[cluster_id] = summary.cluster_sizes.get(cluster_id, 0) + 1
+
+        close(summary)
+
+        return cls(report_path, frames, cls.file_signature(report_path))
+
+    @classmethod
+    def load(cls, report_path):
+        """Read the sidecar of the report
+
+        Returns: FrameIndex, None if there is no sidecar or it is out of date
+        """
+        sidecar_path = cls.sidecar_path(report_path)
+
+        if not os.path.isfile(sidecar_path):
+            return None
+
+        try:
+            with open(sidecar_path) as sidecar_file:
+                index_dict = json.load(sidecar_file)
+        except (OSError, ValueError):
+            return None
+
+        if (index_dict.get('version') != cls.version) or \
+           (index_dict.get('signature') != cls.file_signature(report_path)):
+            return None
+
+        return cls(report_path, [ FrameSummary.from_dict(x) for x in index_dict['frames'] ], index_dict['signature'])
+
+    @classmethod
+    def load_or_build(cls, report_path, save=True):
+        index = cls.load(report_path)
+
+        if index is None:
+            index = cls.build(report_path)
+
+            if save:
+                index.save()
+
+        return index
+
+    def save(self):
+        index_dict = {'version': self.version, \
+                      'report': self.report_path.name, \
+                      'signature': self.signature, \
+                      'frames': [ summary.to_dict() for summary in self.frames ]}
+
+        sidecar_path = self.sidecar_path(self.report_path)
+
+        # The index is only a cache, a read-only directory is not an error
+        try:
+            sidecar_path.parent.mkdir(exist_ok=True)
+
+            with open(sidecar_path, 'w') as sidecar_file:
+                json.dump(index_dict, sidecar_file)
+        except OSError:
+            pass
+
+    def get_frame(self, frame=None):
+        """Summary of a frame (by frame number), the last frame by default"""
+        if not self.frames:
+            return None
+
+        if frame is None:
+            return self.frames[-1]
+
+        for summary in self.frames:
+            if summary.frame == frame:
+                return summary
+
+        raise KeyError("Frame %s not in report %s" % (frame, self.report_path))
+
+def get_args(argv):
+    parser = argparse.ArgumentParser(description='per-frame summary of a Cytosim report: time, rows, cluster sizes')
+
+    parser.add_argument('--ifile', '-i', type=str, help='Cytosim report')
+    parser.add_argument('--frame', type=int, default=None, help='optional: only print this frame')
+
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = get_args(argv)
+
+    index = FrameIndex.load_or_build(args.ifile)
+
+    summaries = index.frames if args.frame is None else [ index.get_frame(args.frame) ]
+
+    print('frame\ttime\tn_rows\tn_clusters\tlargest_cluster_id\tlargest_cluster_size')
+    for summary in summaries:
+        print('%s\t%s\t%d\t%d\t%s\t%s' % (summary.frame, summary.time, summary.n_rows, len(summary.cluster_sizes), \
+                                          summary.largest_cluster_id, summary.largest_cluster_size))
+
+if __name__=="__main__":
+    main(sys.argv[1:])
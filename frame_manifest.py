@@ -0,0 +1,75 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+class FrameManifest():
+    """Sidecar table of the frame files that went into an output file.
+
+    Each frame file is recorded with its size and modification time, so that
+    a rerun can tell which frames are new or have changed since, and only
+    process those.
+    """
+    columns = ['file', 'size', 'mtime_ns', 'time', 'options']
+
+    def __init__(self, manifest_path):
+        self.manifest_path = Path(manifest_path)
+
+        if os.path.isfile(self.manifest_path) and os.path.getsize(self.manifest_path) > 0:
+            manifest_df = pd.read_csv(self.manifest_path, sep="\t")
+        else:
+            manifest_df = pd.DataFrame(columns=self.columns)
+
+        self.entries = { row['file']: row for row in manifest_df.to_dict('records') }
+
+    @staticmethod
+    def file_key(file_path):
+        return Path(file_path).name
+
+    @staticmethod
+    def file_signature(file_path):
+        stat = os.stat(file_path)
+
+        return (int(stat.st_size), int(stat.st_mtime_ns))
+
+    def is_current(self, file_path, options=''):
+        """True if the frame file was recorded with the same analysis options
+        and has not changed since"""
+        entry = self.entries.get(self.file_key(file_path))
+
+        if entry is None:
+            return False
+
+        # Empty options are read back as NaN
+        recorded_options = entry['options'] if isinstance(entry['options'], str) else ''
+
+        if recorded_options != options:
+            return False
+
+        return (int(entry['size']), int(entry['mtime_ns'])) == self.file_signature(file_path)
+
+    def get_time(self, file_path):
+        entry = self.entries.get(self.file_key(file_path))
+
+        return None if entry is None else entry['time']
+
+    def record(self, file_path, time, options=''):
+        (size, mtime_ns) = self.file_signature(file_path)
+
+        self.entries[self.file_key(file_path)] = {'file': self.file_key(file_path), \
+                                                  'size': size, \
+                                                  'mtime_ns': mtime_ns, \
+                                                  'time': time, \
+                                                  'options': options}
+
+    def remove(self, file_path):
+        self.entries.pop(self.file_key(file_path), None)
+
+    def files(self):
+        return list(self.entries.keys())
+
+    def save(self):
+        manifest_df = pd.DataFrame(list(self.entries.values()), columns=self.columns)
+        manifest_df = manifest_df.sort_values(by=['time', 'file'])
+
+        manifest_df.to_csv(self.manifest_path, sep="\t", index=None)
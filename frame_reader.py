@@ -0,0 +1,184 @@
+import io
+import os
+import itertools
+
+import numpy as np
+import pandas as pd
+
+class FrameBlock():
+    """Raw lines of one frame of a Cytosim report, before parsing.
+
+    Blocks are cheap to pickle, so they can be sent to worker processes
+    which then call parse().
+    """
+    def __init__(self, frame=None, time=None, header=None, lines=None):
+        self.frame = frame
+        self.time = time
+        self.header = header
+        self.lines = lines if lines is not None else []
+
+    def parse(self, column_list=None):
+        """Returns: Pandas dataframe with the data rows of the frame"""
+        if self.header is None:
+            return pd.DataFrame(columns=column_list)
+
+        if column_list is not None:
+            missing = [ col for col in column_list if col not in self.header ]
+            if missing:
+                raise KeyError("Columns not in report: %s" % ', '.join(missing))
+
+        if len(self.lines) == 0:
+            return pd.DataFrame(columns=column_list if column_list is not None else self.header)
+
+        return pd.read_csv(io.StringIO(''.join(self.lines)), delim_whitespace=True, \
+                           header=None, names=self.header, usecols=column_list)
+
+def iter_report_blocks(file_path, predicates=[]):
+    """Walk a (multi-frame) Cytosim report once and yield one FrameBlock per
+    frame. Only the lines of the current frame are held in memory.
+
+    Frames are delimited by '% frame' and '% end' lines. The column header is
+    the last comment line before the first data row of each frame. Data rows
+    that do not satisfy all the row predicates are dropped while reading.
+    """
+    block = FrameBlock()
+    last_comment = None
+
+    with open(file_path) as input_file:
+        for line in input_file:
+            if line.isspace():
+                continue
+
+            if line.lstrip().startswith('%'):
+                tokens = line.replace('%', '').split()
+
+                if len(tokens) == 0:
+                    continue
+
+                if tokens[0] == 'frame':
+                    if block.lines or (block.header is not None):
+                        yield block
+                    block = FrameBlock(frame=int(tokens[-1]))
+                    last_comment = None
+                elif tokens[0] == 'time':
+                    block.time = float(tokens[-1])
+                elif tokens[0] == 'end':
+                    yield block
+                    block = FrameBlock()
+                    last_comment = None
+                else:
+                    last_comment = tokens
+                continue
+
+            if block.header is None:
+                block.header = last_comment
+
+                for predicate in predicates:
+                    predicate.bind(block.header)
+
+            if predicates:
+                fields = line.split()
+                if not all(predicate(fields) for predicate in predicates):
+                    continue
+
+            block.lines.append(line)
+
+    if block.lines or (block.header is not None):
+        yield block
+
+def iter_report_frames(file_path, column_list=None, predicates=[]):
+    """Yield (frame block, dataframe) for each frame of a Cytosim report"""
+    for block in iter_report_blocks(file_path, predicates=predicates):
+        yield block, block.parse(column_list)
+
+def read_cluster_positions(file_path, column_list=['cluster', 'fiber_id', 'posX', 'posY']):
+    """Read the cluster and position columns of every frame of a
+    cluster_fiber_position report
+
+    Returns: (frames, times, clusters, positions) arrays, one entry per filament
+    """
+    frame_list, time_list, cluster_list, position_list = [], [], [], []
+
+    for frame_idx, (block, frame_df) in enumerate(iter_report_frames(file_path, column_list=column_list)):
+        n_rows = frame_df.shape[0]
+
+        frame = block.frame if block.frame is not None else frame_idx
+        time = block.time if block.time is not None else np.nan
+
+        frame_list.append(np.full(n_rows, frame, dtype=np.int64))
+        time_list.append(np.full(n_rows, time, dtype=np.float64))
+        cluster_list.append(frame_df['cluster'].to_numpy(dtype=np.int64))
+        position_list.append(frame_df[['posX', 'posY']].to_numpy(dtype=np.float64))
+
+    if not frame_list:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros((0, 2))
+
+    return np.concatenate(frame_list), np.concatenate(time_list), \
+           np.concatenate(cluster_list), np.concatenate(position_list)
+
+def read_frame_time(file_path):
+    """Read the time of the first frame of a report, stopping at the first data row"""
+    with open(file_path) as input_file:
+        for line in input_file:
+            if line.isspace():
+                continue
+            if not line.lstrip().startswith('%'):
+                break
+
+            tokens = line.replace('%', '').split()
+
+            if tokens and tokens[0] == 'time':
+                return float(tokens[-1])
+
+    return None
+
+def sort_frame_files(file_paths):
+    """Order frame-by-frame report files by simulation time"""
+    def sort_key(path):
+        time = read_frame_time(path)
+        return (time if time is not None else float('inf'), os.fspath(path))
+
+    return sorted(file_paths, key=sort_key)
+
+def iter_batches(iterable, batch_size):
+    """Split an iterable into lists of at most batch_size items, lazily"""
+    iterator = iter(iterable)
+
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+class ChunkedWriter():
+    """Append dataframes to a tab separated file, buffered into chunks of
+    at least chunk_rows rows. The file is truncated on the first write."""
+    def __init__(self, file_path, columns, chunk_rows=100000, float_format=None):
+        self.file_path = file_path
+        self.columns = columns
+        self.chunk_rows = chunk_rows
+        self.float_format = float_format
+
+        self.buffer = []
+        self.n_buffered = 0
+        self.first_write = True
+
+    def append(self, df):
+        self.buffer.append(df)
+        self.n_buffered += df.shape[0]
+
+        if self.n_buffered >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if (not self.buffer) and (not self.first_write):
+            return
+
+        chunk_df = pd.concat(self.buffer, ignore_index=True) if self.buffer else pd.DataFrame(columns=self.columns)
+
+        chunk_df.to_csv(self.file_path, sep='\t', index=False, header=self.first_write, \
+                        mode='w' if self.first_write else 'a', float_format=self.float_format)
+
+        self.buffer = []
+        self.n_buffered = 0
+        self.first_write = False
@@ -1,10 +1,15 @@
-from data_class import Data
+import sys
+import argparse
 
-if __name__=="__main__":
-   column_list = ['cluster', 'nb_fibers', 'fiber_id']
+from frame_index import FrameIndex
 
-   myData = Data(column_list=column_list)
+if __name__=="__main__":
+   parser = argparse.ArgumentParser(description='print the size of the largest cluster of a report frame')
+   parser.add_argument('--ifile', '-i', type=str, help='')
+   parser.add_argument('--frame', type=int, default=None, help='optional: frame number (default: last frame of the report)')
+   args, _ = parser.parse_known_args(sys.argv[1:])
 
-   print(myData.largest_cluster_size)
+   # Answered from the summary index, the report is only parsed once
+   summary = FrameIndex.load_or_build(args.ifile).get_frame(args.frame)
 
-   del myData
+   print(summary.largest_cluster_size)
@@ -0,0 +1,188 @@
+"""dk distribution over an ensemble of pulling trajectories.
+
+Runs the k_eff_pulling.py pipeline (KeffData) in every trajectory directory
+in a process pool, merges the dk samples of all trajectories and writes
+their mean, median and histogram, with bootstrap confidence intervals.
+
+The bootstrap resamples whole trajectories (with replacement), since dk
+samples of the same trajectory are correlated. Replicates are computed in
+parallel in fixed size chunks, each chunk seeded from
+np.random.SeedSequence(seed).spawn(), so the result only depends on --seed
+and --nboot, not on the number of processes.
+
+The dk samples are only kept in memory, nothing is written to the
+trajectory directories (no per-trajectory dk.dat as with k_eff_pulling.py).
+
+Usage:
+python k_eff_ensemble.py -d 'trj*/sf' --nproc 8 --nboot 2000 --seed 1
+
+Output:
+<ofile>.summary.dat n_trj, n_samples, mean, median and their CI bounds
+<ofile>.hist.dat    bin_low, bin_high, count, density
+"""
+import os
+import sys
+import glob
+import argparse
+from pathlib import Path
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from k_eff_pulling import KeffData
+
+column_list = ['identity', \
+               'fiber1', 'pos1X', 'pos1Y', \
+               'fiber2', 'pos2X', 'pos2Y',\
+               'force']
+
+bootstrap_chunk_size = 100
+
+def calc_trajectory_dk(task):
+    """Worker: dk samples of one trajectory directory
+
+    Returns: (directory, dk array)
+    """
+    (trj_dir, keff_argv) = task
+
+    cwd = os.getcwd()
+    os.chdir(trj_dir)
+
+    try:
+        mySim = KeffData(argv=keff_argv, column_list=column_list, write=False)
+        dk = mySim.output_df['dk'].to_numpy(dtype=np.float64)
+        del mySim
+    finally:
+        os.chdir(cwd)
+
+    return trj_dir, dk[~np.isnan(dk)]
+
+def calc_statistics(samples):
+    """Returns: (mean, median) of the samples, NaN if there are none"""
+    if samples.shape[0] == 0:
+        return np.nan, np.nan
+
+    return np.mean(samples), np.median(samples)
+
+def bootstrap_chunk(task):
+    """Worker: mean and median of n_replicates trajectory-level resamples
+
+    Returns: (n_replicates, 2) array
+    """
+    (samples_list, n_replicates, seed_seq) = task
+
+    rng = np.random.default_rng(seed_seq)
+    n_trj = len(samples_list)
+
+    replicates = np.empty((n_replicates, 2))
+
+    for k in range(n_replicates):
+        picked = rng.integers(0, n_trj, size=n_trj)
+        replicates[k] = calc_statistics(np.concatenate([ samples_list[i] for i in picked ]))
+
+    return replicates
+
+def bootstrap_trajectories(samples_list, n_boot=1000, seed=0, n_proc=1):
+    """Mean and median of trajectory-level bootstrap resamples
+
+    Returns: (n_boot, 2) array, columns mean and median
+    """
+    n_chunks = -(-n_boot // bootstrap_chunk_size)
+    chunk_seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    tasks = [ (samples_list, min(bootstrap_chunk_size, n_boot - k*bootstrap_chunk_size), chunk_seeds[k]) \
+              for k in range(n_chunks) ]
+
+    if (n_proc > 1) and (n_chunks > 1):
+        with Pool(min(n_proc, n_chunks)) as pool:
+            chunks = pool.map(bootstrap_chunk, tasks)
+    else:
+        chunks = [ bootstrap_chunk(task) for task in tasks ]
+
+    return np.concatenate(chunks) if chunks else np.zeros((0, 2))
+
+def calc_summary(samples_list, replicates, ci=95.0):
+    samples = np.concatenate(samples_list) if samples_list else np.zeros(0)
+    (mean, median) = calc_statistics(samples)
+
+    alpha = (100.0 - ci) / 2
+
+    if replicates.shape[0] > 0:
+        (mean_low, mean_high) = np.nanpercentile(replicates[:, 0], [alpha, 100.0 - alpha])
+        (median_low, median_high) = np.nanpercentile(replicates[:, 1], [alpha, 100.0 - alpha])
+    else:
+        mean_low = mean_high = median_low = median_high = np.nan
+
+    return pd.DataFrame([{'n_trj': len(samples_list), \
+                          'n_samples': samples.shape[0], \
+                          'mean': mean, \
+                          'mean_ci_low': mean_low, \
+                          'mean_ci_high': mean_high, \
+                          'median': median, \
+                          'median_ci_low': median_low, \
+                          'median_ci_high': median_high}])
+
+def calc_histogram(samples, bins=100, range=None):
+    (counts, edges) = np.histogram(samples, bins=bins, range=range)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        density = counts / (counts.sum() * np.diff(edges))
+
+    return pd.DataFrame({'bin_low': edges[:-1], \
+                         'bin_high': edges[1:], \
+                         'count': counts, \
+                         'density': density})
+
+def get_args(argv):
+    parser = argparse.ArgumentParser(description='dk distribution over pulling trajectories, with bootstrap confidence intervals')
+
+    parser.add_argument('--trjdirs', '-d', type=str, required=True, help='glob pattern of the trajectory directories, e.g. "trj*/sf"')
+    parser.add_argument('--ofile', '-o', type=str, default='dk_ensemble', help='prefix of the output files')
+    parser.add_argument('--nproc', '-n', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--nboot', type=int, default=1000, help='number of bootstrap replicates')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the bootstrap')
+    parser.add_argument('--ci', type=float, default=95.0, help='confidence level of the intervals, in percent')
+    parser.add_argument('--bins', type=int, default=100, help='number of histogram bins')
+
+    # Passed on to KeffData in every trajectory directory
+    parser.add_argument('--prefixframe', '-p', type=str, default='report', help='prefix for file pattern of frame-by-frame data files')
+    parser.add_argument('--extframe', '-e', type=str, default='txt', help='extension for files of frame-by-frame data')
+    parser.add_argument('--ifilesimulation', '-i', type=str, default='forces.dat', help='input file with data for the whole simulation (multiple frames)')
+
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = get_args(argv)
+
+    trj_dirs = sorted(path for path in glob.glob(args.trjdirs) if os.path.isdir(path))
+
+    keff_argv = ['--prefixframe', args.prefixframe, \
+                 '--suffixframe', '', \
+                 '--extframe', args.extframe, \
+                 '--ifilesimulation', args.ifilesimulation ]
+
+    tasks = [ (os.path.abspath(trj_dir), keff_argv) for trj_dir in trj_dirs ]
+
+    if (args.nproc > 1) and (len(tasks) > 1):
+        with Pool(min(args.nproc, len(tasks))) as pool:
+            results = pool.map(calc_trajectory_dk, tasks)
+    else:
+        results = [ calc_trajectory_dk(task) for task in tasks ]
+
+    # pool.map keeps the order of the directories, so the bootstrap is reproducible
+    samples_list = [ dk for (_, dk) in results ]
+
+    replicates = bootstrap_trajectories(samples_list, n_boot=args.nboot, seed=args.seed, n_proc=args.nproc)
+
+    output_prefix = Path(args.ofile)
+
+    summary_df = calc_summary(samples_list, replicates, ci=args.ci)
+    summary_df.to_csv(output_prefix.with_name(output_prefix.name + '.summary.dat'), float_format='%.8f', header=True, index=None, sep="\t")
+
+    samples = np.concatenate(samples_list) if samples_list else np.zeros(0)
+    hist_df = calc_histogram(samples, bins=args.bins)
+    hist_df.to_csv(output_prefix.with_name(output_prefix.name + '.hist.dat'), float_format='%.8f', header=True, index=None, sep="\t")
+
+if __name__=="__main__":
+    main(sys.argv[1:])
@@ -4,76 +4,143 @@ from data_class import Data
 import pandas as pd
 import numpy as np
 
-class KeffData(Simulation):
-    def __init__(self,argv=[], column_list=[]):
-            super().__init__(argv=argv, column_list=column_list)
+motor_state_columns = ['time', 'dir_x', 'dir_y', 'f_x', 'f_y', 'length', 'fil_id', 'couple_id']
 
-            # Need to round f_ext data to 3 decimal points (to match reportF data)
-            self.f_ext_df = self.simulation_df.round({'time': 3})
+def calc_frame_motor_states(time, frame_df):
+    """Motor hand states of one frame in a single vectorized pass, rows
+    ordered by couple id, hand on fiber1 first
 
-            self.motor_df = self.calculate_motor_states()
+    Returns: Pandas dataframe with the motor_state_columns
+    """
+    frame_df = frame_df.sort_values(by='identity', kind='stable')
 
-            # appends columns with k_eff related data to self.motor_df
-            self.output_df = self.calculate_k_eff()
+    pos1_x = frame_df['pos1X'].to_numpy(dtype=np.float64)
+    pos1_y = frame_df['pos1Y'].to_numpy(dtype=np.float64)
+    pos2_x = frame_df['pos2X'].to_numpy(dtype=np.float64)
+    pos2_y = frame_df['pos2Y'].to_numpy(dtype=np.float64)
+    force = frame_df['force'].to_numpy(dtype=np.float64)
 
-            self.write_output()
+    # pos1 - pos2 rather than -(pos2 - pos1): a zero length couple then
+    # pulls along +x with both hands, as np.arctan2(0, 0) == 0
+    (dir1_x, dir1_y) = (pos2_x - pos1_x, pos2_y - pos1_y)
+    (dir2_x, dir2_y) = (pos1_x - pos2_x, pos1_y - pos2_y)
 
-    def __delete__(self):
-        super().__delete__()
+    angle1 = np.arctan2(dir1_y, dir1_x)
+    angle2 = np.arctan2(dir2_y, dir2_x)
 
-    def calculate_motor_states(self):
+    def interleave(hand1, hand2):
+        return np.stack([ hand1, hand2 ], axis=1).reshape(-1)
+
+    n_hands = 2*frame_df.shape[0]
+
+    return pd.DataFrame({'time': np.full(n_hands, time, dtype=np.float64), \
+                         'dir_x': interleave(dir1_x, dir2_x), \
+                         'dir_y': interleave(dir1_y, dir2_y), \
+                         'f_x': interleave(np.cos(angle1)*force, np.cos(angle2)*force), \
+                         'f_y': interleave(np.sin(angle1)*force, np.sin(angle2)*force), \
+                         'length': np.repeat(np.hypot(dir1_x, dir1_y), 2), \
+                         'fil_id': interleave(frame_df['fiber1'].to_numpy(dtype=np.int64), \
+                                              frame_df['fiber2'].to_numpy(dtype=np.int64)), \
+                         'couple_id': np.repeat(frame_df['identity'].to_numpy(dtype=np.int64), 2)})
 
-        motor_df = pd.DataFrame(columns=['time', 'dir', 'force', 'length', 'fil_id', 'couple_id'])
+def calc_k_eff(motor_df, f_ext_df, f_ext_columns=('f_x', 'f_y')):
+    """dk of every (time, couple) of the motor states table, with joins
+    instead of per-couple scans (see KeffData.calculate_k_eff)
 
-        for frame in self.frame_data_list:
-            if frame.time in self.frame_time_list:
-                frame_df = frame.temp_dataframe
+    The external force of a filament is shared by its valency, the number of
+    hands bound to it at that time. Hands are joined to the external forces
+    on (time rounded to 3 decimals, fil_id); hands without an external force
+    give NaN. A couple with both hands on the same filament counts that
+    filament once, with the force of its first hand.
 
-                for couple_id, df_couple in frame_df.groupby('identity'):
-                    dir_vec1 = np.array( [ df_couple['pos2X'] - df_couple['pos1X'] , \
-                                        df_couple['pos2Y'] - df_couple['pos1Y'] ] ).flatten()
+    Returns: Pandas dataframe with columns time, couple_id, length, df, dk,
+    one row per (time, couple), sorted by time and couple id
+    """
+    (f_x_col, f_y_col) = f_ext_columns
 
-                    dir_vec2 = np.array( [ df_couple['pos1X'] - df_couple['pos2X'] , \
-                                        df_couple['pos1Y'] - df_couple['pos2Y'] ] ).flatten()
+    # Stable: the hand on fiber1 stays first within a couple
+    hands = motor_df.sort_values(by=['time', 'couple_id'], kind='stable', ignore_index=True)
 
-                    length1 = np.linalg.norm(dir_vec1)
-                    length2 = np.linalg.norm(dir_vec2)
+    hands['valency'] = hands.groupby(['time', 'fil_id'])['fil_id'].transform('size')
+    hands = hands[~hands.duplicated(subset=['time', 'couple_id', 'fil_id'], keep='first')]
 
-                    angle1 = np.arctan2(dir_vec1[1], dir_vec1[0])
-                    angle2 = np.arctan2(dir_vec2[1], dir_vec2[0])
+    hands = hands.assign(time_key=np.round(hands['time'].to_numpy(dtype=np.float64), 3))
 
-                    x1_force = np.cos(angle1)*df_couple['force'].values[0]
-                    y1_force = np.sin(angle1)*df_couple['force'].values[0]
+    f_ext = pd.DataFrame({'time_key': np.round(f_ext_df['time'].to_numpy(dtype=np.float64), 3), \
+                          'fil_id': f_ext_df['fil_id'].to_numpy(dtype=np.int64), \
+                          'f_ext_x': f_ext_df[f_x_col].to_numpy(dtype=np.float64), \
+                          'f_ext_y': f_ext_df[f_y_col].to_numpy(dtype=np.float64)})
+    f_ext = f_ext.drop_duplicates(subset=['time_key', 'fil_id'], keep='first')
 
-                    force_vec1 = np.array([x1_force, y1_force])
+    # Left join keeps the order of the hands
+    hands = hands.merge(f_ext, on=['time_key', 'fil_id'], how='left', sort=False)
 
-                    x2_force = np.cos(angle2)*df_couple['force'].values[0]
-                    y2_force = np.sin(angle2)*df_couple['force'].values[0]
+    f_x = hands['f_x'].to_numpy(dtype=np.float64)
+    f_y = hands['f_y'].to_numpy(dtype=np.float64)
+    valency = hands['valency'].to_numpy(dtype=np.float64)
 
-                    force_vec2 = np.array([x2_force, y2_force])
+    # Projection of the filament's share of the external force onto the motor force
+    with np.errstate(invalid='ignore', divide='ignore'):
+        f_ext_motor_proj = (f_x*hands['f_ext_x'].to_numpy() + f_y*hands['f_ext_y'].to_numpy()) \
+                           / valency / np.hypot(f_x, f_y)
 
-                    fiber1_id = df_couple['fiber1'].values[0]
-                    fiber2_id = df_couple['fiber2'].values[0]
+    time = hands['time'].to_numpy(dtype=np.float64)
+    couple_id = hands['couple_id'].to_numpy(dtype=np.int64)
 
-                    f_motor1_dict = {'time': frame.time, \
-                                    'dir': dir_vec1, \
-                                    'force': force_vec1, \
-                                    'length': float(length1), \
-                                    'fil_id': int(fiber1_id), \
-                                    'couple_id': int(couple_id) }
-                    
-                    f_motor2_dict = {'time': frame.time, \
-                                    'dir': dir_vec2, \
-                                    'force': force_vec2, \
-                                    'length': float(length2), \
-                                    'fil_id': int(fiber2_id), \
-                                    'couple_id': int(couple_id) }
+    if time.shape[0] == 0:
+        return pd.DataFrame(columns=['time', 'couple_id', 'length', 'df', 'dk'])
 
-                    motor_df = pd.concat([ motor_df, \
-                                        pd.DataFrame([f_motor1_dict]), \
-                                        pd.DataFrame([f_motor2_dict]) ])
-        
-        motor_df.sort_values(by=['time'], inplace=True)
+    couple_start = np.flatnonzero(np.r_[True, (time[1:] != time[:-1]) | (couple_id[1:] != couple_id[:-1])])
+
+    # reduceat propagates NaN, a missing external force makes df NaN
+    df_avg = np.add.reduceat(f_ext_motor_proj, couple_start) / 2
+
+    length = hands['length'].to_numpy(dtype=np.float64)[couple_start]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dk = np.where(length > 0, df_avg / np.where(length > 0, length, 1.0), np.nan)
+
+    return pd.DataFrame({'time': time[couple_start], \
+                         'couple_id': couple_id[couple_start], \
+                         'length': length, \
+                         'df': df_avg, \
+                         'dk': dk})
+
+class KeffData(Simulation):
+    def __init__(self,argv=[], column_list=[], write=True):
+            super().__init__(argv=argv, column_list=column_list)
+
+            # Need to round f_ext data to 3 decimal points (to match reportF data)
+            self.f_ext_df = self.simulation_df.round({'time': 3})
+
+            self.motor_df = self.calculate_motor_states()
+
+            # appends columns with k_eff related data to self.motor_df
+            self.output_df = self.calculate_k_eff()
+
+            # write=False: only keep output_df (e.g. k_eff_ensemble.py)
+            if write:
+                self.write_output()
+
+    def __delete__(self):
+        super().__delete__()
+
+    def calculate_motor_states(self):
+        """State of every motor hand, one row per hand (two per couple),
+        stored as flat columns: time, dir_x, dir_y, f_x, f_y, length, fil_id,
+        couple_id
+
+        Hand 1 is pulled towards hand 2 and vice versa.
+        """
+        frame_motor_list = [ calc_frame_motor_states(frame.time, frame.temp_dataframe) \
+                             for frame in self.frame_data_list if frame.time in self.frame_time_list ]
+
+        if frame_motor_list:
+            motor_df = pd.concat(frame_motor_list, ignore_index=True)
+        else:
+            motor_df = calc_frame_motor_states(None, pd.DataFrame(columns=['identity', 'fiber1', 'pos1X', 'pos1Y', 'fiber2', 'pos2X', 'pos2Y', 'force']))
+
+        motor_df.sort_values(by=['time'], kind='stable', inplace=True, ignore_index=True)
 
         return motor_df
 
@@ -94,56 +161,16 @@ class KeffData(Simulation):
 
         k_eff = k + dk
         """
-        
-        output_df = pd.DataFrame(columns=['time', 'couple_id', 'length', 'df', 'dk'])
-        # self.motor_df = self.motor_df.reindex(columns=self.motor_df.columns.tolist() + ['df_mag', 'dk_eff'])
-        couple_not_recorded = True
-
-        for time, time_df in self.motor_df.groupby('time'):
-            for couple_id, couple_df in time_df.groupby('couple_id'):
-                df = 0.0
-
-                for fil_id, fil_df in couple_df.groupby('fil_id'):
-                    fil_time_mask = self.f_ext_df['time'] == time
-                    fil_fil_id_mask = self.f_ext_df['fil_id'] == fil_id
-
-                    f_ext_fil = np.array([self.f_ext_df.loc[fil_time_mask & fil_fil_id_mask, 'f_x'].values, 
-                                          self.f_ext_df.loc[fil_time_mask & fil_fil_id_mask, 'f_y'].values]).flatten()
-
-                    fil_id_mask = time_df['fil_id'] == fil_id
-
-                    valency = time_df[fil_id_mask].shape[0]
-
-                    motor_fil_id_mask = couple_df['fil_id'] == fil_id
-
-                    f_ext_motor_proj = np.dot(couple_df.loc[motor_fil_id_mask, 'force'].values[0], f_ext_fil/valency) \
-                                       / np.linalg.norm(couple_df.loc[motor_fil_id_mask, 'force'].values[0])
-
-                    df += f_ext_motor_proj
-
-                df_avg= df/2 
-
-                if couple_df['length'].values[0] > 0:
-                    dk = df_avg/ couple_df['length'].values[0]
-                else:
-                    dk = float('nan')
+        return calc_k_eff(self.motor_df, self.f_ext_df, self.get_external_force_columns())
 
-                if couple_not_recorded:
-                    tmp_dict = {'time': time, \
-                                'couple_id': couple_id, \
-                                'length': couple_df['length'].values[0], \
-                                'df': df_avg, \
-                                'dk': dk } 
-                    
-                    output_df = pd.concat([ output_df, pd.DataFrame([tmp_dict]) ])
+    def get_external_force_columns(self):
+        """Columns of the external force components in the simulation table,
+        which Simulation names f_dirX and f_dirY by default"""
+        if ('f_x' in self.f_ext_df.columns) and ('f_y' in self.f_ext_df.columns):
+            return ('f_x', 'f_y')
 
-                motor_time_mask = output_df['time'] == time
-                motor_couple_id_mask = output_df['couple_id'] == couple_id  
+        return ('f_dirX', 'f_dirY')
 
-                couple_not_recorded = not (motor_time_mask & motor_couple_id_mask).any()
-        
-        return output_df
-  
     def write_output(self):
         notna_mask = self.output_df['dk'].notna()
 
@@ -0,0 +1,79 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+def label_components(n_nodes, edges_i, edges_j):
+    """Connected components of an undirected graph given as an edge list
+    of node indexes 0..n_nodes-1 (nodes without edges are their own component)
+
+    Returns: component label of every node, numbered 1, 2, ... by decreasing
+    component size (ties by smallest node index), and the component sizes
+    """
+    edges_i = np.asarray(edges_i, dtype=np.int64)
+    edges_j = np.asarray(edges_j, dtype=np.int64)
+
+    graph = coo_matrix((np.ones(edges_i.shape[0], dtype=np.int8), (edges_i, edges_j)), \
+                       shape=(n_nodes, n_nodes)).tocsr()
+
+    n_components, labels = connected_components(graph, directed=False)
+
+    return relabel_by_size(labels, n_components)
+
+def relabel_by_size(labels, n_components=None):
+    """Renumber component labels 1, 2, ... by decreasing size
+
+    Returns: (new labels, sizes) where sizes[k-1] is the size of component k
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+
+    if n_components is None:
+        n_components = labels.max() + 1 if labels.shape[0] else 0
+
+    sizes = np.bincount(labels, minlength=n_components)
+
+    # First node of each component, to break ties in a reproducible way
+    first_node = np.full(n_components, labels.shape[0], dtype=np.int64)
+    np.minimum.at(first_node, labels, np.arange(labels.shape[0]))
+
+    order = np.lexsort((first_node, -sizes))
+
+    new_label = np.empty(n_components, dtype=np.int64)
+    new_label[order] = np.arange(1, n_components + 1)
+
+    return new_label[labels], sizes[order]
+
+def link_clusters(fiber1, fiber2, edge_mask=None):
+    """Clusters of filaments connected by couples of a link report
+
+    edge_mask: optional boolean array, only the links where it is True
+    connect their two filaments (e.g. force above a threshold)
+
+    Returns: (filament ids, cluster label of each filament, cluster sizes in
+    number of filaments), clusters numbered 1, 2, ... by decreasing size
+    """
+    fiber1 = np.asarray(fiber1)
+    fiber2 = np.asarray(fiber2)
+
+    fil_ids, fil_idx = np.unique(np.concatenate([ fiber1, fiber2 ]), return_inverse=True)
+
+    n_links = fiber1.shape[0]
+    idx1 = fil_idx[:n_links]
+    idx2 = fil_idx[n_links:]
+
+    if edge_mask is not None:
+        edge_mask = np.asarray(edge_mask, dtype=bool)
+        idx1 = idx1[edge_mask]
+        idx2 = idx2[edge_mask]
+
+    labels, sizes = label_components(fil_ids.shape[0], idx1, idx2)
+
+    return fil_ids, labels, sizes
+
+def link_cluster_column(df, edge_mask=None):
+    """Cluster label of every row of a link report, replacing Cytosim's
+    'cluster' column. Each row gets the cluster of its fiber1 (which is also
+    the cluster of fiber2 unless the link was masked out).
+    """
+    fil_ids, labels, _ = link_clusters(df['fiber1'].to_numpy(), df['fiber2'].to_numpy(), edge_mask)
+
+    return labels[np.searchsorted(fil_ids, df['fiber1'].to_numpy())]
@@ -0,0 +1,121 @@
+"""Neighbour search within a cutoff distance, periodic boundaries included.
+
+All distance-based analyses (distance_cluster.py, bundle_length.py, ...)
+use this module, so that they honour the periodic box of the simulation.
+Neighbours are found with a KD-tree, which becomes a periodic KD-tree
+when the box dimensions are given (distances are then minimum image
+distances).
+
+The box is read from the Cytosim config file:
+
+set space cell
+{
+    shape = periodic
+}
+
+new cell
+{
+    length = 10, 10
+}
+"""
+import os
+import re
+
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.sparse import coo_matrix
+
+def read_box(config_path='config.cym'):
+    """Dimensions of the periodic simulation box
+
+    Returns: array of box lengths, None if the config file does not exist
+    or the space is not periodic
+    """
+    if not os.path.isfile(config_path):
+        return None
+
+    with open(config_path, 'r') as config_file:
+        # Cytosim comments start with %
+        text = re.sub(r'%.*', '', config_file.read())
+
+    # set space <name> { ... shape = periodic ... }
+    periodic_spaces = [ name for (name, block) in re.findall(r'set\s+space\s+(\w+)\s*\{([^}]*)\}', text) \
+                        if re.search(r'shape\s*=\s*periodic\b', block) ]
+
+    for name in periodic_spaces:
+        new_block = re.search(r'new\s+%s\s*\{([^}]*)\}' % name, text)
+
+        if new_block is None:
+            continue
+
+        length = re.search(r'length\s*=\s*([-+0-9.eE,\s]+)', new_block.group(1))
+
+        if length is not None:
+            return np.array([ float(x) for x in re.split(r'[,\s]+', length.group(1).strip()) if x ])
+
+    return None
+
+def wrap_positions(positions, box):
+    """Positions brought back into [0, box) along each axis"""
+    positions = np.asarray(positions, dtype=np.float64)
+    box = np.asarray(box, dtype=np.float64)
+
+    wrapped = np.mod(positions, box[:positions.shape[1]])
+
+    # np.mod can round up to the box length itself
+    wrapped[wrapped >= box[:positions.shape[1]]] = 0.0
+
+    return wrapped
+
+def minimum_image(displacements, box=None):
+    """Displacement vectors in the minimum image convention"""
+    displacements = np.asarray(displacements, dtype=np.float64)
+
+    if box is None:
+        return displacements
+
+    box = np.asarray(box, dtype=np.float64)[:displacements.shape[-1]]
+
+    return displacements - box*np.round(displacements/box)
+
+def build_tree(positions, box=None):
+    positions = np.asarray(positions, dtype=np.float64)
+
+    if box is None:
+        return cKDTree(positions)
+
+    box = np.asarray(box, dtype=np.float64)[:positions.shape[1]]
+
+    return cKDTree(wrap_positions(positions, box), boxsize=box)
+
+def neighbour_pairs(positions, cutoff, box=None):
+    """Pairs of points closer than cutoff (minimum image distance if box is given)
+
+    Returns: (i, j, distance) arrays with i < j
+    """
+    tree = build_tree(positions, box)
+
+    pairs = tree.query_pairs(cutoff, output_type='ndarray')
+    pair_i = pairs[:, 0]
+    pair_j = pairs[:, 1]
+
+    return pair_i, pair_j, pair_distances(tree.data[pair_i], tree.data[pair_j], box)
+
+def distance_matrix(positions, cutoff, box=None):
+    """Sparse symmetric matrix of the distances shorter than cutoff, built
+    from the pairs of neighbour_pairs
+
+    Coincident points are neighbours: their zero distances are stored as
+    explicit entries, use the row and col arrays rather than the nonzero
+    values to list the pairs.
+
+    Returns: scipy.sparse coo_matrix
+    """
+    n_points = np.asarray(positions).shape[0]
+    (pair_i, pair_j, distances) = neighbour_pairs(positions, cutoff, box)
+
+    return coo_matrix((np.r_[distances, distances], (np.r_[pair_i, pair_j], np.r_[pair_j, pair_i])), \
+                      shape=(n_points, n_points))
+
+def pair_distances(positions_i, positions_j, box=None):
+    return np.linalg.norm(minimum_image(np.asarray(positions_j) - np.asarray(positions_i), box), axis=-1)
@@ -0,0 +1,111 @@
+"""Radius of gyration of the filament clusters, for every frame of a run.
+
+The position report is generated using the Cytosim report function:
+report fiber:cluster_fiber_position
+
+All frames are read in a single pass over the (multi-frame) report, then
+the centroid and second moment of every (frame, cluster) group are
+computed at once with np.bincount.
+
+Usage:
+python radius_of_gyration.py -i cluster_fiber_position.txt -o rad_gyr.dat
+python radius_of_gyration.py -i cluster_fiber_position.txt --all
+
+Output (no header, one line per frame, or per frame and cluster with --all):
+frame    time    cluster    size    Rg
+"""
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from frame_reader import read_cluster_positions
+
+rad_gyr_columns = [ 'frame', 'time', 'cluster', 'size', 'Rg' ]
+
+def calc_group_radius_of_gyration(group_idx, positions, n_groups=None):
+    """Radius of gyration of the points of each group
+
+    group_idx: group index 0..n_groups-1 of each point
+    positions: (N, dim) array
+
+    Returns: (group sizes, Rg of each group), Rg^2 = <|r - r_com|^2>
+    """
+    group_idx = np.asarray(group_idx, dtype=np.int64)
+    positions = np.asarray(positions, dtype=np.float64)
+
+    if n_groups is None:
+        n_groups = group_idx.max() + 1 if group_idx.shape[0] else 0
+
+    sizes = np.bincount(group_idx, minlength=n_groups)
+
+    # Centroids first, then the second moment about them (two passes, no
+    # cancellation between <|r|^2> and |<r>|^2)
+    radius_gyr_sq = np.zeros(n_groups)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for dim in range(positions.shape[1]):
+            centroid = np.bincount(group_idx, weights=positions[:, dim], minlength=n_groups) / sizes
+
+            deviation = positions[:, dim] - centroid[group_idx]
+
+            radius_gyr_sq += np.bincount(group_idx, weights=deviation**2, minlength=n_groups) / sizes
+
+    return sizes, np.sqrt(radius_gyr_sq)
+
+def calc_radius_of_gyration(frames, times, clusters, positions):
+    """Radius of gyration of every (frame, cluster) group
+
+    frames, times, clusters: one entry per filament
+    positions: (N, dim) array
+
+    Returns: Pandas dataframe with the rad_gyr_columns, sorted by frame and cluster
+    """
+    frames = np.asarray(frames, dtype=np.int64)
+    clusters = np.asarray(clusters, dtype=np.int64)
+    times = np.asarray(times, dtype=np.float64)
+
+    keys = np.stack([ frames, clusters ])
+    group_keys, first_idx, group_idx = np.unique(keys, axis=1, return_index=True, return_inverse=True)
+    group_idx = group_idx.reshape(-1)
+
+    sizes, radius_gyr = calc_group_radius_of_gyration(group_idx, positions, group_keys.shape[1])
+
+    return pd.DataFrame({'frame': group_keys[0], \
+                         'time': times[first_idx], \
+                         'cluster': group_keys[1], \
+                         'size': sizes, \
+                         'Rg': radius_gyr})
+
+def select_largest_clusters(rad_gyr_df):
+    """Keep the largest cluster of each frame (ties: smallest cluster id)"""
+    rad_gyr_df = rad_gyr_df.sort_values(by=['frame', 'size', 'cluster'], ascending=[True, False, True], kind='stable')
+
+    return rad_gyr_df.drop_duplicates(subset='frame', keep='first').reset_index(drop=True)
+
+def get_args(argv):
+    parser = argparse.ArgumentParser(description='radius of gyration of the filament clusters of every frame')
+
+    parser.add_argument('--ifile', '-i', type=str, help='(multi-frame) cluster_fiber_position report')
+    parser.add_argument('--ofile', '-o', type=str, default=None, help='output file (default: input file with suffix .rad_gyr.dat)')
+    parser.add_argument('--all', default=False, action=argparse.BooleanOptionalAction, help='one line per cluster of each frame, instead of the largest cluster only')
+
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = get_args(argv)
+
+    input_file_path = Path(args.ifile)
+    output_file_path = Path(args.ofile) if args.ofile else input_file_path.with_suffix('.rad_gyr.dat')
+
+    rad_gyr_df = calc_radius_of_gyration(*read_cluster_positions(input_file_path))
+
+    if not args.all:
+        rad_gyr_df = select_largest_clusters(rad_gyr_df)
+
+    rad_gyr_df.to_csv(output_file_path, float_format='%.8f', header=False, index=None, sep="\t")
+
+if __name__=="__main__":
+    main(sys.argv[1:])
@@ -82,7 +82,7 @@ class Simulation():
 
         for root, dirs, files in os.walk(root_dir):
             for file in files:
-                if regex.match(file):
+                if regex.fullmatch(file):
                     file_path = Path(root).joinpath(file).absolute()
                     
                     if Path(root) == self.cwd:
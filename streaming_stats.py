@@ -0,0 +1,245 @@
+import numpy as np
+
+class RunningStats():
+    """Count, mean, variance (Welford) and min/max of a stream of values.
+
+    Values are fed in batches (e.g. one frame at a time) with update().
+    Partial results from different workers are combined with merge(),
+    which gives the same result as feeding all the values to one object.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # sum of squared deviations from the mean
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+
+        if values.size == 0:
+            return self
+
+        batch = RunningStats()
+        batch.count = values.size
+        batch.mean = values.mean()
+        batch.m2 = np.sum((values - batch.mean)**2)
+        batch.min = values.min()
+        batch.max = values.max()
+
+        return self.merge(batch)
+
+    def merge(self, other):
+        """Combine with another RunningStats (Chan et al. pairwise update)"""
+        if other.count == 0:
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        return self
+
+    def variance(self, ddof=0):
+        if self.count - ddof <= 0:
+            return float('nan')
+
+        return self.m2 / (self.count - ddof)
+
+    def std(self, ddof=0):
+        return np.sqrt(self.variance(ddof))
+
+    def to_dict(self):
+        return {'n': self.count, \
+                'mean': self.mean if self.count else float('nan'), \
+                'std': self.std(), \
+                'min': self.min if self.count else float('nan'), \
+                'max': self.max if self.count else float('nan')}
+
+class FixedHistogram():
+    """Histogram with bin edges fixed up front, so that histograms of
+    different frames or workers can be added bin by bin.
+
+    Values outside of the edges are counted in underflow/overflow.
+    """
+    def __init__(self, bins=100, range=(0.0, 1.0), edges=None):
+        if edges is None:
+            edges = np.linspace(range[0], range[1], bins + 1)
+
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(self.edges.shape[0] - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+
+        counts, _ = np.histogram(values, bins=self.edges)
+
+        self.counts += counts
+        self.underflow += int(np.count_nonzero(values < self.edges[0]))
+        self.overflow += int(np.count_nonzero(values > self.edges[-1]))
+
+        return self
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge histograms with different bin edges")
+
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+        return self
+
+    def bin_centers(self):
+        return (self.edges[1:] + self.edges[:-1])/2
+
+    def density(self):
+        total = self.counts.sum()
+
+        if total == 0:
+            return np.zeros(self.counts.shape)
+
+        return self.counts / (total * np.diff(self.edges))
+
+class QuantileSketch():
+    """Approximate quantiles with a bounded relative error (DDSketch).
+
+    Values are counted in logarithmically spaced buckets, so the number of
+    buckets only depends on the dynamic range of the data and the accuracy.
+    Sketches with the same accuracy merge exactly by adding bucket counts.
+
+    https://arxiv.org/abs/1908.10693
+    """
+    def __init__(self, relative_accuracy=0.01, min_value=1e-12):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.min_value = min_value # magnitudes below this count as zero
+
+        self.positive = {} # bucket index -> count
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add_to_store(self, store, magnitudes):
+        keys = np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
+        unique_keys, counts = np.unique(keys, return_counts=True)
+
+        for key, count in zip(unique_keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+
+        positive_mask = values > self.min_value
+        negative_mask = values < -self.min_value
+
+        self.add_to_store(self.positive, values[positive_mask])
+        self.add_to_store(self.negative, -values[negative_mask])
+
+        self.zero_count += int(values.size - np.count_nonzero(positive_mask) - np.count_nonzero(negative_mask))
+        self.count += values.size
+
+        return self
+
+    def merge(self, other):
+        if self.gamma != other.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+        return self
+
+    def bucket_value(self, key):
+        # Midpoint (in relative error) of the bucket (gamma^(key-1), gamma^key]
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def quantile(self, q):
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1, got %s" % q)
+
+        if self.count == 0:
+            return float('nan')
+
+        rank = q * (self.count - 1)
+
+        # Walk the buckets in increasing order of value
+        negative_keys = sorted(self.negative, reverse=True)
+        positive_keys = sorted(self.positive)
+
+        cumulative = 0
+
+        for key in negative_keys:
+            cumulative += self.negative[key]
+            if cumulative > rank:
+                return -self.bucket_value(key)
+
+        cumulative += self.zero_count
+        if cumulative > rank:
+            return 0.0
+
+        for key in positive_keys:
+            cumulative += self.positive[key]
+            if cumulative > rank:
+                return self.bucket_value(key)
+
+        # Rounding of the rank: the largest value of the sketch
+        if positive_keys:
+            return self.bucket_value(positive_keys[-1])
+
+        if self.zero_count:
+            return 0.0
+
+        return -self.bucket_value(negative_keys[-1])
+
+class StreamingSummary():
+    """Everything needed to describe a distribution accumulated frame by frame:
+    count, mean, std, min/max, a fixed-bin histogram and approximate quantiles.
+    """
+    def __init__(self, bins=100, range=(0.0, 1.0), relative_accuracy=0.01):
+        self.stats = RunningStats()
+        self.histogram = FixedHistogram(bins=bins, range=range)
+        self.sketch = QuantileSketch(relative_accuracy=relative_accuracy)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+
+        self.stats.update(values)
+        self.histogram.update(values)
+        self.sketch.update(values)
+
+        return self
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.histogram.merge(other.histogram)
+        self.sketch.merge(other.sketch)
+
+        return self
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def to_dict(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+        output = self.stats.to_dict()
+
+        for q in quantiles:
+            output['q%g' % (100*q)] = self.sketch.quantile(q)
+
+        return output
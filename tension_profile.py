@@ -0,0 +1,126 @@
+from data_class import Data
+from force_vectors import axial_forces
+
+import numpy as np
+import pandas as pd
+import sys
+
+class TensionProfile():
+	"""Axial tension along every filament, stored CSR-style:
+	the points of filament fil_ids[k] are offsets[k]:offsets[k+1] of the
+	abscissa, force and tension arrays, sorted by increasing abscissa.
+	"""
+	def __init__(self, fil_ids, offsets, abscissa, force, tension):
+		self.fil_ids = fil_ids
+		self.offsets = offsets
+		self.abscissa = abscissa
+		self.force = force
+		self.tension = tension
+
+	def __len__(self):
+		return self.fil_ids.shape[0]
+
+	def profile(self, fil_id):
+		"""Returns: (abscissa, tension) arrays of one filament"""
+		k = np.searchsorted(self.fil_ids, fil_id)
+
+		if (k == len(self)) or (self.fil_ids[k] != fil_id):
+			raise KeyError("No couples bound to filament %s" % fil_id)
+
+		segment = slice(self.offsets[k], self.offsets[k+1])
+
+		return self.abscissa[segment], self.tension[segment]
+
+	def to_dataframe(self):
+		fil_id = np.repeat(self.fil_ids, np.diff(self.offsets))
+
+		return pd.DataFrame({'fil_id': fil_id, \
+							 'abscissa': self.abscissa, \
+							 'f': self.force, \
+							 'tension': self.tension})
+
+def calc_tension_profile(fil_ids, abscissa, force):
+	"""Tension profile from the axial forces applied at attachment points.
+
+	Points are sorted by (filament, abscissa) with a single lexsort, then the
+	forces are summed along each filament from the minus end with a segmented
+	cumsum. The tension at a point is the tension of the filament segment on
+	its plus end side, assuming the filament is in force balance:
+
+		T(s_k) = - sum(f_i for s_i <= s_k)
+
+	(positive = stretched, negative = compressed; at the last point it is
+	-f_sum of fil_axial_forces.py)
+
+	Returns: TensionProfile
+	"""
+	fil_ids = np.asarray(fil_ids)
+	abscissa = np.asarray(abscissa, dtype=np.float64)
+	force = np.asarray(force, dtype=np.float64)
+
+	# lexsort sorts by the last key first
+	order = np.lexsort((abscissa, fil_ids))
+
+	fil_ids = fil_ids[order]
+	abscissa = abscissa[order]
+	force = force[order]
+
+	n_points = fil_ids.shape[0]
+
+	starts = np.flatnonzero(np.r_[True, fil_ids[1:] != fil_ids[:-1]]) if n_points else np.array([], dtype=np.int64)
+	offsets = np.r_[starts, n_points].astype(np.int64)
+
+	# Segmented cumsum: global cumsum minus the total of the previous filaments
+	cumulative = np.cumsum(force)
+	segment_base = np.repeat(cumulative[starts] - force[starts], np.diff(offsets))
+
+	tension = -(cumulative - segment_base)
+
+	return TensionProfile(fil_ids[starts], offsets, abscissa, force, tension)
+
+def calc_link_tension_profile(df):
+	"""Tension profile of all filaments in a link report, both hands of every
+	couple contribute one attachment point (fiberN, abscissaN)"""
+	# One row per couple, as with groupby('identity')
+	df = df.drop_duplicates('identity')
+
+	(f1, f2) = axial_forces(df)
+
+	fil_ids = np.concatenate([ df['fiber1'].to_numpy(), df['fiber2'].to_numpy() ])
+	abscissa = np.concatenate([ df['abscissa1'].to_numpy(), df['abscissa2'].to_numpy() ])
+
+	return calc_tension_profile(fil_ids, abscissa, np.concatenate([ f1, f2 ]))
+
+class FilTensionProfile(Data):
+	def __init__(self, column_list, argv=sys.argv[1:]):
+		super().__init__(argv=argv, column_list=column_list)
+
+		self.tension_profile = None # set by calc_tension_profile()
+
+	def calc_tension_profile(self):
+		self.tension_profile = calc_link_tension_profile(self.temp_dataframe)
+		self.output_df = self.tension_profile.to_dataframe()
+
+	def analyze_tension(self):
+		self.calc_tension_profile()
+		self.write_output_file()
+
+	def get_file_paths(self):
+		super().get_file_paths()
+
+		if not self.args.ofile:
+			output_file_path = self.file_dict["input"]["path"].with_suffix(".tension.dat")
+			self.file_dict["output"] = {"name": output_file_path.name, "path": output_file_path}
+
+	def write_output_file(self):
+		self.output_df.to_csv(self.file_dict["output"]["path"], float_format='%.8f', header=True, index=None, sep="\t")
+
+
+if __name__=="__main__":
+	column_list = [ 'cluster', 'identity', 'force', \
+					'fiber1', 'abscissa1', 'pos1X', 'pos1Y', 'dirFiber1X', 'dirFiber1Y', \
+					'fiber2', 'abscissa2', 'pos2X', 'pos2Y', 'dirFiber2X', 'dirFiber2Y' ]
+
+	myFilTensionProfile = FilTensionProfile(column_list)
+	myFilTensionProfile.analyze_tension()
+	del myFilTensionProfile
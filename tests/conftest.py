@@ -0,0 +1,12 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+@pytest.fixture(autouse=True, scope='session')
+def remove_frame_index_cache():
+    """Reports in tests/ get a frame index cache (frame_index.py), remove it
+    after the test session"""
+    yield
+
+    shutil.rmtree(Path(__file__).parent / '.frame_index', ignore_errors=True)
@@ -0,0 +1,124 @@
+from binding_intervals import read_bound_ids, occupancy_matrix, extract_intervals, summarize_bind_times, \
+                              BindingIntervalTracker, BindTimeAccumulator
+from couple_binding_time import main
+
+import numpy as np
+import pandas as pd
+import pytest
+
+def roll_call_durations(id_arrays, dt):
+    """Binding times of the old couple_binding_time.py prototype"""
+    durations = []
+    for cid in np.unique(np.concatenate(id_arrays)):
+        roll_call_str = ''.join('1' if cid in ids else '0' for ids in id_arrays)
+        durations += [ len(bind_seq)*dt for bind_seq in filter(None, roll_call_str.split('0')) ]
+
+    return durations
+
+def test_intervals():
+    id_arrays = [ np.array([1, 2]), np.array([2]), np.array([], dtype=np.int64), np.array([2, 5]), np.array([1, 5]) ]
+    times = np.arange(5) * 0.5
+
+    interval_df = extract_intervals(*occupancy_matrix(id_arrays), times)
+
+    assert interval_df['couple'].tolist() == [1, 1, 2, 2, 5]
+    assert interval_df['start'].tolist() == [0.0, 2.0, 0.0, 1.5, 1.5]
+    assert interval_df['end'].tolist() == [0.0, 2.0, 0.5, 1.5, 2.0]
+    assert interval_df['n_frames'].tolist() == [1, 1, 2, 1, 2]
+    assert np.allclose(interval_df['duration'], [0.5, 0.5, 1.0, 0.5, 1.0])
+    assert interval_df['left_censored'].tolist() == [True, False, True, False, False]
+    assert interval_df['right_censored'].tolist() == [False, True, False, False, True]
+
+def test_matches_roll_call():
+    rng = np.random.default_rng(4)
+    id_arrays = [ np.flatnonzero(rng.random(30) < 0.6) for _ in range(25) ]
+
+    interval_df = extract_intervals(*occupancy_matrix(id_arrays), np.arange(25) * 0.2, dt=0.2)
+
+    assert np.allclose(np.sort(interval_df['duration']), np.sort(roll_call_durations(id_arrays, 0.2)))
+
+def test_exponential_fit():
+    rng = np.random.default_rng(1)
+    bind_times = rng.exponential(2.0, size=200000)
+
+    stats = summarize_bind_times(bind_times)
+
+    assert stats['N'] == 200000
+    assert np.isclose(stats['K'], 0.5, rtol=0.1)
+
+def test_read_bound_ids():
+    (times, id_arrays) = read_bound_ids('link_cluster_two_frames.txt')
+
+    assert times.shape[0] == len(id_arrays) == 2
+    assert np.all(np.diff(times) >= 0)
+    assert all(np.all(np.diff(ids) > 0) for ids in id_arrays)
+
+def test_tracker_matches_occupancy():
+    rng = np.random.default_rng(5)
+    id_arrays = [ np.flatnonzero(rng.random(30) < 0.6) for _ in range(25) ]
+    times = np.arange(25) * 0.2
+
+    tracker = BindingIntervalTracker()
+    ended = [ tracker.update(time, ids) for (time, ids) in zip(times, id_arrays) ] + [ tracker.finish() ]
+
+    stream_df = pd.concat(ended, ignore_index=True).sort_values(['couple', 'start'], ignore_index=True)
+    interval_df = extract_intervals(*occupancy_matrix(id_arrays), times, dt=0.2)
+
+    assert np.isclose(tracker.dt, 0.2)
+    assert tracker.bound_ids.shape[0] == 0
+    pd.testing.assert_frame_equal(stream_df, interval_df, check_dtype=False)
+
+def test_accumulator_matches_summary():
+    rng = np.random.default_rng(6)
+    n_frames = rng.geometric(0.2, size=1001)
+    interval_df = pd.DataFrame({'n_frames': n_frames, \
+                                'left_censored': n_frames > 20, \
+                                'right_censored': False})
+
+    accumulator = BindTimeAccumulator()
+    accumulator.add(interval_df.iloc[:500])
+    accumulator.add(interval_df.iloc[500:])
+
+    stats = accumulator.summarize(0.1, bins=30)
+    expected = summarize_bind_times(n_frames * 0.1, bins=30)
+
+    for key in expected:
+        assert np.isclose(stats[key], expected[key])
+
+    accumulator = BindTimeAccumulator(include_censored=False)
+    accumulator.add(interval_df)
+
+    assert accumulator.summarize(0.1)['N'] == np.sum(n_frames <= 20)
+
+def write_report(file_path, id_lists):
+    with open(file_path, 'w') as report_file:
+        for (k, ids) in enumerate(id_lists):
+            report_file.write('%% frame %d\n%% time %.1f\n%% identity fiber1\n' % (k, 0.5*k))
+            report_file.writelines('%d 1\n' % cid for cid in ids)
+            report_file.write('% end\n\n')
+
+def test_single_frame_needs_dt(tmp_path):
+    report_path = tmp_path / 'links.txt'
+    write_report(report_path, [[1, 2]])
+
+    for stream_argv in ([], ['--stream']):
+        with pytest.raises(ValueError, match='dt'):
+            main(['-i', str(report_path)] + stream_argv)
+
+        main(['0.5', '-i', str(report_path)] + stream_argv)
+        assert pd.read_csv(tmp_path / 'links.intervals.dat', sep='\t')['duration'].tolist() == [0.5, 0.5]
+
+    with pytest.raises(ValueError, match='dt'):
+        BindTimeAccumulator().summarize(None)
+
+def test_no_intervals(tmp_path, capsys):
+    for stats in (summarize_bind_times([]), BindTimeAccumulator().summarize(0.5)):
+        assert stats['N'] == 0
+        assert all(np.isnan(stats[key]) for key in ['mean', 'std', 'median', 'K', 'A'])
+
+    report_path = tmp_path / 'links.txt'
+    write_report(report_path, [[], [], []])
+
+    for stream_argv in ([], ['--stream']):
+        main(['-i', str(report_path)] + stream_argv)
+        assert 'N = 0' in capsys.readouterr().out
@@ -0,0 +1,68 @@
+from bundle_length import point_set_diameter, calc_bundle_lengths
+
+import numpy as np
+from scipy.spatial.distance import pdist, squareform
+
+def test_diameter_matches_all_pairs():
+    rng = np.random.default_rng(3)
+
+    for n_points in [2, 3, 4, 10, 200]:
+        points = rng.normal(size=(n_points, 2))*[3.0, 0.5]
+        assert np.isclose(point_set_diameter(points), pdist(points).max())
+
+    # Points on a circle: every point is a hull vertex
+    theta = rng.uniform(0, 2*np.pi, size=100)
+    points = np.stack([ np.cos(theta), np.sin(theta) ], axis=1)
+    assert np.isclose(point_set_diameter(points), pdist(points).max())
+
+def test_degenerate_clusters():
+    assert point_set_diameter(np.array([[1.0, 1.0]])) == 0.0
+
+    collinear = np.array([[0.0, 0.0], [1.0, 1.0], [3.0, 3.0], [2.0, 2.0]])
+    assert np.isclose(point_set_diameter(collinear), np.sqrt(18))
+
+def test_neighbour_cutoff():
+    frames = [1, 1, 1, 2, 2]
+    times = [0.1, 0.1, 0.1, 0.2, 0.2]
+    clusters = [4, 4, 4, 4, 4]
+    # Third filament of the first frame has no neighbour within 0.25
+    positions = [[0.0, 0.0], [0.2, 0.0], [2.0, 0.0], [0.0, 0.0], [0.0, 1.0]]
+
+    length_df = calc_bundle_lengths(frames, times, clusters, positions)
+    assert np.allclose(length_df['end_end_length'], [2.0, 1.0])
+    assert length_df['cluster_size'].tolist() == [3, 2]
+
+    # Longest distance from the first two filaments to any filament, no
+    # filament of the second frame has a neighbour
+    length_df = calc_bundle_lengths(frames, times, clusters, positions, neighbour_cutoff=0.25)
+    assert np.isclose(length_df['end_end_length'][0], 2.0)
+    assert np.isnan(length_df['end_end_length'][1])
+
+def test_neighbour_cutoff_matches_old_check():
+    rng = np.random.default_rng(7)
+    positions = rng.uniform(0, 2, size=(60, 2))
+
+    # Old script: max distance from the filaments with a neighbour closer
+    # than the cutoff, zero distances left out
+    distances = squareform(pdist(positions))
+    distances[distances == 0] = np.nan
+    has_neighbour = np.nanmin(distances, axis=0) < 0.25
+    expected = np.nanmax(distances[has_neighbour])
+
+    length_df = calc_bundle_lengths(np.ones(60), np.ones(60), np.ones(60), positions, neighbour_cutoff=0.25)
+    assert np.isclose(length_df['end_end_length'][0], expected)
+
+def test_periodic_bundle():
+    box = np.array([10.0, 10.0])
+    # Bundle across the x boundary, and one longer than half the box
+    positions = [[9.7, 5.0], [9.9, 5.0], [0.1, 5.0], [0.3, 5.0]] + [[0.5*k % 10, 2.0] for k in range(14)]
+    clusters = [1]*4 + [2]*14
+
+    length_df = calc_bundle_lengths(np.ones(18), np.ones(18), clusters, positions, box=box)
+    assert np.isclose(length_df['end_end_length'][0], 0.6)
+
+    length_df = calc_bundle_lengths(np.ones(18), np.ones(18), clusters, positions, neighbour_cutoff=0.25, box=box)
+    assert np.isclose(length_df['end_end_length'][0], 0.6)
+
+    length_df = calc_bundle_lengths(np.ones(18), np.ones(18), clusters, positions, neighbour_cutoff=0.6, box=box)
+    assert np.allclose(length_df['end_end_length'], [0.6, 6.5])
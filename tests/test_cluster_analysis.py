@@ -0,0 +1,55 @@
+from cluster_analysis import Cluster
+
+import pytest
+
+column_list = ['cluster', 'identity', 'fiber1', 'fiber2', 'cos_angle']
+
+@pytest.fixture
+def myCluster(tmp_path):
+	return Cluster(column_list, argv=['--ifile', 'link_cluster.txt', \
+									  '--ofile', str(tmp_path.joinpath('link_cluster.dat')), \
+									  '--largest'])
+
+def test_get_num_parallel_fil_pairs(myCluster):
+	# Reference values in link_cluster.dat
+	assert myCluster.get_num_parallel_fil_pairs() == (104, 85)
+
+def test_count_parallel_fils(myCluster):
+	assert myCluster.count_parallel_fils() == (100, 76, 176)
+
+def test_count_parallel_fils_groupby(myCluster):
+	df = myCluster.temp_dataframe
+
+	num_parallel_fils = 0
+	num_antiparallel_fils = 0
+	num_unique_fil_pairs = 0
+
+	for fil1_id, df_fil1 in df.groupby('fiber1'):
+		num_parallel_fils += len(df_fil1['fiber2'][df_fil1['cos_angle']>0].drop_duplicates())
+		num_antiparallel_fils += len(df_fil1['fiber2'][df_fil1['cos_angle']<= 0].drop_duplicates())
+		num_unique_fil_pairs += len(df_fil1['fiber2'].drop_duplicates())
+
+	assert myCluster.count_parallel_fils() == (num_parallel_fils, num_antiparallel_fils, num_unique_fil_pairs)
+
+def test_calc_cluster_statistics(tmp_path):
+	output_file = str(tmp_path.joinpath('link_cluster.dat'))
+
+	allClusters = Cluster(column_list, argv=['--ifile', 'link_cluster.txt', \
+											 '--ofile', output_file, \
+											 '--allclusters'])
+
+	stats_df = allClusters.calc_cluster_stats()
+
+	assert stats_df['cluster'].is_unique
+	assert stats_df['Nc'].sum() == allClusters.temp_dataframe['identity'].nunique()
+
+	for cluster_id in stats_df['cluster'].values[:3]:
+		oneCluster = Cluster(column_list, argv=['--ifile', 'link_cluster.txt', \
+												'--ofile', output_file, \
+												'--cluster', str(cluster_id)])
+
+		expected = oneCluster.calc_cluster_stats().iloc[0]
+		row = stats_df[stats_df['cluster'] == cluster_id].iloc[0]
+
+		for col in expected.index:
+			assert row[col] == pytest.approx(expected[col])
@@ -0,0 +1,34 @@
+from cluster_forces import calc_cluster_forces
+
+import numpy as np
+import pandas as pd
+
+def test_dipole_two_couples():
+    # Cluster 1: tension 2 along x (length 1) and tension 1 along y
+    # (length 3), cluster 2: tension 1 along the diagonal (length sqrt(2))
+    df = pd.DataFrame({'cluster': [1, 1, 2], \
+                       'identity': [10, 11, 12], \
+                       'force': [2.0, 1.0, 1.0], \
+                       'pos1X': [0.0, 5.0, 1.0], \
+                       'pos1Y': [0.0, 5.0, 1.0], \
+                       'pos2X': [1.0, 5.0, 2.0], \
+                       'pos2Y': [0.0, 8.0, 2.0]})
+
+    cluster_df = calc_cluster_forces(df)
+
+    assert cluster_df['cluster'].tolist() == [1, 2]
+    assert cluster_df['n_couples'].tolist() == [2, 1]
+    assert np.allclose(cluster_df['cx'], [2.75, 1.5])
+    assert np.allclose(cluster_df['cy'], [3.25, 1.5])
+
+    # -f*L*u_a*u_b summed over the couples
+    dipole = cluster_df[['Dxx', 'Dxy', 'Dyx', 'Dyy']].to_numpy()
+    assert np.allclose(dipole[0], [-2.0, 0.0, 0.0, -3.0])
+    assert np.allclose(dipole[1], -np.sqrt(2)/2)
+
+    # Independent of the origin
+    shifted_df = df.assign(pos1X=df['pos1X'] + 7.0, pos2X=df['pos2X'] + 7.0, pos1Y=df['pos1Y'] - 3.0, pos2Y=df['pos2Y'] - 3.0)
+    assert np.allclose(calc_cluster_forces(shifted_df)[['Dxx', 'Dxy', 'Dyx', 'Dyy']].to_numpy(), dipole)
+
+    # Repeated couple rows count once
+    assert np.allclose(calc_cluster_forces(pd.concat([df, df.iloc[[0]]]))[['Dxx', 'Dxy', 'Dyx', 'Dyy']].to_numpy(), dipole)
@@ -0,0 +1,103 @@
+import cluster_time_series
+from cluster_time_series import ClusterTimeSeries
+from frame_manifest import FrameManifest
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+argv = ['--prefixframe', 'report', '--extframe', 'txt', '--nproc', '1']
+
+@pytest.fixture
+def frame_dir(tmp_path, monkeypatch):
+    """Three copies of link_cluster.txt at times 100, 101 and 102"""
+    report_lines = (Path(__file__).parent / 'link_cluster.txt').read_text().splitlines(keepends=True)
+
+    for k in range(3):
+        lines = [ '%% time %d.000\n' % (100 + k) if line.startswith('% time') else line for line in report_lines ]
+        (tmp_path / ('report%d.txt' % k)).write_text(''.join(lines))
+
+    monkeypatch.chdir(tmp_path)
+
+    return tmp_path
+
+@pytest.fixture
+def processed(monkeypatch):
+    """Frame files analyzed by the (in-process) worker"""
+    file_names = []
+    worker = cluster_time_series.calc_frame_cluster_stats
+
+    def counting_worker(task):
+        file_names.append(Path(task[0]).name)
+        return worker(task)
+
+    monkeypatch.setattr(cluster_time_series, 'calc_frame_cluster_stats', counting_worker)
+
+    return file_names
+
+def run(extra_argv=[]):
+    myClusterTimeSeries = ClusterTimeSeries(argv=argv + extra_argv)
+    myClusterTimeSeries.calc_time_series()
+    myClusterTimeSeries.write_output()
+
+    return pd.read_csv('cluster_stats.dat', sep="\t")
+
+def test_rerun_reuses_rows(frame_dir, processed):
+    first_df = run()
+    assert sorted(processed) == ['report0.txt', 'report1.txt', 'report2.txt']
+    assert first_df['time'].tolist() == [100.0, 101.0, 102.0]
+
+    processed.clear()
+    second_df = run()
+
+    assert processed == []
+    pd.testing.assert_frame_equal(first_df, second_df)
+
+def test_option_change_invalidates(frame_dir, processed):
+    largest_df = run()
+
+    processed.clear()
+    all_df = run(['--no-largest'])
+
+    assert sorted(processed) == ['report0.txt', 'report1.txt', 'report2.txt']
+    assert all_df['time'].tolist() == [100.0, 101.0, 102.0]
+    assert (all_df['Nc'] > largest_df['Nc']).all()
+
+    manifest = FrameManifest('cluster_stats.dat.manifest')
+    assert all(manifest.is_current(path, '--no-largest') for path in frame_dir.glob('report*.txt'))
+    assert not manifest.is_current(frame_dir / 'report0.txt', '--largest')
+
+def test_modified_and_deleted_frames(frame_dir, processed):
+    first_df = run()
+
+    # report1: only the first 20 couples left, report2: deleted
+    report_path = frame_dir / 'report1.txt'
+    lines = report_path.read_text().splitlines(keepends=True)
+    header_end = max(k for (k, line) in enumerate(lines[:10]) if line.startswith('%')) + 1
+    report_path.write_text(''.join(lines[:header_end + 20]))
+    os.utime(report_path, ns=(0, 0))
+
+    os.remove(frame_dir / 'report2.txt')
+
+    processed.clear()
+    second_df = run()
+
+    assert processed == ['report1.txt']
+    assert second_df['time'].tolist() == [100.0, 101.0]
+    pd.testing.assert_series_equal(second_df.iloc[0], first_df.iloc[0])
+    assert second_df['Nc'][1] < first_df['Nc'][1]
+
+    assert sorted(FrameManifest('cluster_stats.dat.manifest').files()) == ['report0.txt', 'report1.txt']
+
+def test_pool_matches_serial(frame_dir):
+    serial_df = run()
+
+    os.remove('cluster_stats.dat')
+    os.remove('cluster_stats.dat.manifest')
+
+    pool_df = run(['--nproc', '2'])
+
+    pd.testing.assert_frame_equal(serial_df, pool_df)
@@ -0,0 +1,144 @@
+from cluster_tracking import ClusterTracker, best_match, main
+
+import numpy as np
+import pandas as pd
+
+def events(lineage_df, event):
+    """(parent, child, overlap) of the lineage events of one type, sorted"""
+    event_df = lineage_df[lineage_df['event'] == event]
+
+    return sorted(zip(event_df['parent'].tolist(), event_df['child'].tolist(), event_df['overlap'].tolist()))
+
+def test_merge_and_split():
+    myTracker = ClusterTracker()
+
+    tracks_df, _ = myTracker.update(1.0, [1, 1, 1, 2, 2], [1, 2, 3, 4, 5])
+    assert tracks_df['track'].tolist() == [1, 2]
+
+    # Both clusters merge, the larger one keeps its track
+    tracks_df, lineage_df = myTracker.update(2.0, [7, 7, 7, 7, 7], [1, 2, 3, 4, 5])
+    assert tracks_df['track'].tolist() == [1]
+    assert sorted(lineage_df.loc[lineage_df['event'] == 'merge', 'parent'].tolist()) == [1, 2]
+
+    # Split with renumbered cluster ids
+    tracks_df, lineage_df = myTracker.update(3.0, [1, 1, 2, 2, 2], [4, 5, 1, 2, 3])
+    assert tracks_df['track'].tolist() == [3, 1]
+    assert sorted(lineage_df.loc[lineage_df['event'] == 'split', 'child'].tolist()) == [1, 3]
+
+def test_merge_events():
+    myTracker = ClusterTracker()
+    myTracker.update(1.0, [1, 1, 1, 2, 2, 3], [1, 2, 3, 4, 5, 6])
+
+    # Tracks 1 and 2 merge into one cluster, track 3 is left alone
+    tracks_df, lineage_df = myTracker.update(2.0, [5, 5, 5, 5, 5, 6], [1, 2, 3, 4, 5, 6])
+
+    assert tracks_df['track'].tolist() == [1, 3]
+    assert events(lineage_df, 'merge') == [(1, 1, 3), (2, 1, 2)]
+    assert events(lineage_df, 'split') == []
+    # The merged track 2 has a successor, so it does not die
+    assert events(lineage_df, 'death') == []
+    assert events(lineage_df, 'birth') == []
+
+def test_split_events():
+    myTracker = ClusterTracker()
+    myTracker.update(1.0, [1, 1, 1, 1, 1], [1, 2, 3, 4, 5])
+
+    tracks_df, lineage_df = myTracker.update(2.0, [3, 3, 4, 4, 4], [1, 2, 3, 4, 5])
+
+    # The largest part continues the track, the other part gets a new one
+    assert tracks_df['cluster'].tolist() == [3, 4]
+    assert tracks_df['track'].tolist() == [2, 1]
+    assert tracks_df['size'].tolist() == [2, 3]
+    assert events(lineage_df, 'split') == [(1, 1, 3), (1, 2, 2)]
+    assert events(lineage_df, 'merge') == []
+    assert events(lineage_df, 'birth') == []
+
+def test_birth_and_death():
+    myTracker = ClusterTracker()
+
+    tracks_df, lineage_df = myTracker.update(1.0, [1, 1, 2], [1, 2, 3])
+    assert events(lineage_df, 'birth') == [(-1, 1, 0), (-1, 2, 0)]
+
+    # Filament 3 is gone with its cluster, filaments 8 and 9 form a new one
+    tracks_df, lineage_df = myTracker.update(2.0, [1, 1, 2, 2], [1, 2, 8, 9])
+
+    assert tracks_df['track'].tolist() == [1, 3]
+    assert events(lineage_df, 'birth') == [(-1, 3, 0)]
+    assert events(lineage_df, 'death') == [(2, -1, 0)]
+
+    # A death is dated at the last frame in which the track was seen
+    assert lineage_df.loc[lineage_df['event'] == 'death', 'time'].tolist() == [1.0]
+    assert lineage_df.loc[lineage_df['event'] == 'birth', 'time'].tolist() == [2.0]
+
+def test_min_overlap():
+    myTracker = ClusterTracker(min_overlap=2)
+    myTracker.update(1.0, [1, 1, 1, 2], [1, 2, 3, 4])
+
+    # Cluster 2 only shares one filament with the previous frame
+    tracks_df, lineage_df = myTracker.update(2.0, [1, 1, 2, 2], [1, 2, 3, 4])
+
+    assert tracks_df['track'].tolist() == [1, 3]
+    assert events(lineage_df, 'birth') == [(-1, 3, 0)]
+    assert events(lineage_df, 'death') == [(2, -1, 0)]
+    assert events(lineage_df, 'split') == []
+
+def test_best_match_ties():
+    rows = np.array([0, 0, 0, 1, 1])
+    cols = np.array([5, 2, 3, 4, 1])
+    counts = np.array([2, 2, 1, 3, 3])
+
+    (best_rows, best_cols, best_counts) = best_match(rows, cols, counts)
+
+    assert best_rows.tolist() == [0, 1]
+    assert best_cols.tolist() == [2, 1]
+    assert best_counts.tolist() == [2, 3]
+
+def test_even_split_tie():
+    myTracker = ClusterTracker()
+    myTracker.update(1.0, [1, 1, 1, 1], [1, 2, 3, 4])
+
+    # An even split: the track goes to the cluster with the smallest id
+    tracks_df, lineage_df = myTracker.update(2.0, [9, 9, 4, 4], [1, 2, 3, 4])
+
+    assert tracks_df['cluster'].tolist() == [4, 9]
+    assert tracks_df['track'].tolist() == [1, 2]
+    assert events(lineage_df, 'split') == [(1, 1, 2), (1, 2, 2)]
+
+def test_not_mutual_best_match():
+    myTracker = ClusterTracker()
+    myTracker.update(1.0, [1, 1, 1, 2, 2, 2, 2, 2], [1, 2, 3, 4, 5, 6, 7, 8])
+
+    # Cluster 5 is the best match of track 1 (3 filaments), but its own best
+    # match is track 2 (5 filaments): track 1 is not continued
+    tracks_df, lineage_df = myTracker.update(2.0, [5]*8, [1, 2, 3, 4, 5, 6, 7, 8])
+
+    assert tracks_df['track'].tolist() == [2]
+    assert events(lineage_df, 'merge') == [(1, 2, 3), (2, 2, 5)]
+
+def test_main(tmp_path):
+    report_path = tmp_path / 'cluster_fiber_position.txt'
+
+    frames = [ (0, 1.0, [(1, 1), (1, 2), (2, 3)]), \
+               (1, 2.0, [(4, 1), (4, 2), (4, 3)]), \
+               (2, 3.0, [(2, 1), (2, 2), (3, 3), (5, 7)]) ]
+
+    with open(report_path, 'w') as report_file:
+        for (frame, time, rows) in frames:
+            report_file.write('%% frame %d\n%% time %.1f\n%% cluster fiber_id\n' % (frame, time))
+            report_file.writelines('%d %d\n' % row for row in rows)
+            report_file.write('% end\n\n')
+
+    main(['-i', str(report_path)])
+
+    tracks_df = pd.read_csv(tmp_path / 'cluster_fiber_position.tracks.dat', sep='\t')
+    lineage_df = pd.read_csv(tmp_path / 'cluster_fiber_position.lineage.dat', sep='\t')
+
+    assert tracks_df.columns.tolist() == ['frame', 'time', 'cluster', 'track', 'size']
+    assert tracks_df['frame'].tolist() == [0, 0, 1, 2, 2, 2]
+    assert tracks_df['track'].tolist() == [1, 2, 1, 1, 3, 4]
+    assert tracks_df['size'].tolist() == [2, 1, 3, 2, 1, 1]
+
+    assert lineage_df['event'].tolist() == ['birth', 'birth', 'merge', 'merge', 'split', 'split', 'birth']
+    assert lineage_df['time'].tolist() == [1.0, 1.0, 2.0, 2.0, 3.0, 3.0, 3.0]
+    assert events(lineage_df, 'split') == [(1, 1, 2), (1, 3, 1)]
+    assert events(lineage_df, 'birth') == [(-1, 1, 0), (-1, 2, 0), (-1, 4, 0)]
@@ -1,4 +1,4 @@
-from data_class import Data, RuntimeArgumentError, MultiFrameError
+from data_class import Data, RowPredicate, RuntimeArgumentError, MultiFrameError
 import argparse
 from pathlib import Path, PosixPath
 import pandas as pd
@@ -63,6 +63,63 @@ def test_preprocess_file_multiple_frames():
 
 	assert str(exp.value) == "Data for more than one frame loaded."
 
+def test_row_predicate_from_string():
+	predicate = RowPredicate.from_string('force>0.05')
+	assert (predicate.column, predicate.op, predicate.value) == ('force', '>', 0.05)
+
+	predicate = RowPredicate.from_string('class in 1,2')
+	assert (predicate.column, predicate.op, predicate.value) == ('class', 'in', {1.0, 2.0})
+
+	with pytest.raises(RuntimeArgumentError):
+		RowPredicate.from_string('force ~ 0.05')
+
+def test_preprocess_file_predicates():
+	column_list = ['identity', 'fiber1', 'fiber2', 'cluster', 'force', 'cos_angle']
+
+	myData = Data(argv=['--ifile', 'link_cluster.txt', \
+						'--no-largest', \
+						'--filter', 'force>0.05'], \
+				  column_list=column_list, \
+				  predicates=[RowPredicate('cos_angle', '>', 0)])
+
+	assert myData.temp_dataframe.shape[0] > 0
+	assert (myData.temp_dataframe['force'] > 0.05).all()
+	assert (myData.temp_dataframe['cos_angle'] > 0).all()
+
+def test_largest_cluster_predicate():
+	column_list = ['identity', 'fiber1', 'fiber2', 'cluster', 'force', 'cos_angle']
+
+	myData = Data(argv=['--ifile', 'link_cluster.txt', \
+						'--no-largest'], \
+				  column_list=column_list)
+
+	all_df = myData.temp_dataframe
+
+	myData = Data(argv=['--ifile', 'link_cluster.txt', \
+						'--largest'], \
+				  column_list=column_list)
+
+	assert myData.largest_cluster_id == all_df['cluster'].mode().values[0]
+	assert myData.largest_cluster_size == (all_df['cluster'] == myData.largest_cluster_id).sum()
+	assert (myData.temp_dataframe['cluster'] == myData.largest_cluster_id).all()
+
+	# The cluster size does not depend on the row filters
+	myFilteredData = Data(argv=['--ifile', 'link_cluster.txt', \
+								'--largest', \
+								'--filter', 'force>0.05'], \
+						  column_list=column_list)
+
+	assert myFilteredData.largest_cluster_id == myData.largest_cluster_id
+	assert myFilteredData.temp_dataframe.shape[0] < myData.temp_dataframe.shape[0]
+	assert myFilteredData.largest_cluster_size == myData.largest_cluster_size
+
+	myClusterData = Data(argv=['--ifile', 'link_cluster.txt', \
+							   '--cluster', str(myData.largest_cluster_id), \
+							   '--filter', 'force>0.05'], \
+						 column_list=column_list)
+
+	assert myClusterData.largest_cluster_size == myData.largest_cluster_size
+
 # def test_write_output_file():
 # 	pass
 #
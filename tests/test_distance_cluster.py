@@ -0,0 +1,25 @@
+from distance_cluster import distance_clusters
+from link_components import label_components
+
+import numpy as np
+from scipy.spatial.distance import pdist, squareform
+
+def test_transitive_clusters():
+    # 0-1-2 chained within the cutoff, although 0 and 2 are not neighbours
+    positions = np.array([[0.0, 0.0], [0.4, 0.0], [0.8, 0.0], [5.0, 5.0], [5.3, 5.0]])
+
+    labels, sizes = distance_clusters(positions, 0.5)
+
+    assert labels.tolist() == [1, 1, 1, 2, 2]
+    assert sizes.tolist() == [3, 2]
+
+def test_matches_all_pairs():
+    positions = np.random.default_rng(0).uniform(0, 10, size=(400, 2))
+
+    neighbours = squareform(pdist(positions)) <= 0.5
+    pair_i, pair_j = np.nonzero(np.triu(neighbours, k=1))
+
+    expected_labels, _ = label_components(positions.shape[0], pair_i, pair_j)
+    labels, _ = distance_clusters(positions, 0.5)
+
+    assert labels.tolist() == expected_labels.tolist()
@@ -0,0 +1,68 @@
+from dwell_time import calc_k_off
+from dwell_time_series import calc_dwell_time_series, calc_couple_dwell_times, calc_frame_intervals, get_args
+
+import numpy as np
+import pandas as pd
+import pytest
+
+def test_k_off():
+    assert np.allclose(calc_k_off([0.0, 2.5], 0.1, 2.5), [0.1, 0.1*np.e])
+
+def test_dwell_time_series():
+    frame_numbers = np.array([10, 11, 12])
+    frame_times = np.array([1.0, 1.1, 1.2])
+    frame_idx = np.array([0, 0, 0, 2, 2])
+    forces = np.array([0.0, 1.0, 2.0, 0.5, 1.5])
+
+    dwell_df = calc_dwell_time_series(frame_numbers, frame_times, frame_idx, forces, 0.1, 2.5)
+
+    assert dwell_df['n_couples'].tolist() == [3, 0, 2]
+    assert np.allclose(dwell_df['mean_force'], [1.0, np.nan, 1.0], equal_nan=True)
+
+    # Same as DwellTime.calc_avg_dwell_time() on each frame
+    for (k, frame_forces) in [(0, forces[:3]), (2, forces[3:])]:
+        k_off = pd.Series(frame_forces).apply(lambda x: 0.1 * np.exp(x/2.5))
+        assert np.isclose(dwell_df['dwell_time'][k], 1/k_off.mean())
+
+    assert np.isnan(dwell_df['dwell_time'][1])
+
+def test_couple_dwell_times():
+    # Couple 3 is bound in frames 0 and 2, the empty frame 1 splits its interval
+    frame_times = np.array([0.0, 0.5, 1.0])
+    frame_idx = np.array([0, 0, 2, 2])
+    couples = np.array([3, 4, 3, 4])
+    forces = np.array([0.0, 1.0, 2.0, 3.0])
+
+    interval_df = calc_frame_intervals(frame_times, frame_idx, couples)
+    assert interval_df['n_frames'].tolist() == [1, 1, 1, 1]
+
+    couple_df = calc_couple_dwell_times(couples, forces, interval_df[interval_df.couple == 3], 0.1, 2.5)
+
+    assert couple_df['couple'].tolist() == [3, 4]
+    assert couple_df['n_samples'].tolist() == [2, 2]
+    assert couple_df['n_intervals'].tolist() == [2, 0]
+    assert np.isclose(couple_df['predicted_dwell_time'][0], 1/np.mean(calc_k_off([0.0, 2.0], 0.1, 2.5)))
+    assert np.isclose(couple_df['observed_dwell_time'][0], 0.5)
+    assert np.isnan(couple_df['observed_dwell_time'][1])
+
+def test_frame_intervals_in_time_order():
+    # The frame at time 1.0 comes first in the file
+    frame_times = np.array([1.0, 0.0, 0.5])
+    frame_idx = np.array([0, 0, 1, 1, 2])
+    couples = np.array([3, 4, 3, 4, 4])
+
+    interval_df = calc_frame_intervals(frame_times, frame_idx, couples)
+
+    assert interval_df['couple'].tolist() == [3, 3, 4]
+    assert interval_df['start'].tolist() == [0.0, 1.0, 0.0]
+    assert interval_df['n_frames'].tolist() == [1, 1, 3]
+    assert interval_df['left_censored'].tolist() == [True, False, True]
+
+def test_required_arguments():
+    argv = ['-i', 'links.txt', '--unbindingrate', '0.1', '--unbindingforce', '2.5']
+
+    assert get_args(argv).unbindingforce == 2.5
+
+    for k in range(0, len(argv), 2):
+        with pytest.raises(SystemExit):
+            get_args(argv[:k] + argv[k+2:])
@@ -0,0 +1,105 @@
+from fil_axial_forces_trace import main
+
+import os
+import sys
+import shutil
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+repo_dir = Path(__file__).resolve().parent.parent
+
+def run_script(script_name, cwd):
+    """Run a single frame script on link_cluster.txt, returns its .sum.dat"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ str(repo_dir), os.environ.get('PYTHONPATH', '') ]))
+
+    subprocess.run([ sys.executable, str(repo_dir / script_name), '-i', 'link_cluster.txt', '-o', script_name + '.out' ], \
+                   cwd=cwd, env=env, check=True)
+
+    return pd.read_csv(cwd / 'link_cluster.sum.dat', sep='\t')
+
+@pytest.fixture(scope='module')
+def single_frame_sums(tmp_path_factory):
+    work_dir = tmp_path_factory.mktemp('single_frame')
+    shutil.copy(Path(__file__).parent / 'link_cluster.txt', work_dir)
+
+    couple_sum_df = run_script('couple_forces.py', work_dir)
+    fil_sum_df = run_script('fil_axial_forces.py', work_dir)
+
+    return pd.concat([couple_sum_df, fil_sum_df], axis=1)
+
+@pytest.mark.parametrize('nproc', [1, 2])
+def test_trace_matches_single_frame_scripts(tmp_path, single_frame_sums, nproc):
+    output_file_path = tmp_path / 'trace.dat'
+
+    main(['-i', str(Path(__file__).parent / 'link_cluster.txt'), '-o', str(output_file_path), '--nproc', str(nproc)])
+
+    trace_df = pd.read_csv(output_file_path, sep='\t')
+
+    assert trace_df.shape[0] == 1
+    assert trace_df['time'][0] == 100.0
+
+    for column in ['fx1_sum', 'fy1_sum', 'fx2_sum', 'fy2_sum', 'f_sum']:
+        assert np.isclose(trace_df[column][0], single_frame_sums[column][0], atol=1e-5), column
+
+@pytest.mark.parametrize('nproc', [1, 2])
+def test_frame_files_match_report(tmp_path, nproc):
+    # The frames of a multi-frame report, and the same frames as files
+    report_path = Path(__file__).parent / 'link_cluster_two_frames.txt'
+    frame_lines = report_path.read_text().split('% end')[:2]
+
+    for (k, lines) in enumerate(frame_lines):
+        (tmp_path / ('report%d.txt' % k)).write_text(lines + '% end\n')
+
+    main(['-i', str(report_path), '-o', str(tmp_path / 'report_trace.dat'), '--nproc', str(nproc)])
+    main(['-p', str(tmp_path / 'report*.txt'), '-o', str(tmp_path / 'files_trace.dat'), '--nproc', str(nproc), '--batchsize', '1'])
+
+    report_trace_df = pd.read_csv(tmp_path / 'report_trace.dat', sep='\t')
+
+    assert report_trace_df.shape[0] == 2
+    pd.testing.assert_frame_equal(report_trace_df, pd.read_csv(tmp_path / 'files_trace.dat', sep='\t'))
+
+def write_link_report(file_path, frames):
+    """frames: list of (time, rows) with rows of (identity, cluster, force)"""
+    header = '% ' + ' '.join([ 'identity', 'pos1X', 'pos1Y', 'dirFiber1X', 'dirFiber1Y', \
+                               'pos2X', 'pos2Y', 'dirFiber2X', 'dirFiber2Y', 'force', 'cluster' ]) + '\n'
+
+    with open(file_path, 'w') as report_file:
+        for (k, (time, rows)) in enumerate(frames):
+            report_file.write('%% frame %d\n%% time %.1f\n%% report couple:link_cluster\n' % (k, time) + header)
+            report_file.writelines('%d 0 0 1 0 1 0 0 1 %f %d\n' % (identity, force, cluster) for (identity, cluster, force) in rows)
+            report_file.write('% end\n\n')
+
+@pytest.mark.parametrize('nproc', [1, 2])
+def test_frames_without_couples(tmp_path, nproc):
+    report_path = tmp_path / 'links.txt'
+    write_link_report(report_path, [ (1.0, [(1, 1, 0.2), (2, 1, 0.8)]), \
+                                     (2.0, []), \
+                                     (3.0, [(3, 1, 0.1)]) ])
+
+    main(['-i', str(report_path), '-o', str(tmp_path / 'trace.dat'), '--nproc', str(nproc), '--filter', 'force>0.5'])
+
+    trace_df = pd.read_csv(tmp_path / 'trace.dat', sep='\t')
+
+    assert trace_df['time'].tolist() == [1.0, 2.0, 3.0]
+    assert trace_df['n_couples'].tolist() == [1, 0, 0]
+    assert np.isclose(trace_df['fx1_sum'][0], 0.8)
+    assert (trace_df.loc[1:, ['fx1_sum', 'fy1_sum', 'fx2_sum', 'fy2_sum', 'f_sum']] == 0).all().all()
+
+@pytest.mark.parametrize('framepattern', [False, True])
+def test_largest_cluster_before_filter(tmp_path, framepattern):
+    # Cluster 1 is the largest, but cluster 2 has more couples above 0.5
+    rows = [(1, 1, 0.1), (2, 1, 0.2), (3, 1, 0.3), (4, 1, 0.9), (5, 2, 0.6), (6, 2, 0.7)]
+    report_path = tmp_path / 'links.txt'
+    write_link_report(report_path, [ (1.0, rows) ])
+
+    input_argv = ['-p', str(tmp_path / 'links*.txt')] if framepattern else ['-i', str(report_path)]
+    main(input_argv + ['-o', str(tmp_path / 'trace.dat'), '--filter', 'force>0.5'])
+
+    trace_df = pd.read_csv(tmp_path / 'trace.dat', sep='\t')
+
+    assert trace_df['n_couples'].tolist() == [1]
+    assert np.isclose(trace_df['fx1_sum'][0], 0.9)
@@ -0,0 +1,39 @@
+from frame_index import FrameIndex
+from data_class import Data
+
+import os
+import shutil
+
+def test_index_matches_data(tmp_path):
+    report_path = tmp_path / 'link_cluster.txt'
+    shutil.copy('link_cluster.txt', report_path)
+
+    column_list = ['identity', 'fiber1', 'fiber2', 'cluster', 'force', 'cos_angle']
+    myData = Data(argv=['--ifile', str(report_path), '--no-largest'], column_list=column_list)
+
+    cluster_sizes = myData.temp_dataframe['cluster'].value_counts()
+
+    summary = FrameIndex.load_or_build(report_path).get_frame()
+
+    assert summary.n_rows == myData.temp_dataframe.shape[0]
+    assert summary.time == myData.time
+    assert summary.largest_cluster_id == myData.temp_dataframe['cluster'].mode().values[0]
+    assert summary.cluster_sizes == cluster_sizes.to_dict()
+
+def test_sidecar_reuse_and_rebuild(tmp_path):
+    report_path = tmp_path / 'link_cluster_two_frames.txt'
+    shutil.copy('link_cluster_two_frames.txt', report_path)
+
+    index = FrameIndex.load_or_build(report_path)
+    assert os.path.isfile(FrameIndex.sidecar_path(report_path))
+    assert len(index.frames) == 2
+
+    loaded = FrameIndex.load(report_path)
+    assert [ x.to_dict() for x in loaded.frames ] == [ x.to_dict() for x in index.frames ]
+
+    # Modified report: the sidecar is out of date
+    with open(report_path, 'a') as report_file:
+        report_file.write('\n')
+    os.utime(report_path, ns=(0, 0))
+
+    assert FrameIndex.load(report_path) is None
@@ -0,0 +1,30 @@
+from frame_manifest import FrameManifest
+
+import os
+
+def test_record_save_load(tmp_path):
+    frame_path = tmp_path / 'report0.txt'
+    frame_path.write_text('% time 1.0\n1 2\n')
+
+    manifest = FrameManifest(tmp_path / 'out.dat.manifest')
+    assert not manifest.is_current(frame_path)
+
+    manifest.record(frame_path, 1.0)
+    manifest.save()
+
+    # Empty options are read back from the file as NaN
+    manifest = FrameManifest(tmp_path / 'out.dat.manifest')
+    assert manifest.is_current(frame_path)
+    assert not manifest.is_current(frame_path, '--no-largest')
+    assert manifest.get_time(frame_path) == 1.0
+
+    with open(frame_path, 'a') as frame_file:
+        frame_file.write('3 4\n')
+
+    assert not manifest.is_current(frame_path)
+
+    # Same size, other modification time
+    manifest.record(frame_path, 1.0)
+    os.utime(frame_path, ns=(0, 0))
+
+    assert not manifest.is_current(frame_path)
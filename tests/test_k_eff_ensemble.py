@@ -0,0 +1,82 @@
+from k_eff_ensemble import bootstrap_trajectories, calc_summary, calc_histogram, main, column_list
+from k_eff_pulling import KeffData
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+def test_bootstrap_reproducible():
+    rng = np.random.default_rng(0)
+    samples_list = [ rng.normal(loc=k, size=50) for k in range(6) ]
+
+    replicates = bootstrap_trajectories(samples_list, n_boot=250, seed=7, n_proc=1)
+
+    assert replicates.shape == (250, 2)
+    assert np.array_equal(replicates, bootstrap_trajectories(samples_list, n_boot=250, seed=7, n_proc=2))
+    assert not np.array_equal(replicates, bootstrap_trajectories(samples_list, n_boot=250, seed=8, n_proc=1))
+
+    summary_df = calc_summary(samples_list, replicates)
+
+    assert summary_df['n_samples'].values[0] == 300
+    assert np.isclose(summary_df['mean'].values[0], np.mean(np.concatenate(samples_list)))
+    assert summary_df['mean_ci_low'].values[0] < summary_df['mean'].values[0] < summary_df['mean_ci_high'].values[0]
+
+def test_histogram():
+    hist_df = calc_histogram(np.array([0.1, 0.2, 0.7]), bins=2, range=(0.0, 1.0))
+
+    assert hist_df['count'].tolist() == [2, 1]
+    assert np.allclose(hist_df['density'], [4/3, 2/3])
+
+def make_trajectory(trj_dir, scale):
+    """Two frames (link_cluster.txt at times 100 and 101) and external
+    forces on every filament, proportional to scale"""
+    trj_dir.mkdir(parents=True)
+
+    report_lines = (Path(__file__).parent / 'link_cluster.txt').read_text().splitlines(keepends=True)
+
+    for k in range(2):
+        lines = [ '%% time %d.000\n' % (100 + k) if line.startswith('% time') else line for line in report_lines ]
+        (trj_dir / ('report%d.txt' % k)).write_text(''.join(lines))
+
+    (trj_dir / 'config.cym').write_text('unloaded_speed = 0.2\nunbinding_force = 3.0\n')
+    (trj_dir / 'forces.dat').write_text(''.join('%d %d.000 %d 0.0 0.0 %f %f\n' % (k, 100 + k, fil_id, scale*np.cos(fil_id), scale*np.sin(k + fil_id)) \
+                                                for k in range(2) for fil_id in range(250)))
+
+def test_directory_pipeline(tmp_path, monkeypatch):
+    trj_dirs = [ tmp_path / 'trj0' / 'sf', tmp_path / 'trj1' / 'sf' ]
+
+    for (k, trj_dir) in enumerate(trj_dirs):
+        make_trajectory(trj_dir, 1.0 + k)
+
+    monkeypatch.chdir(tmp_path)
+
+    main(['-d', 'trj*/sf', '-o', 'dk_ensemble', '--nproc', '2', '--nboot', '20', '--bins', '10'])
+
+    # Nothing written to the trajectory directories
+    assert not any((trj_dir / 'dk.dat').exists() for trj_dir in trj_dirs)
+
+    samples_list = []
+    for trj_dir in trj_dirs:
+        monkeypatch.chdir(trj_dir)
+
+        mySim = KeffData(argv=['--prefixframe', 'report', '--extframe', 'txt', '--ifilesimulation', 'forces.dat'], \
+                         column_list=column_list, write=False)
+        dk = mySim.output_df['dk'].to_numpy(dtype=np.float64)
+        samples_list.append(dk[~np.isnan(dk)])
+
+    monkeypatch.chdir(tmp_path)
+
+    samples = np.concatenate(samples_list)
+    assert samples_list[0].shape[0] > 0
+    assert not np.allclose(samples_list[0], samples_list[1])
+
+    summary_df = pd.read_csv('dk_ensemble.summary.dat', sep='\t')
+    assert summary_df['n_trj'][0] == 2
+    assert summary_df['n_samples'][0] == samples.shape[0]
+    assert np.isclose(summary_df['mean'][0], np.mean(samples), atol=1e-8)
+    assert np.isclose(summary_df['median'][0], np.median(samples), atol=1e-8)
+
+    hist_df = pd.read_csv('dk_ensemble.hist.dat', sep='\t')
+    assert hist_df['count'].sum() == samples.shape[0]
+    assert np.allclose(hist_df['count'], np.histogram(samples, bins=10)[0])
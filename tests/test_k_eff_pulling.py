@@ -1,6 +1,6 @@
 from simulation_class import Simulation
 from data_class import Data
-from k_eff_pulling import KeffData
+from k_eff_pulling import KeffData, calc_frame_motor_states, calc_k_eff
 
 import pytest
 import os
@@ -29,30 +29,35 @@ def mySimulation():
 def test_calculate_motor_states(mySimulation):
     assert type(mySimulation.motor_df) == pd.DataFrame
 
-    for entry in mySimulation.motor_df['time']:
-        assert type(entry) == float
-    
-    for entry in mySimulation.motor_df['dir']:
-        assert type(entry) == np.ndarray
-        assert entry.shape == (2,)
+    for col in ['time', 'dir_x', 'dir_y', 'f_x', 'f_y', 'length']:
+        assert mySimulation.motor_df[col].dtype == np.float64
 
-    for entry in mySimulation.motor_df['force']:
-        assert type(entry) == np.ndarray
-        assert entry.shape == (2,)
-
-    for entry in mySimulation.motor_df['length']:
-        assert type(entry) == float
-
-    for entry in mySimulation.motor_df['fil_id']:
-        assert type(entry) == int
-    
-    for entry in mySimulation.motor_df['couple_id']:
-        assert type(entry) == int
+    for col in ['fil_id', 'couple_id']:
+        assert mySimulation.motor_df[col].dtype == np.int64
 
     assert mySimulation.motor_df.shape[0]/2 \
             == sum(x.temp_dataframe.shape[0] \
                    for x in mySimulation.frame_data_list)
 
+def test_calc_frame_motor_states():
+    frame_df = pd.DataFrame({'identity': [8, 3], \
+                             'fiber1': [1, 2], 'pos1X': [0.0, 1.0], 'pos1Y': [0.0, 1.0], \
+                             'fiber2': [5, 6], 'pos2X': [3.0, 1.0], 'pos2Y': [4.0, 1.0], \
+                             'force': [10.0, 2.0]})
+
+    motor_df = calc_frame_motor_states(1.5, frame_df)
+
+    # Sorted by couple id, hand on fiber1 first
+    assert motor_df['couple_id'].tolist() == [3, 3, 8, 8]
+    assert motor_df['fil_id'].tolist() == [2, 6, 1, 5]
+
+    assert np.allclose(motor_df['f_x'].to_numpy()[2:], [6.0, -6.0])
+    assert np.allclose(motor_df['f_y'].to_numpy()[2:], [8.0, -8.0])
+    assert np.allclose(motor_df['length'].to_numpy(), [0.0, 0.0, 5.0, 5.0])
+
+    # Zero length couples pull along +x with both hands
+    assert np.allclose(motor_df['f_x'].to_numpy()[:2], [2.0, 2.0])
+
 def test_calculate_k_eff(mySimulation):
     assert type(mySimulation.output_df) == pd.DataFrame
 
@@ -62,6 +67,36 @@ def test_calculate_k_eff(mySimulation):
     for entry in mySimulation.output_df['dk']:
         assert type(entry) == float
 
+def test_calc_k_eff_joins():
+    # Couple 1 binds filaments 10 and 20, couple 2 binds 20 twice,
+    # couple 3 binds filament 30 which has no external force
+    motor_df = pd.DataFrame({'time':      [0.5, 0.5, 0.5, 0.5, 0.5, 0.5], \
+                             'f_x':       [1.0, -1.0, 0.0, 0.0, 3.0, -3.0], \
+                             'f_y':       [0.0, 0.0, 2.0, -2.0, 4.0, -4.0], \
+                             'length':    [0.1, 0.1, 0.2, 0.2, 0.0, 0.0], \
+                             'fil_id':    [10, 20, 20, 20, 30, 10], \
+                             'couple_id': [1, 1, 2, 2, 3, 3]})
+
+    f_ext_df = pd.DataFrame({'time': [0.5, 0.5, 0.5], \
+                             'fil_id': [10, 20, 20], \
+                             'f_x': [2.0, 6.0, 100.0], \
+                             'f_y': [0.0, 3.0, 100.0]})
+
+    output_df = calc_k_eff(motor_df, f_ext_df)
+
+    # Every couple is recorded once
+    assert output_df['couple_id'].tolist() == [1, 2, 3]
+
+    # Valencies: filament 10 -> 2 hands, filament 20 -> 3 hands
+    df_couple1 = (1.0*2.0/2 + (-1.0)*6.0/3) / 2
+    df_couple2 = (2.0*3.0/3 / 2.0) / 2
+
+    assert np.allclose(output_df['df'].to_numpy()[:2], [df_couple1, df_couple2])
+    assert np.allclose(output_df['dk'].to_numpy()[:2], [df_couple1/0.1, df_couple2/0.2])
+
+    assert np.isnan(output_df['df'].to_numpy()[2])
+    assert np.isnan(output_df['dk'].to_numpy()[2])
+
 def test_write_output(mySimulation):
     pass
     # check that output file exists after writing
\ No newline at end of file
@@ -0,0 +1,48 @@
+from link_components import label_components, link_clusters, link_cluster_column
+from data_class import Data
+
+import numpy as np
+import pandas as pd
+
+def test_label_components():
+    # 0-1-2 chain, 3-4 pair, 5 alone
+    labels, sizes = label_components(6, [0, 1, 3], [1, 2, 4])
+
+    assert labels.tolist() == [1, 1, 1, 2, 2, 3]
+    assert sizes.tolist() == [3, 2, 1]
+
+def test_link_clusters_edge_mask():
+    fiber1 = np.array([10, 20, 30])
+    fiber2 = np.array([20, 30, 40])
+
+    fil_ids, labels, sizes = link_clusters(fiber1, fiber2)
+    assert fil_ids.tolist() == [10, 20, 30, 40]
+    assert labels.tolist() == [1, 1, 1, 1]
+
+    fil_ids, labels, sizes = link_clusters(fiber1, fiber2, edge_mask=[True, False, True])
+    assert labels.tolist() == [1, 1, 2, 2]
+    assert sizes.tolist() == [2, 2]
+
+def test_link_cluster_column_matches_report():
+    column_list = ['identity', 'fiber1', 'fiber2', 'cluster', 'force', 'cos_angle']
+
+    myData = Data(argv=['--ifile', 'link_cluster.txt', '--no-largest'], column_list=column_list)
+
+    report_clusters = myData.temp_dataframe['cluster'].to_numpy()
+    link_clusters = link_cluster_column(myData.temp_dataframe)
+
+    # Same partition of the couples, whatever the numbering
+    crosstab = pd.crosstab(report_clusters, link_clusters) > 0
+
+    assert (crosstab.sum(axis=0) == 1).all()
+    assert (crosstab.sum(axis=1) == 1).all()
+
+def test_data_linkclusters():
+    column_list = ['identity', 'fiber1', 'fiber2', 'cluster', 'force', 'cos_angle']
+
+    myData = Data(argv=['--ifile', 'link_cluster.txt', '--largest'], column_list=column_list)
+    myLinkData = Data(argv=['--ifile', 'link_cluster.txt', '--largest', '--linkclusters'], column_list=column_list)
+
+    assert myLinkData.largest_cluster_id == 1
+    assert myLinkData.largest_cluster_size == myData.largest_cluster_size
+    assert set(myLinkData.temp_dataframe['identity']) == set(myData.temp_dataframe['identity'])
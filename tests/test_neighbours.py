@@ -0,0 +1,54 @@
+from neighbours import read_box, neighbour_pairs, distance_matrix, minimum_image
+from distance_cluster import distance_clusters
+
+import numpy as np
+
+def test_read_box(tmp_path):
+    config_path = tmp_path / 'config.cym'
+    config_path.write_text("set space cell\n{\n    shape = periodic % wraps\n}\n\nnew cell\n{\n    length = 10, 8\n}\n")
+
+    assert read_box(config_path).tolist() == [10.0, 8.0]
+
+    config_path.write_text("set space cell\n{\n    shape = rectangle\n}\n\nnew cell\n{\n    length = 10, 8\n}\n")
+
+    assert read_box(config_path) is None
+    assert read_box(tmp_path / 'missing.cym') is None
+
+def test_periodic_pairs():
+    box = np.array([10.0, 10.0])
+    positions = np.array([[0.1, 5.0], [9.9, 5.0], [5.0, 5.0]])
+
+    pair_i, pair_j, distances = neighbour_pairs(positions, 0.5)
+    assert pair_i.shape[0] == 0
+
+    pair_i, pair_j, distances = neighbour_pairs(positions, 0.5, box)
+    assert (pair_i.tolist(), pair_j.tolist()) == ([0], [1])
+    assert np.allclose(distances, 0.2)
+
+    labels, sizes = distance_clusters(positions, 0.5, box)
+    assert sizes.tolist() == [2, 1]
+
+def test_periodic_matches_minimum_image():
+    rng = np.random.default_rng(1)
+    box = np.array([4.0, 3.0])
+    positions = rng.uniform(0, 1, size=(300, 2))*box
+
+    displacements = minimum_image(positions[None, :, :] - positions[:, None, :], box)
+    all_distances = np.linalg.norm(displacements, axis=-1)
+    expected = np.triu((all_distances <= 0.4) & (all_distances > 0), k=1)
+
+    distances = distance_matrix(positions, 0.4, box).toarray()
+
+    assert np.array_equal(np.triu(distances > 0, k=1), expected)
+
+def test_coincident_points():
+    positions = np.array([[1.0, 1.0], [1.0, 1.0], [1.2, 1.0], [5.0, 5.0]])
+
+    pair_i, pair_j, distances = neighbour_pairs(positions, 0.5)
+    assert sorted(zip(pair_i.tolist(), pair_j.tolist())) == [(0, 1), (0, 2), (1, 2)]
+
+    # Same pairs as neighbour_pairs, in both directions, zero distance included
+    distances = distance_matrix(positions, 0.5)
+    assert sorted(zip(distances.row.tolist(), distances.col.tolist())) == [(0, 1), (0, 2), (1, 0), (1, 2), (2, 0), (2, 1)]
+    assert distances.tocsr()[0, 1] == 0.0
+    assert np.isclose(distances.tocsr()[2, 1], 0.2)
@@ -0,0 +1,34 @@
+from radius_of_gyration import calc_radius_of_gyration, select_largest_clusters, main
+
+import numpy as np
+
+def test_matches_loop():
+    rng = np.random.default_rng(2)
+
+    frames = np.repeat([1, 2], 50)
+    times = np.repeat([0.1, 0.2], 50)
+    clusters = rng.integers(1, 4, size=100)
+    positions = rng.normal(size=(100, 2)) + 1000.0
+
+    rad_gyr_df = calc_radius_of_gyration(frames, times, clusters, positions)
+
+    for row in rad_gyr_df.itertuples():
+        points = positions[(frames == row.frame) & (clusters == row.cluster)]
+        expected = np.sqrt(np.mean(np.sum((points - points.mean(axis=0))**2, axis=1)))
+
+        assert row.size == points.shape[0]
+        assert np.isclose(row.Rg, expected)
+
+    largest_df = select_largest_clusters(rad_gyr_df)
+    assert largest_df['frame'].tolist() == [1, 2]
+
+def test_rad_gyr_file(tmp_path):
+    output_file_path = tmp_path / 'rad_gyr.dat'
+
+    main(['-i', '../old_format_scripts/radius_of_gyration/cluster_positions.txt', '-o', str(output_file_path)])
+
+    # Columns read by the pulling and threshold scripts
+    rad_gyr_arr = np.loadtxt(output_file_path, usecols=(1,4), ndmin=2)
+
+    assert rad_gyr_arr.shape == (1, 2)
+    assert np.allclose(rad_gyr_arr[0], [100.0, 0.18063695])
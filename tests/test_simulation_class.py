@@ -6,6 +6,7 @@ import os
 import sys
 import re
 import pathlib
+import shutil
 from pathlib import Path
 
 @pytest.fixture
@@ -113,3 +114,23 @@ def test_load_frame_data(mySimulation):
         assert type(time) == float
     
     assert len(mySimulation.frame_time_list) == len(mySimulation.frame_filepath_list)
+
+def test_frame_index_not_a_frame(tmp_path, monkeypatch):
+    # Data with a cluster column caches a frame index next to each frame
+    # file, a second run must not read the index files as frames
+    for k in range(3):
+        shutil.copy(Path(__file__).parent / 'link_cluster.txt', tmp_path / ('report%d.txt' % k))
+
+    (tmp_path / 'config.cym').write_text('unloaded_speed = 0.1\nunbinding_force = 2.5\n')
+    (tmp_path / 'sim.txt').write_text('')
+
+    monkeypatch.chdir(tmp_path)
+
+    column_list = ['identity', 'fiber1', 'fiber2', 'cluster', 'force']
+    argv = ['--prefixframe', 'report', '--extframe', 'txt', '--ifilesimulation', 'sim.txt']
+
+    for _ in range(2):
+        mySimulation = Simulation(argv=argv, column_list=column_list)
+
+        assert sorted(path.name for path in mySimulation.frame_filepath_list) == ['report0.txt', 'report1.txt', 'report2.txt']
+        assert len(mySimulation.frame_data_list) == 3
@@ -0,0 +1,86 @@
+from streaming_stats import RunningStats, FixedHistogram, QuantileSketch, StreamingSummary
+
+import pytest
+import numpy as np
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(0)
+
+    return rng.normal(0.5, 2.0, 10000)
+
+def test_running_stats(values):
+    stats = RunningStats()
+
+    for chunk in np.array_split(values, 7):
+        stats.update(chunk)
+
+    assert stats.count == values.size
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance() == pytest.approx(values.var())
+    assert stats.std(ddof=1) == pytest.approx(values.std(ddof=1))
+    assert stats.min == values.min()
+    assert stats.max == values.max()
+
+def test_running_stats_merge(values):
+    stats_a = RunningStats().update(values[:3000])
+    stats_b = RunningStats().update(values[3000:])
+
+    stats_a.merge(stats_b)
+
+    assert stats_a.count == values.size
+    assert stats_a.mean == pytest.approx(values.mean())
+    assert stats_a.variance() == pytest.approx(values.var())
+
+def test_fixed_histogram_merge(values):
+    hist_a = FixedHistogram(bins=20, range=(-2.0, 3.0)).update(values[:5000])
+    hist_b = FixedHistogram(bins=20, range=(-2.0, 3.0)).update(values[5000:])
+
+    hist_a.merge(hist_b)
+
+    counts, _ = np.histogram(values, bins=20, range=(-2.0, 3.0))
+
+    assert np.array_equal(hist_a.counts, counts)
+    assert hist_a.underflow == np.count_nonzero(values < -2.0)
+    assert hist_a.overflow == np.count_nonzero(values > 3.0)
+
+    with pytest.raises(ValueError):
+        hist_a.merge(FixedHistogram(bins=10, range=(-2.0, 3.0)))
+
+def test_quantile_sketch(values):
+    sketch_a = QuantileSketch(relative_accuracy=0.01).update(values[:4000])
+    sketch_b = QuantileSketch(relative_accuracy=0.01).update(values[4000:])
+
+    sketch_a.merge(sketch_b)
+
+    assert sketch_a.count == values.size
+
+    for q in (0.1, 0.5, 0.9):
+        exact = np.quantile(values, q, method='lower')
+        assert sketch_a.quantile(q) == pytest.approx(exact, rel=0.02)
+
+def test_quantile_sketch_without_positive_values():
+    negative = -np.linspace(1.0, 4.0, 50)
+    sketch = QuantileSketch(relative_accuracy=0.01).update(negative)
+
+    assert sketch.quantile(0.0) == pytest.approx(-4.0, rel=0.02)
+    assert sketch.quantile(1.0) == pytest.approx(-1.0, rel=0.02)
+
+    sketch.update(np.zeros(5))
+    assert sketch.quantile(1.0) == 0.0
+
+    for q in (-0.1, 1.5):
+        with pytest.raises(ValueError):
+            sketch.quantile(q)
+
+def test_streaming_summary(values):
+    summary = StreamingSummary(bins=10, range=(-5.0, 5.0))
+
+    for chunk in np.array_split(values, 3):
+        summary.update(chunk)
+
+    output = summary.to_dict()
+
+    assert output['n'] == values.size
+    assert output['mean'] == pytest.approx(values.mean())
+    assert output['q50'] == pytest.approx(np.median(values), rel=0.05)
@@ -0,0 +1,51 @@
+from tension_profile import calc_tension_profile, calc_link_tension_profile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+def test_link_tension_profile():
+    # Filaments 1 and 2 along +x, linked by three couples along x;
+    # filament 3 has no couples
+    df = pd.DataFrame({'identity':   [12, 10, 11, 10], \
+                       'force':      [3.0, 2.0, 1.0, 2.0], \
+                       'fiber1':     [1, 1, 1, 1], \
+                       'abscissa1':  [0.8, 0.0, 0.5, 0.0], \
+                       'pos1X':      [0.8, 0.0, 0.5, 0.0], \
+                       'pos1Y':      [0.0, 0.0, 0.0, 0.0], \
+                       'dirFiber1X': [2.0, 2.0, 2.0, 2.0], \
+                       'dirFiber1Y': [0.0, 0.0, 0.0, 0.0], \
+                       'fiber2':     [2, 2, 2, 2], \
+                       'abscissa2':  [0.9, 0.0, 0.5, 0.0], \
+                       'pos2X':      [0.2, 1.0, 1.5, 1.0], \
+                       'pos2Y':      [0.0, 0.0, 0.0, 0.0], \
+                       'dirFiber2X': [1.0, 1.0, 1.0, 1.0], \
+                       'dirFiber2Y': [0.0, 0.0, 0.0, 0.0]})
+
+    tension_profile = calc_link_tension_profile(df)
+
+    assert len(tension_profile) == 2
+    assert tension_profile.fil_ids.tolist() == [1, 2]
+    assert tension_profile.offsets.tolist() == [0, 3, 6]
+
+    # Axial forces, minus end first: fil 1 (2, 1, -3), fil 2 (-2, -1, 3)
+    (abscissa, tension) = tension_profile.profile(1)
+    assert np.allclose(abscissa, [0.0, 0.5, 0.8])
+    assert np.allclose(tension, [-2.0, -3.0, 0.0])
+
+    (abscissa, tension) = tension_profile.profile(2)
+    assert np.allclose(abscissa, [0.0, 0.5, 0.9])
+    assert np.allclose(tension, [2.0, 3.0, 0.0])
+
+    with pytest.raises(KeyError):
+        tension_profile.profile(3)
+
+    output_df = tension_profile.to_dataframe()
+    assert output_df['fil_id'].tolist() == [1, 1, 1, 2, 2, 2]
+    assert np.allclose(output_df['f'], [2.0, 1.0, -3.0, -2.0, -1.0, 3.0])
+
+def test_empty_profile():
+    tension_profile = calc_tension_profile(np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0))
+
+    assert len(tension_profile) == 0
+    assert tension_profile.offsets.tolist() == [0]
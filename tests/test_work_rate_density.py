@@ -0,0 +1,142 @@
+from work_rate_density import calc_frame_cos_theta, calc_external_force_table, calc_external_force_magnitudes, calc_work_rates, WorkRateField, WorkRateDensity
+from data_class import Data
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+column_list = ['class','identity','fiber1','abscissa1','pos1X','pos1Y','dirFiber1X','dirFiber1Y','fiber2','abscissa2','pos2X','pos2Y','dirFiber2X','dirFiber2Y','force','cos_angle']
+
+def test_frame_cos_theta_matches_rows():
+    myData = Data(argv=['--ifile', 'link_cluster.txt'], column_list=column_list)
+    frame_df = myData.temp_dataframe
+
+    cos_theta_df, fil_pair_df = calc_frame_cos_theta(myData.time, frame_df, 0.2, 3.0)
+
+    assert fil_pair_df.shape[0] == frame_df.shape[0]
+    assert cos_theta_df.shape[0] == 2*frame_df.shape[0]
+
+    row = frame_df.iloc[0]
+    fil2_dir = np.array([ row['dirFiber2X'], row['dirFiber2Y'] ])
+    motor2_dir = np.array([ row['pos1X'] - row['pos2X'], row['pos1Y'] - row['pos2Y'] ])
+
+    fil2_row = cos_theta_df.iloc[1]
+    assert fil2_row['fil_id'] == row['fiber2']
+    assert np.isclose(fil2_row['cos_theta'], np.dot(fil2_dir, motor2_dir)/(np.linalg.norm(fil2_dir)*np.linalg.norm(motor2_dir)))
+    assert np.isclose(fil2_row['v_m'], 0.2*(1 + row['force']*np.dot(motor2_dir, fil2_dir)/3.0))
+
+def test_external_force_lookup():
+    cos_theta_df = pd.DataFrame({'time': [1.0, 1.0, 2.0], 'fil_id': [3, 4, 3]})
+    simulation_df = pd.DataFrame({'time': [1.0001, 1.0001, 2.0], \
+                                  'fil_id': [3, 3, 4], \
+                                  'f_dirX': [3.0, 1.0, 1.0], \
+                                  'f_dirY': [4.0, 1.0, 1.0]})
+
+    # First match only, missing filaments get 0
+    assert calc_external_force_magnitudes(cos_theta_df, calc_external_force_table(simulation_df)).tolist() == [5.0, 0.0, 0.0]
+
+def test_work_rates_grouped():
+    # Motor 7 holds filament 1 with both hands: only its first row counts
+    cos_theta_df = pd.DataFrame({'time':      [2.0, 2.0, 1.0, 1.0, 1.0, 1.0], \
+                                 'motor_id':  [5,   5,   7,   7,   8,   8], \
+                                 'fil_id':    [1,   2,   1,   1,   1,   3], \
+                                 'cos_theta': [0.5, -0.5, 1.0, 0.0, -1.0, 0.5], \
+                                 'f_e':       [0.0]*6, \
+                                 'f_m':       [2.0, 2.0, 1.0, 1.0, 3.0, 3.0], \
+                                 'v_m':       [1.0, 1.0, 2.0, 2.0, 1.0, 1.0]})
+
+    (motor_df, fil_df, avg_df) = calc_work_rates(cos_theta_df)
+
+    assert motor_df['time'].tolist() == [1.0, 1.0, 1.0, 2.0, 2.0]
+    assert motor_df['motor_id'].tolist() == [7, 8, 8, 5, 5]
+    assert np.allclose(motor_df['work_rate'], [2.0, -3.0, 1.5, 1.0, -1.0])
+
+    assert fil_df['fil_id'].tolist() == [1, 3, 1, 2]
+    assert np.allclose(fil_df['work_rate'], [-1.0, 1.5, 1.0, -1.0])
+
+    assert avg_df['n_fil'].tolist() == [2, 2]
+    assert np.allclose(avg_df['cos_theta_mean'], [0.125, 0.0])
+    assert np.allclose(avg_df['cos_theta_std'], [np.std([1.0, 0.0, -1.0, 0.5]), 0.5])
+
+def test_work_rate_field(tmp_path):
+    myField = WorkRateField(np.linspace(0, 2, 3), np.linspace(0, 1, 2))
+
+    # Cells are 1 x 1, the last couple is outside of the grid
+    myField.add_frame(1.0, [[0.5, 0.5], [0.2, 0.7], [1.5, 0.5], [5.0, 0.5]], [1.0, 2.0, -1.0, 10.0])
+    myField.add_frame(2.0, [[1.5, 0.5]], [4.0])
+
+    assert np.allclose(myField.mean(), [[1.5], [1.5]])
+
+    myField.save(tmp_path / 'field.npz')
+    arrays = np.load(tmp_path / 'field.npz')
+
+    assert arrays['work_rate_density'].shape == (2, 2, 1)
+    assert np.allclose(arrays['work_rate_density'][0], [[3.0], [-1.0]])
+    assert arrays['time'].tolist() == [1.0, 2.0]
+
+@pytest.fixture
+def frame_dir(tmp_path, monkeypatch):
+    """Three frames (copies of link_cluster.txt at times 100, 101 and 102)
+    with external forces on a few filaments"""
+    report_lines = (Path(__file__).parent / 'link_cluster.txt').read_text().splitlines(keepends=True)
+
+    for k in range(3):
+        lines = [ '%% time %d.000\n' % (100 + k) if line.startswith('% time') else line for line in report_lines ]
+        (tmp_path / ('report%d.txt' % k)).write_text(''.join(lines))
+
+    (tmp_path / 'config.cym').write_text('unloaded_speed = 0.2\nunbinding_force = 3.0\n')
+    (tmp_path / 'forces.dat').write_text(''.join('%d %d.000 %d 0.0 0.0 %f %f\n' % (k, 100 + k, fil_id, 0.1*fil_id, -0.2*k) \
+                                                 for k in range(3) for fil_id in (4, 15, 170)))
+
+    monkeypatch.chdir(tmp_path)
+
+    return tmp_path
+
+def run_work_rate_density(argv):
+    myWRD = WorkRateDensity(column_list, argv=['--prefixframe', 'report', '--extframe', 'txt', '--ifilesimulation', 'forces.dat', \
+                                               '--field', '--fieldbins', '4,3', '--fieldextent=-3,3,-2,2'] + argv)
+
+    if myWRD.args.stream:
+        myWRD.calc_stream()
+    else:
+        myWRD.calc_cos_theta()
+        myWRD.calc_work_rate_density_per_fil()
+        myWRD.calc_avg_cos_theta()
+        myWRD.calc_work_rate_field()
+
+    return myWRD
+
+def test_stream_matches_in_memory(frame_dir):
+    output_names = ['cos_theta.dat', 'fil_pair_angles.dat', 'work_rate_fil.dat', 'work_rate_motor.dat', 'avg_cos_theta.dat']
+
+    myWRD = run_work_rate_density([])
+    assert myWRD.args.fieldframes
+
+    in_memory = { name: (frame_dir / name).read_text() for name in output_names }
+    in_memory_total_df = pd.read_csv('avg_cos_theta_total.dat', sep='\t')
+    in_memory_field = dict(np.load('work_rate_field.npz'))
+
+    # Small chunks: every output file is appended to several times
+    myWRD = run_work_rate_density(['--stream', '--chunkrows', '50'])
+    assert not myWRD.args.fieldframes
+    assert myWRD.work_rate_field.frame_fields == []
+
+    for name in output_names:
+        assert (frame_dir / name).read_text() == in_memory[name], name
+
+    assert in_memory['cos_theta.dat'].count('\n') > 150
+
+    # Running mean and std, equal up to rounding
+    pd.testing.assert_frame_equal(pd.read_csv('avg_cos_theta_total.dat', sep='\t'), in_memory_total_df)
+
+    stream_field = dict(np.load('work_rate_field.npz'))
+    assert 'work_rate_density' not in stream_field
+    assert in_memory_field['work_rate_density'].shape == (3, 4, 3)
+
+    for key in ['x_edges', 'y_edges', 'time', 'mean_work_rate_density']:
+        assert np.allclose(stream_field[key], in_memory_field[key])
+
+    # Frame fields can still be requested explicitly
+    assert run_work_rate_density(['--stream', '--fieldframes']).args.fieldframes
@@ -1,14 +1,259 @@
+import sys
+import argparse
+
 import numpy as np
-import matplotlib.pyplot as plt
 import pandas as pd
 
 from simulation_class import Simulation
+from data_class import Data
+from frame_reader import sort_frame_files, ChunkedWriter
+from streaming_stats import RunningStats
+from neighbours import read_box
+
+def calc_frame_hand_arrays(frame_df, unloaded_speed, unbinding_force):
+    """Cosine between each filament and the motor pulling on it, and the
+    motor velocity, for all couples of a frame at once.
+
+    Hand 1 is pulled towards hand 2 along fil1 and vice versa.
+
+    Returns: dict of arrays with shape (n_couples, 2), column 0 for fiber1
+    and column 1 for fiber2, and the boolean array of couples for which both
+    directions are defined
+    """
+    fil_dir = np.stack([ frame_df[['dirFiber1X', 'dirFiber1Y']].to_numpy(dtype=np.float64), \
+                         frame_df[['dirFiber2X', 'dirFiber2Y']].to_numpy(dtype=np.float64) ], axis=1)
+
+    pos1 = frame_df[['pos1X', 'pos1Y']].to_numpy(dtype=np.float64)
+    pos2 = frame_df[['pos2X', 'pos2Y']].to_numpy(dtype=np.float64)
+
+    motor_dir = np.stack([ pos2 - pos1, pos1 - pos2 ], axis=1)
+
+    mag = np.linalg.norm(motor_dir, axis=2) * np.linalg.norm(fil_dir, axis=2)
+    dot = np.sum(fil_dir * motor_dir, axis=2)
+
+    valid = np.all(mag > 0.0, axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos_theta = dot / mag
+
+    force = frame_df['force'].to_numpy(dtype=np.float64)
+
+    motor_vel = unloaded_speed * (1 + force[:, None]*dot/unbinding_force)
+
+    fil_id = np.stack([ frame_df['fiber1'].to_numpy(dtype=np.int64), \
+                        frame_df['fiber2'].to_numpy(dtype=np.int64) ], axis=1)
+
+    return {'fil_id': fil_id, 'cos_theta': cos_theta, 'v_m': motor_vel}, valid
+
+def calc_frame_cos_theta(time, frame_df, unloaded_speed, unbinding_force):
+    """Rows of cos_theta.dat and fil_pair_angles.dat for one frame
+
+    cos_theta rows alternate between the fiber1 and fiber2 hands of each
+    couple, couples with an undefined direction are skipped.
+
+    Returns: (cos_theta dataframe without f_e, fil_pair_angles dataframe)
+    """
+    motor_id = frame_df['identity'].to_numpy(dtype=np.int64)
+    force = frame_df['force'].to_numpy(dtype=np.float64)
+
+    fil_pair_df = pd.DataFrame({'time': np.full(motor_id.shape[0], time, dtype=np.float64), \
+                                'motor_id': motor_id, \
+                                'fil_pair_angle': frame_df['cos_angle'].to_numpy(dtype=np.float64)})
+
+    hand_arrays, valid = calc_frame_hand_arrays(frame_df, unloaded_speed, unbinding_force)
+    n_rows = 2*np.count_nonzero(valid)
+
+    # (n_couples, 2) arrays flattened row by row: fiber1 row, fiber2 row
+    cos_theta_df = pd.DataFrame({'time': np.full(n_rows, time, dtype=np.float64), \
+                                 'motor_id': np.repeat(motor_id[valid], 2), \
+                                 'fil_id': hand_arrays['fil_id'][valid].reshape(-1), \
+                                 'cos_theta': hand_arrays['cos_theta'][valid].reshape(-1), \
+                                 'f_e': np.zeros(n_rows), \
+                                 'f_m': np.repeat(force[valid], 2), \
+                                 'v_m': hand_arrays['v_m'][valid].reshape(-1)})
+
+    return cos_theta_df, fil_pair_df
+
+def calc_external_force_table(simulation_df):
+    """External force magnitude of each filament of the whole-simulation table,
+    keyed by (time rounded to 3 decimals, fil_id), first row of each key only
+
+    Returns: Pandas dataframe with columns time_key, fil_id, f_e (None if
+    there is no simulation table)
+    """
+    if simulation_df is None:
+        return None
+
+    f_ext_df = pd.DataFrame({'time_key': np.round(simulation_df['time'].to_numpy(dtype=np.float64), 3), \
+                             'fil_id': simulation_df['fil_id'].to_numpy(dtype=np.int64), \
+                             'f_e': np.hypot(simulation_df['f_dirX'].to_numpy(dtype=np.float64), \
+                                             simulation_df['f_dirY'].to_numpy(dtype=np.float64))})
+
+    return f_ext_df.drop_duplicates(subset=['time_key', 'fil_id'], keep='first')
+
+def calc_external_force_magnitudes(cos_theta_df, f_ext_df):
+    """Magnitude of the external force on the filament of each row, looked up
+    by (time rounded to 3 decimals, fil_id) in the table of
+    calc_external_force_table(). Filaments without a match get 0.
+    """
+    if (f_ext_df is None) or (cos_theta_df.shape[0] == 0):
+        return np.zeros(cos_theta_df.shape[0])
+
+    row_df = pd.DataFrame({'time_key': np.round(cos_theta_df['time'].to_numpy(dtype=np.float64), 3), \
+                           'fil_id': cos_theta_df['fil_id'].to_numpy(dtype=np.int64)})
+
+    row_df = row_df.merge(f_ext_df, on=['time_key', 'fil_id'], how='left', sort=False)
+
+    return row_df['f_e'].fillna(0.0).to_numpy()
+
+def segment_starts(*keys):
+    """Start index of each run of equal keys in arrays sorted by those keys"""
+    n_rows = keys[0].shape[0]
+
+    if n_rows == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    changed = np.zeros(n_rows - 1, dtype=bool)
+    for key in keys:
+        changed |= key[1:] != key[:-1]
+
+    return np.flatnonzero(np.r_[True, changed])
+
+def calc_work_rates(cos_theta_df):
+    """Work rate of each motor on each filament, f_m * v_m * cos_theta, its sum
+    per (time, filament), and the mean and std of cos_theta per time.
+
+    One sort by (time, fil_id, motor_id), then segmented reductions. As in
+    the original nested groupby, a motor holding the same filament with both
+    hands counts once (its fiber1 row).
+
+    Returns: (work_rate_per_motor_df, work_rate_per_fil_df, avg_cos_theta_df)
+    """
+    time = cos_theta_df['time'].to_numpy(dtype=np.float64)
+    fil_id = cos_theta_df['fil_id'].to_numpy(dtype=np.int64)
+    motor_id = cos_theta_df['motor_id'].to_numpy(dtype=np.int64)
+    cos_theta = cos_theta_df['cos_theta'].to_numpy(dtype=np.float64)
+
+    order = np.lexsort((motor_id, fil_id, time))
+
+    time = time[order]
+    fil_id = fil_id[order]
+    motor_id = motor_id[order]
+    cos_theta = cos_theta[order]
+    work_rate = (cos_theta_df['f_m'].to_numpy(dtype=np.float64) * \
+                 cos_theta_df['v_m'].to_numpy(dtype=np.float64))[order] * cos_theta
+
+    motor_start = segment_starts(time, fil_id, motor_id)
+    work_rate_per_motor_df = pd.DataFrame({'time': time[motor_start], \
+                                           'motor_id': motor_id[motor_start], \
+                                           'work_rate': work_rate[motor_start]})
+
+    # Filament sums over the deduplicated motor rows
+    motor_time = time[motor_start]
+    motor_fil_id = fil_id[motor_start]
+    fil_start = segment_starts(motor_time, motor_fil_id)
+
+    work_rate_per_fil_df = pd.DataFrame({'time': motor_time[fil_start], \
+                                         'fil_id': motor_fil_id[fil_start], \
+                                         'work_rate': np.add.reduceat(work_rate[motor_start], fil_start) if fil_start.shape[0] else np.zeros(0)})
+
+    # cos_theta statistics over all rows of each time (population std)
+    time_start = segment_starts(time)
+    time_count = np.diff(np.r_[time_start, time.shape[0]])
+
+    if time_start.shape[0]:
+        ct_mean = np.add.reduceat(cos_theta, time_start) / time_count
+        ct_std = np.sqrt(np.add.reduceat((cos_theta - np.repeat(ct_mean, time_count))**2, time_start) / time_count)
+        n_fil = np.diff(np.r_[np.searchsorted(fil_start, np.searchsorted(motor_start, time_start)), fil_start.shape[0]])
+    else:
+        ct_mean = ct_std = np.zeros(0)
+        n_fil = np.zeros(0, dtype=np.int64)
+
+    avg_cos_theta_df = pd.DataFrame({'time': time[time_start], \
+                                     'cos_theta_mean': ct_mean, \
+                                     'cos_theta_std': ct_std, \
+                                     'n_fil': n_fil})
+
+    return work_rate_per_motor_df, work_rate_per_fil_df, avg_cos_theta_df
+
+def calc_frame_couple_work(frame_df, unloaded_speed, unbinding_force):
+    """Work rate of each couple, f_m * v_m * cos_theta summed over its two
+    hands, and the couple midpoint (couples with an undefined direction are
+    skipped)
+
+    Returns: (midpoints (n, 2) array, work rates)
+    """
+    hand_arrays, valid = calc_frame_hand_arrays(frame_df, unloaded_speed, unbinding_force)
+
+    force = frame_df['force'].to_numpy(dtype=np.float64)[valid]
+    work_rate = force * np.sum(hand_arrays['v_m'][valid] * hand_arrays['cos_theta'][valid], axis=1)
+
+    midpoints = 0.5*(frame_df[['pos1X', 'pos1Y']].to_numpy(dtype=np.float64) + \
+                     frame_df[['pos2X', 'pos2Y']].to_numpy(dtype=np.float64))[valid]
+
+    return midpoints, work_rate
+
+class WorkRateField():
+    """Motor work rate deposited at the couple midpoints on a fixed 2D grid,
+    per frame and averaged over time, in work rate per unit area.
+
+    Couples outside of the grid are not counted.
+    """
+    def __init__(self, x_edges, y_edges, keep_frames=True):
+        self.x_edges = np.asarray(x_edges, dtype=np.float64)
+        self.y_edges = np.asarray(y_edges, dtype=np.float64)
+        self.keep_frames = keep_frames
+
+        self.cell_area = np.outer(np.diff(self.x_edges), np.diff(self.y_edges))
+
+        self.times = []
+        self.frame_fields = []
+        self.field_sum = np.zeros(self.cell_area.shape)
+        self.n_frames = 0
+
+    def add_frame(self, time, positions, work_rate):
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+
+        (work_rate_sum, _, _) = np.histogram2d(positions[:, 0], positions[:, 1], \
+                                               bins=[ self.x_edges, self.y_edges ], \
+                                               weights=work_rate)
+
+        field = work_rate_sum / self.cell_area
+
+        self.field_sum += field
+        self.n_frames += 1
+        self.times.append(time)
+
+        if self.keep_frames:
+            self.frame_fields.append(field.astype(np.float32))
+
+        return field
+
+    def mean(self):
+        if self.n_frames == 0:
+            return np.full(self.cell_area.shape, np.nan)
+
+        return self.field_sum / self.n_frames
+
+    def save(self, file_path):
+        """Compressed .npz: x_edges, y_edges, time, mean_work_rate_density
+        (nx, ny) and, if kept, work_rate_density (n_frames, nx, ny)"""
+        arrays = {'x_edges': self.x_edges, \
+                  'y_edges': self.y_edges, \
+                  'time': np.asarray(self.times, dtype=np.float64), \
+                  'mean_work_rate_density': self.mean()}
+
+        if self.keep_frames:
+            arrays['work_rate_density'] = np.stack(self.frame_fields) if self.frame_fields \
+                                          else np.zeros((0,) + self.cell_area.shape, dtype=np.float32)
+
+        np.savez_compressed(file_path, **arrays)
 
 class WorkRateDensity(Simulation):
-    def __init__(self, column_list=['']):
+    def __init__(self, column_list=[''], argv=sys.argv[1:]):
         self.column_list = column_list
 
-        super().__init__(column_list=self.column_list)
+        super().__init__(argv=argv, column_list=self.column_list)
 
         self.cos_theta_df = pd.DataFrame(columns=['time', 'motor_id', 
                                                   'fil_id', 'cos_theta', 
@@ -21,134 +266,172 @@ class WorkRateDensity(Simulation):
         self.avg_cos_theta_df = pd.DataFrame(columns=['time', 'cos_theta_mean', 'cos_theta_std', 'n_fil'])
         self.fil_pair_angles = pd.DataFrame(columns=['time', 'motor_id', 'fil_pair_angle'])
 
+        self.cos_theta_stats = RunningStats()
+        self.work_rate_field = None
+
+        if self.args.fieldframes is None:
+            self.args.fieldframes = not self.args.stream
+
+    def get_args(self, argv):
+        super().get_args(argv)
+
+        self.parser.add_argument('--stream', default=False, action=argparse.BooleanOptionalAction, help='process one frame at a time and append its rows to the output files, instead of holding all frames in memory')
+        self.parser.add_argument('--chunkrows', type=int, default=100000, help='with --stream: number of rows buffered before each output file is appended to')
+        self.parser.add_argument('--field', default=False, action=argparse.BooleanOptionalAction, help='also write the spatial work rate density on a 2D grid to work_rate_field.npz')
+        self.parser.add_argument('--fieldbins', type=str, default='50,50', help='with --field: number of grid cells along x and y, e.g. "50,50"')
+        self.parser.add_argument('--fieldextent', type=str, default=None, help='with --field: grid extent "xmin,xmax,ymin,ymax" (default: periodic box of config.cym, otherwise the couples of the first frame)')
+        self.parser.add_argument('--fieldframes', default=None, action=argparse.BooleanOptionalAction, help='with --field: keep the field of every frame, not only the time average (default: only without --stream, so that streaming memory does not grow with the number of frames)')
+
+    def load_frame_data(self):
+        # With --stream, frames are loaded one at a time by iter_frame_data()
+        if self.args.stream:
+            return [], []
+
+        return super().load_frame_data()
+
+    def iter_frame_data(self):
+        """Yield the frames in time order, one Data object at a time"""
+        for path in sort_frame_files(self.frame_filepath_list):
+            yield Data(argv=['--ifile', path.name], column_list=self.column_list)
+
+    def create_work_rate_field(self, first_midpoints):
+        """Grid of the work rate field, see the --field* arguments"""
+        (nx, ny) = [ int(x) for x in self.args.fieldbins.split(',') ]
+
+        if self.args.fieldextent is not None:
+            (xmin, xmax, ymin, ymax) = [ float(x) for x in self.args.fieldextent.split(',') ]
+        else:
+            box = read_box('config.cym')
+
+            if box is not None:
+                # Cytosim spaces are centered on the origin
+                (xmin, xmax, ymin, ymax) = (-box[0]/2, box[0]/2, -box[1]/2, box[1]/2)
+            elif first_midpoints.shape[0] > 0:
+                (xmin, ymin) = first_midpoints.min(axis=0)
+                (xmax, ymax) = first_midpoints.max(axis=0)
+            else:
+                (xmin, xmax, ymin, ymax) = (-1.0, 1.0, -1.0, 1.0)
+
+        return WorkRateField(np.linspace(xmin, xmax, nx + 1), np.linspace(ymin, ymax, ny + 1), \
+                             keep_frames=self.args.fieldframes)
+
+    def add_frame_to_field(self, data_obj):
+        (midpoints, work_rate) = calc_frame_couple_work(data_obj.temp_dataframe, self.unloaded_speed, self.unbinding_force)
+
+        if self.work_rate_field is None:
+            self.work_rate_field = self.create_work_rate_field(midpoints)
+
+        self.work_rate_field.add_frame(data_obj.time, midpoints, work_rate)
+
+    def calc_work_rate_field(self):
+        self.work_rate_field = None
+
+        for data_obj in self.frame_data_list:
+            self.add_frame_to_field(data_obj)
+
+        self.write_work_rate_field()
+
+    def write_work_rate_field(self):
+        if self.work_rate_field is not None:
+            self.work_rate_field.save('work_rate_field.npz')
+
     def calc_cos_theta(self):
-        
+        cos_theta_list = []
+        fil_pair_list = []
+
         for data_obj in self.frame_data_list:
-            time = data_obj.time
-            
-            for index, row in data_obj.temp_dataframe.iterrows():
-                motor_id = int(row['identity'])
-                fil_pair_angle = float(row['cos_angle'])
-
-                fil_pair_df = pd.DataFrame([{'time': time, 'motor_id': motor_id, 'fil_pair_angle': fil_pair_angle}])
-
-                self.fil_pair_angles = pd.concat([self.fil_pair_angles, fil_pair_df])
-                
-                fil1_id = int(row['fiber1'])
-                fil1_dir = np.array([ row['dirFiber1X'], row['dirFiber1Y'] ])
-
-                fil2_id = int(row['fiber2'])
-                fil2_dir = np.array([ row['dirFiber2X'], row['dirFiber2Y'] ])
-
-                motor1_pos = np.array([ row['pos1X'], row['pos1Y'] ])
-                motor2_pos = np.array([ row['pos2X'], row['pos2Y'] ])
-
-                motor1_dir = motor2_pos - motor1_pos
-                motor2_dir = motor1_pos - motor2_pos
-
-                mag1 = np.sqrt(motor1_dir[0]**2 + motor1_dir[1]**2) * np.sqrt(fil1_dir[0]**2 + fil1_dir[1]**2) 
-                mag2 = np.sqrt(motor2_dir[0]**2 + motor2_dir[1]**2) * np.sqrt(fil2_dir[0]**2 + fil2_dir[1]**2) 
-
-                if (mag1 > 0.0) and (mag2 > 0.0):
-
-                    fil1_cos_theta = np.dot(fil1_dir, motor1_dir)/mag1
-                    fil2_cos_theta = np.dot(fil2_dir, motor2_dir)/mag2
-
-                    force = row['force']
-
-                    motor1_vel = self.unloaded_speed * (1 + force*np.dot(motor1_dir, fil1_dir)/self.unbinding_force)
-                    motor2_vel = self.unloaded_speed * (1 + force*np.dot(motor2_dir, fil2_dir)/self.unbinding_force)
-                    if self.simulation_df is not None:
-                        df1 = self.simulation_df.loc[ (round(self.simulation_df['time'],3) == time) & (self.simulation_df['fil_id'] == fil1_id) ]
-                        if df1.shape[0]>0:
-                            fil1_f_ext_arr = np.array( [ df1['f_dirX'].values, df1['f_dirY'].values ] ).flatten()
-                            fil1_f_ext_mag = np.sqrt( fil1_f_ext_arr[0]**2 + fil1_f_ext_arr[1]**2)
-                        else: 
-                            fil1_f_ext_mag = 0.0
-
-                        df2 = self.simulation_df.loc[ (round(self.simulation_df['time'],3) == time) & (self.simulation_df['fil_id'] == fil2_id) ]
-
-                        if df2.shape[0]>0:
-                            fil2_f_ext_arr = np.array( [ df2['f_dirX'].values, df2['f_dirY'].values ] ).flatten()
-                            fil2_f_ext_mag = np.sqrt( fil2_f_ext_arr[0]**2 + fil2_f_ext_arr[1]**2)
-                        else:
-                            fil2_f_ext_mag = 0.0
-                       
-
-                    else:
-                        fil1_f_ext_mag = 0.0
-
-                        fil2_f_ext_mag = 0.0
-
-                    fil1_df = pd.DataFrame([{'time': float(time),
-                                        'motor_id': int(motor_id),
-                                        'fil_id': int(fil1_id),
-                                        'cos_theta': float(fil1_cos_theta),
-                                        'f_e': float(fil1_f_ext_mag),
-                                        'f_m': float(force),
-                                        'v_m': float(motor1_vel)}])
-
-                    fil2_df = pd.DataFrame([{'time': float(time),
-                                        'motor_id': int(motor_id),
-                                        'fil_id': int(fil2_id),
-                                        'cos_theta': float(fil2_cos_theta),
-                                        'f_e': float(fil2_f_ext_mag),
-                                        'f_m': float(force),
-                                        'v_m': float(motor2_vel)}])
-                
-
-                    self.cos_theta_df = pd.concat([self.cos_theta_df, fil1_df, fil2_df], ignore_index=True)
-        self.cos_theta_df.to_csv('cos_theta.dat', sep='\t', index=False, mode='w')
-        self.fil_pair_angles.to_csv('fil_pair_angles.dat', sep='\t', index=False, mode='w')
+            (cos_theta_df, fil_pair_df) = calc_frame_cos_theta(data_obj.time, data_obj.temp_dataframe, \
+                                                               self.unloaded_speed, self.unbinding_force)
 
-    def calc_work_rate_density_per_fil(self):
-        for time, time_df in self.cos_theta_df.groupby('time'):
-            for fil_id, fil_df in time_df.groupby('fil_id'):
-                work_rate_fil = 0.0
+            cos_theta_list.append(cos_theta_df)
+            fil_pair_list.append(fil_pair_df)
 
-                for motor_id, motor_df in fil_df.groupby('motor_id'):
-                    f_m = motor_df['f_m'].values[0]
-                    f_e = motor_df['f_e'].values[0]
-                    cos_theta = motor_df['cos_theta'].values[0]
-                    v_m = motor_df['v_m'].values[0]
+        # One concat over all frames, not one per couple
+        self.cos_theta_df = pd.concat([self.cos_theta_df] + cos_theta_list, ignore_index=True)
+        self.fil_pair_angles = pd.concat([self.fil_pair_angles] + fil_pair_list, ignore_index=True)
 
-                    #work_rate_motor = ( f_m - f_e*cos_theta) * v_m * cos_theta
-                    work_rate_motor = f_m * v_m * cos_theta
+        self.cos_theta_df['f_e'] = calc_external_force_magnitudes(self.cos_theta_df, calc_external_force_table(self.simulation_df))
 
-                    work_rate_fil += work_rate_motor
+        self.cos_theta_df.to_csv('cos_theta.dat', sep='\t', index=False, mode='w')
+        self.fil_pair_angles.to_csv('fil_pair_angles.dat', sep='\t', index=False, mode='w')
 
-                    motor_df = pd.DataFrame([{'time': time, 'motor_id': motor_id, 'work_rate': work_rate_motor}])
-                    self.work_rate_per_motor_df = pd.concat([self.work_rate_per_motor_df, motor_df])
-                
-                fil_df = pd.DataFrame([{'time': time, 'fil_id': fil_id, 'work_rate': work_rate_fil}])
-                self.work_rate_per_fil_df = pd.concat([self.work_rate_per_fil_df, fil_df])
+    def calc_work_rate_density_per_fil(self):
+        (self.work_rate_per_motor_df, self.work_rate_per_fil_df, self.avg_cos_theta_df) = calc_work_rates(self.cos_theta_df)
 
         self.work_rate_per_fil_df.to_csv('work_rate_fil.dat', sep='\t', index=False, mode='w')
         self.work_rate_per_motor_df.to_csv('work_rate_motor.dat', sep='\t', index=False, mode='w')
 
     def calc_avg_cos_theta(self):
-        for time, time_df in self.cos_theta_df.groupby('time'):
-            n_fil = len(pd.unique(time_df['fil_id']))
-            cos_theta_arr = time_df['cos_theta'].to_numpy(dtype=np.float64)
+        # Computed in the same grouped pass as the work rates
+        if self.avg_cos_theta_df.shape[0] == 0:
+            (self.work_rate_per_motor_df, self.work_rate_per_fil_df, self.avg_cos_theta_df) = calc_work_rates(self.cos_theta_df)
 
-            #cos_theta_arr = cos_theta_arr[~np.isnan(cos_theta_arr)]
-            
-            ct_mean = np.mean(cos_theta_arr)
-            ct_std  = np.std(cos_theta_arr)
+        self.avg_cos_theta_df.to_csv('avg_cos_theta.dat', sep='\t', index=False, mode='w')
 
-            df = pd.DataFrame({'time': time, 'cos_theta_mean': ct_mean, 'cos_theta_std': ct_std, 'n_fil': n_fil}, index=[0])
+        self.cos_theta_stats = RunningStats().update(self.cos_theta_df['cos_theta'].to_numpy(dtype=np.float64))
+        self.write_cos_theta_total()
 
-            self.avg_cos_theta_df = pd.concat([self.avg_cos_theta_df, df])
+    def write_cos_theta_total(self):
+        """Mean and std of cos_theta over all frames"""
+        pd.DataFrame([ self.cos_theta_stats.to_dict() ]).to_csv('avg_cos_theta_total.dat', sep='\t', index=False, mode='w')
 
-        self.avg_cos_theta_df.to_csv('avg_cos_theta.dat', sep='\t', index=False, mode='w')
+    def calc_stream(self):
+        """Same outputs as calc_cos_theta(), calc_work_rate_density_per_fil()
+        and calc_avg_cos_theta(), with at most one frame (plus the write
+        buffers) in memory"""
+        f_ext_df = calc_external_force_table(self.simulation_df)
+
+        writers = {'cos_theta': ChunkedWriter('cos_theta.dat', self.cos_theta_df.columns, self.args.chunkrows), \
+                   'fil_pair_angles': ChunkedWriter('fil_pair_angles.dat', self.fil_pair_angles.columns, self.args.chunkrows), \
+                   'work_rate_fil': ChunkedWriter('work_rate_fil.dat', self.work_rate_per_fil_df.columns, self.args.chunkrows), \
+                   'work_rate_motor': ChunkedWriter('work_rate_motor.dat', self.work_rate_per_motor_df.columns, self.args.chunkrows), \
+                   'avg_cos_theta': ChunkedWriter('avg_cos_theta.dat', self.avg_cos_theta_df.columns, self.args.chunkrows)}
+
+        self.cos_theta_stats = RunningStats()
+        self.work_rate_field = None
+
+        for data_obj in self.iter_frame_data():
+            (cos_theta_df, fil_pair_df) = calc_frame_cos_theta(data_obj.time, data_obj.temp_dataframe, \
+                                                               self.unloaded_speed, self.unbinding_force)
+
+            if self.args.field:
+                self.add_frame_to_field(data_obj)
+
+            del data_obj
+
+            cos_theta_df['f_e'] = calc_external_force_magnitudes(cos_theta_df, f_ext_df)
+
+            (work_rate_per_motor_df, work_rate_per_fil_df, avg_cos_theta_df) = calc_work_rates(cos_theta_df)
+
+            self.cos_theta_stats.update(cos_theta_df['cos_theta'].to_numpy(dtype=np.float64))
+
+            writers['cos_theta'].append(cos_theta_df)
+            writers['fil_pair_angles'].append(fil_pair_df)
+            writers['work_rate_fil'].append(work_rate_per_fil_df)
+            writers['work_rate_motor'].append(work_rate_per_motor_df)
+            writers['avg_cos_theta'].append(avg_cos_theta_df)
+
+        for writer in writers.values():
+            writer.flush()
+
+        self.write_cos_theta_total()
+
+        if self.args.field:
+            self.write_work_rate_field()
 
 if __name__=="__main__":
     column_list = ['class','identity','fiber1','abscissa1','pos1X','pos1Y','dirFiber1X','dirFiber1Y','fiber2','abscissa2','pos2X','pos2Y','dirFiber2X','dirFiber2Y','force','cos_angle']
     
     myWRD = WorkRateDensity(column_list)
 
-    myWRD.calc_cos_theta()
-    myWRD.calc_work_rate_density_per_fil()
-    myWRD.calc_avg_cos_theta()
+    if myWRD.args.stream:
+        myWRD.calc_stream()
+    else:
+        myWRD.calc_cos_theta()
+        myWRD.calc_work_rate_density_per_fil()
+        myWRD.calc_avg_cos_theta()
+
+        if myWRD.args.field:
+            myWRD.calc_work_rate_field()
 
     del myWRD